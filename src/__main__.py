@@ -0,0 +1,110 @@
+"""
+Command line entry of the pipelines:
+
+    python -m src list
+    python -m src run NHTSA_VOQs GRID --streaming
+    python -m src backfill --by year --years 2015 2016 --columns BINNING
+
+Only the standard library and the pipelines DAG (src.pipelines.runner) are
+imported at startup, each subcommand imports the modules it needs when it
+runs: "run GRID" never loads the NHTSA stages. Logging is configured once,
+here. The import time of each subcommand is
+checked against its budget by src.benchmarks.bench_startup.
+"""
+
+import argparse
+import os
+import sys
+from typing import Optional, Sequence
+
+from src.pipelines.runner import PIPELINES
+from src.utils.logger import setup_logger
+
+
+def _run(args: argparse.Namespace) -> int:
+    from dotenv import find_dotenv, load_dotenv  # pylint: disable=C0415
+
+    from src.pipelines.runner import PipelineRunner  # pylint: disable=C0415
+
+    load_dotenv(find_dotenv())
+    if args.streaming:
+        os.environ["PIPELINE_STREAMING"] = "true"
+    if args.chunk_rows is not None:
+        os.environ["PIPELINE_CHUNK_ROWS"] = str(args.chunk_rows)
+    try:
+        runner = PipelineRunner(args.pipelines or None)
+    except ValueError as exc:
+        args.parser.error(str(exc))
+    return 0 if runner.run().succeeded else 1
+
+
+def _backfill(args: argparse.Namespace) -> int:
+    from src.pipelines.NHTSA_VOQs.main import backfill  # pylint: disable=C0415
+
+    backfill.main(args.options, prog="python -m src backfill")
+    return 0
+
+
+def _list(_: argparse.Namespace) -> int:
+    for node in PIPELINES.values():
+        after = f" (after {', '.join(node.after)})" if node.after else ""
+        print(f"{node.name}{after}")
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    """
+    Parser of the subcommands.
+
+    Returns:
+        argparse.ArgumentParser: parser, the subcommand function in "command"
+    """
+    main_parser = argparse.ArgumentParser(
+        prog="python -m src", description="ETL pipelines of the complaints"
+    )
+    commands = main_parser.add_subparsers(required=True, metavar="command")
+
+    run = commands.add_parser("run", help="runs pipelines concurrently")
+    run.add_argument(
+        "pipelines",
+        nargs="*",
+        help=f"pipelines to run, all of them by default: {', '.join(PIPELINES)}",
+    )
+    run.add_argument(
+        "--streaming", action="store_true", help="overlaps the pipeline stages"
+    )
+    run.add_argument("--chunk-rows", type=int, help="rows of each streamed chunk")
+    run.set_defaults(command=_run, parser=run)
+
+    backfill = commands.add_parser(
+        "backfill",
+        help="reprocesses the archived NHTSA complaints",
+        add_help=False,
+        prefix_chars="\0",  # all options go to the backfill parser
+    )
+    backfill.add_argument("options", nargs=argparse.REMAINDER)
+    backfill.set_defaults(command=_backfill)
+
+    listing = commands.add_parser("list", help="lists the pipelines")
+    listing.set_defaults(command=_list)
+    return main_parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Runs a subcommand.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): arguments. Defaults to None,
+        the process arguments.
+
+    Returns:
+        int: exit status, 1 when a pipeline failed
+    """
+    args = parser().parse_args(argv)
+    setup_logger()
+    return args.command(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
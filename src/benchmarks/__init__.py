@@ -0,0 +1,5 @@
+"""
+Benchmarks of the pipelines hot paths, each module runs on its own:
+
+    python -m src.benchmarks.<module> --help
+"""
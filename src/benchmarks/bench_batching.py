@@ -0,0 +1,98 @@
+"""
+Benchmark of batched classification prompts against one request per
+complaint, on a mocked endpoint whose latency grows with the prompt and
+answer sizes. Reports requests sent, prompt tokens and wall time for each
+batch size.
+
+    python -m src.benchmarks.bench_batching --cases 400 --sizes 1 5 10 20
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import List
+
+import httpx
+
+from src.infra import classifier as module
+from src.infra.classifier import (
+    BatchOptions,
+    Classifier,
+    chat_content,
+    estimate_tokens,
+    parse_batch,
+)
+
+# latency model of the endpoint, in seconds
+BASE_LATENCY = 0.4
+PROMPT_TOKEN_LATENCY = 0.00005
+ANSWER_TOKEN_LATENCY = 0.02
+
+
+def mock_endpoint(tokens: List[int], scale: float) -> httpx.MockTransport:
+    """
+    Endpoint answering every numbered line of a prompt, or a single answer.
+    """
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        message = httpx.Response(200, content=request.content).json()
+        message = message["messages"][0]["content"]
+        items = max(len(parse_batch(message, 1000)), 1)
+        tokens.append(estimate_tokens(message))
+        await asyncio.sleep(
+            scale
+            * (
+                BASE_LATENCY
+                + PROMPT_TOKEN_LATENCY * estimate_tokens(message)
+                + ANSWER_TOKEN_LATENCY * 12 * items
+            )
+        )
+        answer = "\n".join(f"{n}. F8~~~Door | Rattle" for n in range(1, items + 1))
+        return httpx.Response(200, json={"content": answer})
+
+    return httpx.MockTransport(handler)
+
+
+def main(argv: List[str] | None = None) -> None:
+    """
+    Runs the benchmark and prints one line per batch size.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", type=int, default=400)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--scale", type=float, default=0.1, help="latency scale")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(42)
+    words = "the door window latch wiper glass hood fell off while driving".split()
+    texts = [
+        " ".join(rng.choices(words, k=rng.randint(40, 200))) for _ in range(args.cases)
+    ]
+    categories = [f"Component {i} | Failure {i}" for i in range(275)]
+    instructions = f"Classify in one of the following categories: {categories}."
+
+    baseline = None
+    for size in args.sizes:
+        tokens: List[int] = []
+        module.create_async_client = lambda **_: httpx.AsyncClient(
+            transport=mock_endpoint(tokens, args.scale)
+        )
+        engine = Classifier("http://llm", "token", concurrency=8, rate=1000)
+        start = time.perf_counter()
+        engine.classify(
+            [chat_content(text + instructions) for text in texts],
+            str,
+            "",
+            batch=BatchOptions(texts, instructions, size=size) if size > 1 else None,
+        )
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(
+            f"size {size:>3}: {len(tokens):>4} requests, {sum(tokens):>9} prompt "
+            f"tokens, {elapsed:6.2f}s, {baseline / elapsed:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark of the complaints flat file parse: the object dtype parse used
+by default against the schema typed parse with the c and pyarrow engines.
+Each mode runs in its own process, so the peak RSS is measured in isolation.
+
+    python -m src.benchmarks.bench_parse --rows 500000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+from typing import Dict, List
+
+import pandas as pd
+
+from src.pipelines.NHTSA_VOQs.contracts.schemas.extract import schema
+from src.pipelines.NHTSA_VOQs.stages.extract import USED_COLUMNS
+from src.utils.parsing import read_typed_csv
+
+MODES = ("object", "typed-c", "typed-pyarrow")
+
+
+def make_flat_file(path: str, rows: int) -> None:
+    """
+    Writes a synthetic NHTSA complaints flat file with realistic values.
+    """
+    rng = random.Random(42)
+    makers = ["Ford Motor Company", "General Motors, LLC", "Toyota", "Honda"]
+    models = ["F-150", "ESCAPE", "EXPLORER", "BRONCO", "MUSTANG", "EDGE"]
+    states = ["CA", "TX", "FL", "NY", "MI", "OH", "GA"]
+    words = "the door window latch wiper glass hood fell off while driving".split()
+    columns = list(schema.columns.keys())
+
+    with open(path, "w", encoding="utf-8") as file:
+        for i in range(rows):
+            values = dict.fromkeys(columns, "")
+            values.update(
+                {
+                    "CMPLID": str(1_000_000 + i),
+                    "ODINO": str(10_000_000 + i),
+                    "MFR_NAME": rng.choice(makers),
+                    "MAKETXT": "FORD",
+                    "MODELTXT": rng.choice(models),
+                    "YEARTXT": str(rng.randint(1995, 2024)),
+                    "CRASH": rng.choice("YN"),
+                    "FIRE": rng.choice("YN"),
+                    "FAILDATE": f"2023{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+                    "INJURED": "0",
+                    "DEATHS": "0",
+                    "COMPDESC": "STRUCTURE:BODY:DOOR",
+                    "STATE": rng.choice(states),
+                    "VIN": "1FTFW1ET7DF",
+                    "DATEA": "20240102",
+                    "LDATE": "20240101",
+                    "MILES": str(rng.randint(0, 150_000)),
+                    "CDESCR": " ".join(rng.choices(words, k=60)).upper(),
+                    "CMPL_TYPE": "IVOQ",
+                    "POLICE_RPT_YN": "N",
+                    "MEDICAL_ATTN": "N",
+                    "PROD_TYPE": "V",
+                }
+            )
+            file.write("\t".join(values[name] for name in columns) + "\n")
+
+
+def run_mode(mode: str, path: str, results: Dict) -> None:
+    """
+    Parses the file with one mode and reports time and peak RSS growth.
+    """
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "object":
+        df = pd.read_csv(path, sep="\t", header=None, names=list(schema.columns.keys()))
+    else:
+        engine = mode.split("-")[1]
+        df = read_typed_csv(path, schema, USED_COLUMNS, engine=engine)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    results[mode] = {
+        "seconds": round(elapsed, 2),
+        "peak_rss_mb": round(peak / 1024, 1),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 1024**2, 1),
+        "columns": df.shape[1],
+    }
+
+
+def main(argv: List[str] | None = None) -> None:
+    """
+    Runs the benchmark and prints one line per mode.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "FLAT_CMPL.txt")
+        make_flat_file(path, args.rows)
+        print(f"{args.rows} rows, {os.path.getsize(path) / 1024**2:.1f} MB file")
+
+        with multiprocessing.Manager() as manager:
+            results = manager.dict()
+            for mode in args.modes:
+                process = multiprocessing.Process(
+                    target=run_mode, args=(mode, path, results)
+                )
+                process.start()
+                process.join()
+            for mode in args.modes:
+                print(f"{mode:>14}: {results[mode]}")
+
+
+if __name__ == "__main__":
+    main()
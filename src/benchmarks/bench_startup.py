@@ -0,0 +1,100 @@
+"""
+Benchmark of the startup of the command line entry: the import time of
+each subcommand, the modules it loads before its first stage runs, against
+its budget. Each subcommand is imported by a fresh interpreter, the median
+of the repeats is reported with the heaviest packages it imports.
+
+    python -m src.benchmarks.bench_startup --repeat 5
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class Subcommand(NamedTuple):
+    """
+    Modules imported by a subcommand and its budget in seconds.
+    """
+
+    modules: Tuple[str, ...]
+    budget: float
+
+
+CLI = ("src.__main__",)
+SUBCOMMANDS: Dict[str, Subcommand] = {
+    "list": Subcommand(CLI, 0.15),
+    "run GRID": Subcommand(CLI + ("dotenv", "src.pipelines.GRID.main.pipeline"), 1.5),
+    "run NHTSA_VOQs": Subcommand(
+        CLI + ("dotenv", "src.pipelines.NHTSA_VOQs.main.pipeline"), 2.0
+    ),
+    "run CompetitiveAnalysis": Subcommand(
+        CLI + ("dotenv", "src.pipelines.CompetitiveAnalysis.main.pipeline"), 2.0
+    ),
+    "backfill": Subcommand(CLI + ("src.pipelines.NHTSA_VOQs.main.backfill",), 2.0),
+}
+LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| *(\S+)")
+
+
+def measure(modules: Tuple[str, ...]) -> Tuple[float, Counter]:
+    """
+    Imports the modules on a fresh interpreter.
+
+    Returns:
+        Tuple[float, Counter]: seconds and cumulative microseconds of each
+        third party package, including the packages it imported first
+    """
+    imports = "; ".join(f"import {module}" for module in modules)
+    code = (
+        "import time; start = time.perf_counter(); "
+        + f"{imports}; print(time.perf_counter() - start)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    packages: Counter = Counter()
+    for match in LINE.finditer(result.stderr):
+        cumulative, name = int(match[1]), match[2]
+        # root of a third party package, with all of its own imports
+        if "." not in name and name not in sys.stdlib_module_names | {"src"}:
+            packages[name] += cumulative
+    return float(result.stdout.split()[-1]), packages
+
+
+def main() -> None:
+    """
+    Reports the import time of each subcommand, exits with 1 when any of
+    them goes over its budget.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    over: List[str] = []
+    print(f"{'subcommand':<24} {'median':>8} {'budget':>8}  heaviest imports")
+    for name, subcommand in SUBCOMMANDS.items():
+        runs = [measure(subcommand.modules) for _ in range(args.repeat)]
+        seconds = statistics.median(run[0] for run in runs)
+        heaviest = ", ".join(
+            f"{package} {micros / 1e6:.2f}s"
+            for package, micros in runs[-1][1].most_common(3)
+        )
+        status = "" if seconds <= subcommand.budget else "  OVER BUDGET"
+        if status:
+            over.append(name)
+        print(
+            f"{name:<24} {seconds:>7.2f}s {subcommand.budget:>7.2f}s"
+            + f"  {heaviest}{status}"
+        )
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
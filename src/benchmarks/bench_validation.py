@@ -0,0 +1,55 @@
+"""
+Benchmark of the extract schema validation: pandera lazy validation against
+the vectorized SchemaValidator on each level, over a synthetic flat file
+parsed with the typed parse.
+
+    python -m src.benchmarks.bench_validation --rows 500000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import List
+
+from pandera.errors import SchemaErrors
+
+from src.benchmarks.bench_parse import make_flat_file
+from src.pipelines.NHTSA_VOQs.contracts.schemas.extract import schema
+from src.utils.parsing import read_typed_csv
+from src.utils.validation import SchemaValidator
+
+
+def main(argv: List[str] | None = None) -> None:
+    """
+    Runs the benchmark and prints one line per validation mode.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--skip-pandera", action="store_true")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "FLAT_CMPL.txt")
+        make_flat_file(path, args.rows)
+        df = read_typed_csv(path, schema, list(schema.columns), engine="pyarrow")
+    print(f"{args.rows} rows, {df.shape[1]} columns")
+
+    if not args.skip_pandera:
+        start = time.perf_counter()
+        try:
+            schema.validate(df, lazy=True)
+        except SchemaErrors:
+            pass
+        print(f"{'pandera':>10}: {time.perf_counter() - start:.2f}s")
+
+    watermark = int(df["ODINO"].max()) - 1000
+    for level in ("full", "sample", "delta"):
+        validator = SchemaValidator(schema, level=level, seed=0)
+        start = time.perf_counter()
+        report = validator.validate(df, watermark=watermark)
+        print(f"{level:>10}: {time.perf_counter() - start:.2f}s, {report.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark of the row-wise helpers applied with Series.apply against their
+vectorized versions, over synthetic complaint columns.
+
+    python -m src.benchmarks.bench_vectorized --rows 1000000
+"""
+
+import argparse
+import time
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+from src.utils.funtions import (
+    classify_binning,
+    convert_code_into_state,
+    extract_url,
+    get_mileage_class,
+    get_quarter,
+)
+from src.utils.reference_data import STATE_NAMES
+from src.utils.vectorized import (
+    extract_urls,
+    failure_modes,
+    mileage_classes,
+    quarters,
+    state_names,
+)
+
+BINNINGS = [
+    "DOOR | LOOSE",
+    "HOOD | OWD",
+    "MOONROOF GLASS | EXPLODED",
+    "FRONT WIPER | TOTALLY INOPERATIVE",
+    "BUMPER | FELL OFF",
+    "SIDE MIRROR | DETACHED",
+    "TAIL LIGHT | WATER LEAK",
+    "NOT F8 | ~",
+]
+
+
+def make_columns(rows: int) -> pd.DataFrame:
+    """
+    Synthetic columns with the shape of the extracted complaints.
+    """
+    rng = np.random.default_rng(0)
+    days = rng.integers(0, 365 * 30, rows).astype("timedelta64[D]")
+    return pd.DataFrame(
+        {
+            "STATE": rng.choice(list(STATE_NAMES) + ["01", "XX"], rows),
+            "FAILDATE": pd.Series(np.datetime64("1995-01-01") + days)
+            .dt.strftime("%Y%m%d")
+            .to_numpy(),
+            "MILES": rng.integers(0, 40_000, rows),
+            "BINNING": rng.choice(BINNINGS, rows),
+            "RECALL_LINK": [
+                f"[Recall {i}](https://www.nhtsa.gov/recalls?nhtsaId={i})"
+                for i in rng.integers(0, 10_000, rows)
+            ],
+        }
+    )
+
+
+def timed(function: Callable[[], pd.Series]) -> float:
+    """
+    Seconds spent on a call.
+    """
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(argv: List[str] | None = None) -> None:
+    """
+    Runs the benchmark and prints one line per helper.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    df = make_columns(args.rows)
+    print(f"{args.rows} rows")
+    for column, scalar, vectorized in (
+        ("STATE", convert_code_into_state, state_names),
+        ("FAILDATE", get_quarter, quarters),
+        ("MILES", get_mileage_class, mileage_classes),
+        ("BINNING", classify_binning, failure_modes),
+        ("RECALL_LINK", extract_url, extract_urls),
+    ):
+        series = df[column]
+        apply = timed(lambda: series.apply(scalar))  # pylint: disable=W0640
+        kernel = timed(lambda: vectorized(series))  # pylint: disable=W0640
+        print(
+            f"{scalar.__name__:>24}: apply {apply:.2f}s, "
+            + f"vectorized {kernel:.2f}s ({apply / kernel:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
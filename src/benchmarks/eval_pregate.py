@@ -0,0 +1,57 @@
+"""
+Evaluation of the F8 pre-gate. On a processed dataset, labeled by the LLM,
+reports the gated complaints, the precision and recall of the NOT F8 label
+and the requests avoided. On the F8 backup, which holds only F8 complaints
+and no COMPDESC, reports the false rejection rate from the descriptions.
+
+    python -m src.benchmarks.eval_pregate --thresholds 0.3 0.5 0.8
+"""
+
+import argparse
+from typing import List
+
+import pandas as pd
+
+from src.pipelines.NHTSA_VOQs.stages.pregate import F8PreGate
+from src.pipelines.NHTSA_VOQs.stages.transform import DataTransformer
+
+PROCESSED_PATH = "./data/processed/NHTSA_COMPLAINTS_PROCESSED_2024-02-20.csv"
+BACKUP_PATH = "./data/raw/F8_BACKUP_19-02-2024.xlsx"
+BACKUP_CDESCR = 13  # the backup sheet has no header
+
+
+def main(argv: List[str] | None = None) -> None:
+    """
+    Runs the evaluation and prints one line per threshold.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.8])
+    parser.add_argument("--keyword-factor", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    processed = pd.read_csv(PROCESSED_PATH)
+    backup = pd.read_excel(BACKUP_PATH, header=None)
+    backup = pd.DataFrame({"CDESCR": backup[BACKUP_CDESCR]})
+    not_f8 = (processed["FUNCTION_"] == "NOT F8").to_numpy()
+    print(
+        f"processed: {len(processed)} complaints, {not_f8.sum()} NOT F8; "
+        + f"backup: {len(backup)} F8 complaints"
+    )
+
+    parts = DataTransformer().parts
+    for threshold in args.thresholds:
+        gate = F8PreGate(parts, threshold, args.keyword_factor)
+        gated = gate.gate(processed).gated
+        right = (gated & not_f8).sum()
+        rejected = gate.gate(backup).gated.mean()
+        print(
+            f"threshold {threshold:.2f}: avoided {gated.sum()}/{len(processed)} "
+            + f"requests, precision {right / max(gated.sum(), 1):.3f}, "
+            + f"recall {right / not_f8.sum():.3f}, "
+            + f"F8 gated {(gated & ~not_f8).sum()}, "
+            + f"backup false rejection {rejected:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+This module implements the OAuth client credentials tokens of the pipeline
+endpoints. TokenManager caches a token per scope with its expiry, refreshes
+it on a background timer before it expires and lets a single thread refresh
+a scope at a time, the others wait and reuse its token. BearerAuth signs the
+requests of an httpx client with the token of a scope and, on a 401, gets a
+new token and replays the request once.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncGenerator, Dict, Generator, NamedTuple, Optional
+
+import httpx
+
+from src.utils.funtions import create_client
+from src.utils.logger import setup_logger
+
+EXPIRY_SKEW = 10  # seconds before the expiry a token is no longer used
+
+
+class Token(NamedTuple):
+    """
+    Access token of a scope.
+
+    Attributes:
+        value (str): bearer token
+        expires (float): time.monotonic() of its expiry
+    """
+
+    value: str
+    expires: float
+
+
+class TokenManager:
+    """
+    Cache of client credentials tokens by scope.
+
+    Args:
+        endpoint (Optional[str], optional): token endpoint. Defaults to
+        TOKEN_ENDPOINT env var.
+        client_id (Optional[str], optional): Defaults to CLIENT_ID env var.
+        client_secret (Optional[str], optional): Defaults to CLIENT_SECRET
+        env var.
+        refresh_ahead (float, optional): seconds before the expiry the token
+        is refreshed in background, at most half of its lifetime. Defaults
+        to 300.
+
+    methods:
+        get: valid token of a scope
+        invalidate: new token of a scope whose token was rejected
+        close: stops the background refreshes
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    _default: Optional["TokenManager"] = None
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        client_id: Optional[str] = None,
+        client_secret: Optional[str] = None,
+        refresh_ahead: float = 300,
+    ) -> None:
+        self.endpoint = endpoint or str(os.getenv("TOKEN_ENDPOINT"))
+        self.client_id = client_id or str(os.getenv("CLIENT_ID"))
+        self.client_secret = client_secret or str(os.getenv("CLIENT_SECRET"))
+        self.refresh_ahead = refresh_ahead
+        self.issued = 0
+        self.tokens: Dict[str, Token] = {}
+        self.locks: Dict[str, threading.Lock] = {}
+        self.timers: Dict[str, threading.Timer] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "TokenManager":
+        """
+        Process wide manager configured by the environment variables, its
+        tokens are shared by all pipelines.
+
+        Returns:
+            TokenManager: shared manager instance
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def get(self, scope: str) -> str:
+        """
+        Cached token of a scope, requested when missing or expired.
+
+        Args:
+            scope (str): OAuth scope
+
+        Returns:
+            str: bearer token
+        """
+        token = self.tokens.get(scope)
+        if token is not None and time.monotonic() < token.expires - EXPIRY_SKEW:
+            return token.value
+        with self.__scope_lock(scope):
+            token = self.tokens.get(scope)  # refreshed while waiting
+            if token is None or time.monotonic() >= token.expires - EXPIRY_SKEW:
+                token = self.__issue(scope)
+            return token.value
+
+    def invalidate(self, scope: str, rejected: str) -> str:
+        """
+        New token of a scope after its token was rejected. Concurrent
+        requests rejected with the same token share a single refresh.
+
+        Args:
+            scope (str): OAuth scope
+            rejected (str): token rejected by the endpoint
+
+        Returns:
+            str: bearer token
+        """
+        with self.__scope_lock(scope):
+            token = self.tokens.get(scope)
+            if token is None or token.value == rejected:
+                token = self.__issue(scope)
+            return token.value
+
+    def close(self) -> None:
+        """
+        Cancels the background refreshes.
+        """
+        with self.lock:
+            for timer in self.timers.values():
+                timer.cancel()
+            self.timers.clear()
+
+    def __scope_lock(self, scope: str) -> threading.Lock:
+        with self.lock:
+            return self.locks.setdefault(scope, threading.Lock())
+
+    def __issue(self, scope: str) -> Token:
+        """
+        Requests a token and schedules its background refresh, called with
+        the lock of the scope.
+        """
+        with create_client() as client:
+            response = client.post(
+                self.endpoint,
+                data={
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "scope": scope,
+                    "grant_type": "client_credentials",
+                },
+                timeout=160,
+            )
+        response.raise_for_status()
+        data: Dict[str, Any] = response.json()
+        expires_in = float(data.get("expires_in", 3600))
+        token = Token(data["access_token"], time.monotonic() + expires_in)
+        self.tokens[scope] = token
+        self.issued += 1
+        self.logger.info("Token of %s issued, expires in %ss", scope, expires_in)
+
+        # short lived tokens are refreshed halfway, not right away
+        timer = threading.Timer(
+            max(expires_in / 2, expires_in - self.refresh_ahead),
+            self.__refresh,
+            (scope,),
+        )
+        timer.daemon = True
+        with self.lock:
+            if scope in self.timers:
+                self.timers[scope].cancel()
+            self.timers[scope] = timer
+        timer.start()
+        return token
+
+    def __refresh(self, scope: str) -> None:
+        try:
+            with self.__scope_lock(scope):
+                self.__issue(scope)
+        except (httpx.HTTPError, KeyError, ValueError) as exc:
+            # the current token is still valid, get() retries on expiry
+            self.logger.warning("Background refresh of %s failed: %r", scope, exc)
+
+
+class BearerAuth(httpx.Auth):
+    """
+    Signs requests with the token of a scope and replays them once with a
+    new token on a 401.
+
+    Args:
+        scope (str): OAuth scope
+        manager (Optional[TokenManager], optional): token source. Defaults
+        to TokenManager.default().
+    """
+
+    def __init__(self, scope: str, manager: Optional[TokenManager] = None) -> None:
+        self.scope = scope
+        self.manager = manager or TokenManager.default()
+
+    def sync_auth_flow(
+        self, request: httpx.Request
+    ) -> Generator[httpx.Request, httpx.Response, None]:
+        token = self.manager.get(self.scope)
+        request.headers["Authorization"] = f"Bearer {token}"
+        response = yield request
+        if response.status_code == 401:
+            token = self.manager.invalidate(self.scope, token)
+            request.headers["Authorization"] = f"Bearer {token}"
+            yield request
+
+    async def async_auth_flow(
+        self, request: httpx.Request
+    ) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        # token requests are blocking, they run off the event loop
+        token = await asyncio.to_thread(self.manager.get, self.scope)
+        request.headers["Authorization"] = f"Bearer {token}"
+        response = yield request
+        if response.status_code == 401:
+            token = await asyncio.to_thread(self.manager.invalidate, self.scope, token)
+            request.headers["Authorization"] = f"Bearer {token}"
+            yield request
+
+
+class StaticBearerAuth(httpx.Auth):
+    """
+    Signs requests with a fixed token.
+
+    Args:
+        token (str): bearer token
+    """
+
+    def __init__(self, token: str) -> None:
+        self.token = token
+
+    def auth_flow(
+        self, request: httpx.Request
+    ) -> Generator[httpx.Request, httpx.Response, None]:
+        request.headers["Authorization"] = f"Bearer {self.token}"
+        yield request
+
+
+def classifier_credentials() -> Dict[str, Any]:
+    """
+    Classifier endpoint and its auth, tokens of SCOPE env var are issued on
+    the first request.
+
+    Returns:
+        Dict[str, Any]: "url" and httpx "auth"
+    """
+    return {
+        "url": str(os.getenv("API_ENDPOINT")),
+        "auth": BearerAuth(str(os.getenv("SCOPE"))),
+    }
+
+
+def gsar_auth() -> httpx.Auth:
+    """
+    Auth of GSAR WERS: tokens of GSAR_SCOPE env var when set, otherwise the
+    fixed GSAR_TOKEN.
+
+    Returns:
+        httpx.Auth: request auth
+    """
+    scope = os.getenv("GSAR_SCOPE")
+    if scope:
+        return BearerAuth(scope)
+    return StaticBearerAuth(str(os.getenv("GSAR_TOKEN")))
@@ -0,0 +1,107 @@
+"""
+This module implements the checkpoints of the micro-batched transforms.
+Each completed batch is saved under a hash of its input rows and of the
+transform options, so a run failing midway restarts with the batches
+already enriched (paid LLM calls and VIN lookups) and only processes the
+rest. Batches are written to a temporary file and renamed, a batch is
+either fully committed or absent. The checkpoints of a pipeline are cleared
+once its data is loaded.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+from typing import Optional
+
+import pandas as pd
+
+from src.utils.logger import setup_logger
+
+
+class BatchCheckpoint:
+    """
+    Durable store of the transformed batches of a pipeline.
+
+    Args:
+        namespace (str): pipeline name, the directory of its batches
+        root (Optional[str], optional): checkpoints directory. Defaults to
+        CHECKPOINT_DIR env var or ./data/cache/checkpoints.
+
+    methods:
+        key: address of a batch of input rows
+        get: transformed batch committed for a key
+        put: commits a transformed batch
+        clear: removes all batches of the pipeline
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    def __init__(self, namespace: str, root: Optional[str] = None) -> None:
+        root = root or os.getenv("CHECKPOINT_DIR", "./data/cache/checkpoints")
+        self.path = os.path.join(root, namespace)
+        self.restored = 0
+        self.committed = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def key(batch: pd.DataFrame, options: str = "") -> str:
+        """
+        Address of a batch: hash of its rows, index included, and of the
+        transform options, any change on either is a new batch.
+
+        Args:
+            batch (pd.DataFrame): input rows
+            options (str, optional): transform options. Defaults to "".
+
+        Returns:
+            str: hex digest
+        """
+        digest = hashlib.sha256(options.encode())
+        digest.update(str(list(batch.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(batch, index=True).to_numpy())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Transformed batch committed for a key.
+
+        Args:
+            key (str): batch address
+
+        Returns:
+            Optional[pd.DataFrame]: transformed rows, None when not committed
+        """
+        path = self.__file(key)
+        if not os.path.isfile(path):
+            return None
+        self.restored += 1
+        return pd.read_pickle(path)
+
+    def put(self, key: str, batch: pd.DataFrame) -> None:
+        """
+        Commits a transformed batch, atomically.
+
+        Args:
+            key (str): address of its input rows
+            batch (pd.DataFrame): transformed rows
+        """
+        path = self.__file(key)
+        temporary = f"{path}.tmp"
+        batch.to_pickle(temporary)
+        with open(temporary, "rb") as file:
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+        self.committed += 1
+
+    def clear(self) -> None:
+        """
+        Removes all batches of the pipeline, after its data is loaded.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+        self.logger.info("Checkpoints of %s cleared", self.path)
+
+    def __file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.pkl")
@@ -0,0 +1,140 @@
+"""
+This module implements a persistent store of LLM classification answers,
+shared by the transformers of all pipelines. Answers are addressed by a
+hash of the normalized classified text, of the prompt template and of the
+model, so re-runs, retries and backfills only pay for texts never seen
+with the same instructions.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from src.utils.logger import setup_logger
+
+
+class ClassificationStore:
+    """
+    Sqlite store of classification answers.
+
+    Args:
+        path (str): sqlite database file
+
+    methods:
+        key: content address of a classification
+        get_many: answers saved for some keys
+        put_many: saves answers
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    _default: Optional["ClassificationStore"] = None
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # shared by the backfill worker processes: readers never block the
+        # writer (WAL) and a writer waits for the lock instead of failing
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    answer TEXT,
+                    created REAL
+                );
+                """
+            )
+
+    @classmethod
+    def default(cls) -> "ClassificationStore":
+        """
+        Process wide store configured by CLASSIFICATION_STORE_PATH
+        environment variable.
+
+        Returns:
+            ClassificationStore: shared store instance
+        """
+        if cls._default is None:
+            cls._default = cls(
+                os.getenv(
+                    "CLASSIFICATION_STORE_PATH",
+                    "./data/cache/classifications.sqlite3",
+                )
+            )
+        return cls._default
+
+    @staticmethod
+    def key(text: str, template: str, model: str) -> str:
+        """
+        Content address of a classification. Case and whitespace of the text
+        are normalized, the template is hashed, so any change on the
+        instructions (ex: a new category) is a new address.
+
+        Args:
+            text (str): classified text
+            template (str): instructions sent with the text
+            model (str): model name
+
+        Returns:
+            str: sha256 hex digest
+        """
+        normalized = " ".join(str(text).split()).casefold()
+        version = hashlib.sha256(template.encode()).hexdigest()
+        return hashlib.sha256(
+            "\0".join((normalized, version, model)).encode()
+        ).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Finds the answers saved for some keys and counts hits and misses.
+
+        Args:
+            keys (Iterable[str]): content addresses
+
+        Returns:
+            Dict[str, str]: answers found, by key
+        """
+        unique = list(dict.fromkeys(keys))
+        found: Dict[str, str] = {}
+        with self.lock:
+            for start in range(0, len(unique), 500):  # sqlite variables limit
+                part = unique[start : start + 500]
+                found.update(
+                    self.conn.execute(
+                        "SELECT key, answer FROM answers WHERE key IN "
+                        + f"({', '.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                )
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, answers: Dict[str, str]) -> None:
+        """
+        Saves answers by key.
+
+        Args:
+            answers (Dict[str, str]): answers to save
+        """
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?)",
+                ((key, answer, now) for key, answer in answers.items()),
+            )
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
@@ -0,0 +1,467 @@
+"""
+This module implements the async engine used by the transformers to send
+classification prompts to the LLM endpoint. Requests run concurrently on a
+single async client, bounded by the adaptive concurrency limit and the
+circuit breaker of the endpoint and a token bucket rate limit, each one
+retried on its own, and results come back in the order of the prompts.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import (
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import httpx
+
+from src.errors.transform_error import TransformError
+from src.infra.auth import StaticBearerAuth
+from src.infra.classification_store import ClassificationStore
+from src.infra.concurrency import AdaptiveLimiter, CircuitBreaker, CircuitOpenError
+from src.utils.funtions import create_async_client
+from src.utils.logger import setup_logger
+
+T = TypeVar("T")
+
+MODEL = "gpt-4"
+CONTEXT = "You are a helpful text reader and analyzer. You need to give me 2 answers."
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+OVERLOAD_STATUS = frozenset({408, 429, 503, 504})
+FAILURE_STATUS = frozenset({408, 500, 502, 503, 504})
+BATCH_TEMPLATE = (
+    "{instructions} The texts below are numbered. Apply the instructions to "
+    "each text on its own and answer with one line per text, starting with "
+    "the text number and a dot followed by its answer in the format asked, "
+    "ex: '1. ANSWER'. Never skip a number.\n{items}"
+)
+BATCH_LINE = re.compile(
+    r"^\s*[\"'`*]*(?:ANSWER|TEXT|ITEM)?\s*[\[(#]?\s*(\d+)\s*"
+    r"(?:[\])]\s*[.:\-]?|[.:\-])\s*(.*)$",
+    re.IGNORECASE,
+)
+
+
+def chat_content(message: str, context: str = CONTEXT) -> Dict:
+    """
+    Body of a classification request.
+
+    Args:
+        message (str): user message with the prompt
+        context (str, optional): overall behavior of the assistant.
+        Defaults to CONTEXT.
+
+    Returns:
+        Dict: json content of the request
+    """
+    return {
+        "model": MODEL,
+        "context": context,
+        "messages": [{"role": "user", "content": message}],
+        "parameters": {
+            "temperature": 0.05,  # Determines the randomnes of the model's response.
+        },
+    }
+
+
+class BatchOptions(NamedTuple):
+    """
+    Options of the batched classification.
+
+    Attributes:
+        texts (Sequence[str]): text of each content, in the same order
+        instructions (str): prompt sent once for all texts of a batch
+        context (str): context of the batched requests
+        size (int): max items of a batch
+        token_budget (int): max estimated tokens of a batched prompt
+        is_valid (Callable[[str], bool]): checks the format of an item answer,
+        invalid items are sent again alone
+    """
+
+    texts: Sequence[str]
+    instructions: str
+    context: str = CONTEXT
+    size: int = 10
+    token_budget: int = 6000
+    is_valid: Callable[[str], bool] = bool
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of a text, about 4 characters per token.
+    """
+    return len(text) // 4 + 1
+
+
+def pack_batches(
+    texts: Sequence[str], instructions: str, size: int, token_budget: int
+) -> List[List[int]]:
+    """
+    Groups consecutive texts in batches of up to size items, keeping the
+    instructions and items of each batch under the token budget. A text
+    bigger than the budget goes alone in its batch.
+
+    Returns:
+        List[List[int]]: indexes of the texts of each batch
+    """
+    base = estimate_tokens(BATCH_TEMPLATE.format(instructions=instructions, items=""))
+    groups: List[List[int]] = []
+    used = token_budget
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text) + 2  # item number and line break
+        if used + tokens > token_budget or len(groups[-1]) >= size:
+            groups.append([])
+            used = base
+        groups[-1].append(index)
+        used += tokens
+    return groups
+
+
+def batch_prompt(texts: Sequence[str], instructions: str) -> str:
+    """
+    Message of a batched request, texts numbered from 1.
+    """
+    items = "\n".join(
+        f"{number}. {' '.join(text.split())}" for number, text in enumerate(texts, 1)
+    )
+    return BATCH_TEMPLATE.format(instructions=instructions, items=items)
+
+
+def parse_batch(message: str, size: int) -> Dict[int, str]:
+    """
+    Splits a batched answer in the answer of each item. Lines may come as
+    "1. ANSWER", "1) ANSWER", "[1] ANSWER" or "ANSWER 1: ANSWER", quoted or
+    not, the first answer of each number is kept and lines without a number
+    between 1 and size are ignored.
+
+    Args:
+        message (str): answer message
+        size (int): number of items of the batch
+
+    Returns:
+        Dict[int, str]: answer of each item found
+    """
+    answers: Dict[int, str] = {}
+    for line in message.splitlines():
+        if (match := BATCH_LINE.match(line)) is None:
+            continue
+        number, answer = int(match.group(1)), match.group(2).strip(" '\"`*")
+        if 1 <= number <= size and answer and number not in answers:
+            answers[number] = answer
+    return answers
+
+
+class TokenBucket:
+    """
+    Rate limit shared by the concurrent requests: rate tokens are added
+    each second up to capacity, each request takes one.
+
+    Args:
+        rate (float): tokens added per second
+        capacity (int): burst size
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Waits until a token is available and takes it.
+        """
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Classifier:
+    """
+    Concurrent client of the classification endpoint.
+
+    Args:
+        url (str): api endpoint
+        token (Union[str, httpx.Auth]): authorization token, or the auth of
+        the requests (see src.infra.auth.BearerAuth)
+        concurrency (Optional[int], optional): starting limit of requests in
+        flight. Defaults to CLASSIFIER_CONCURRENCY env var or 8.
+        max_concurrency (Optional[int], optional): highest limit of requests
+        in flight. Defaults to CLASSIFIER_MAX_CONCURRENCY env var or 32.
+        rate (Optional[float], optional): requests started per second.
+        Defaults to CLASSIFIER_RATE env var or 8.
+        tries (int, optional): attempts of each request. Defaults to 4.
+        delay (float, optional): first wait between tries, doubled on each
+        retry. Defaults to 3.
+        timeout (float, optional): request timeout. Defaults to 360.
+        store (Optional[ClassificationStore], optional): persistent store of
+        answers, only contents with keys not stored are sent. Defaults to None.
+        limiter (Optional[AdaptiveLimiter], optional): concurrency limit.
+        Defaults to the one shared by the classifiers of the url.
+        breaker (Optional[CircuitBreaker], optional): circuit breaker.
+        Defaults to the one shared by the classifiers of the url.
+        max_failed (Optional[float], optional): share of the contents sent
+        that may fail before classify raises. Defaults to
+        CLASSIFIER_MAX_FAILED env var or 0.5.
+
+    methods:
+        classify: sends one request per content and parses the answers
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        url: str,
+        token: Union[str, httpx.Auth],
+        concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        tries: int = 4,
+        delay: float = 3,
+        timeout: float = 360,
+        store: Optional[ClassificationStore] = None,
+        max_concurrency: Optional[int] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_failed: Optional[float] = None,
+    ) -> None:
+        self.url = url
+        self.auth = token if isinstance(token, httpx.Auth) else StaticBearerAuth(token)
+        self.concurrency = concurrency or int(os.getenv("CLASSIFIER_CONCURRENCY", "8"))
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("CLASSIFIER_MAX_CONCURRENCY", "32")
+        )
+        self.rate = rate or float(os.getenv("CLASSIFIER_RATE", "8"))
+        self.tries = tries
+        self.delay = delay
+        self.timeout = timeout
+        self.store = store
+        self.limiter = limiter or AdaptiveLimiter.shared(
+            url, self.concurrency, self.max_concurrency
+        )
+        self.breaker = breaker or CircuitBreaker.shared(url)
+        self.max_failed = (
+            float(os.getenv("CLASSIFIER_MAX_FAILED", "0.5"))
+            if max_failed is None
+            else max_failed
+        )
+
+    def classify(
+        self,
+        contents: Sequence[Dict],
+        parse: Callable[[str], T],
+        default: T,
+        keys: Optional[Sequence[str]] = None,
+        batch: Optional[BatchOptions] = None,
+    ) -> List[T]:
+        """
+        Sends all requests and returns the parsed answers in the same order.
+        A request still failing after all tries, or with a malformed
+        answer, gets the default answer.
+
+        Args:
+            contents (Sequence[Dict]): json content of each request
+            parse (Callable[[str], T]): converts an answer message
+            default (T): result of failed requests, answers parsed into it
+            are not stored
+            keys (Optional[Sequence[str]], optional): store address of each
+            content (see ClassificationStore.key), repeated keys are sent
+            once. Defaults to None.
+            batch (Optional[BatchOptions], optional): packs the texts of the
+            contents in batched requests first, items without a valid answer
+            are sent again with their own content. Defaults to None.
+
+        Raises:
+            TransformError: more than max_failed of the contents sent failed,
+            the answers received are stored first
+
+        Returns:
+            List[T]: one result for each content
+        """
+        start = time.perf_counter()
+        keys = [str(i) for i in range(len(contents))] if keys is None else keys
+        found: Dict[str, Optional[str]] = {}
+        if self.store is not None:
+            found.update(self.store.get_many(keys))
+        hits = len(found)
+
+        pending: Dict[str, int] = {}  # first index of each key not answered
+        for index, key in enumerate(keys):
+            if key not in found:
+                pending.setdefault(key, index)
+
+        sent = 0
+        if batch is not None and pending:
+            answers, sent = self.__classify_batches(batch, pending)
+            found.update(answers)
+        rest = [key for key in pending if key not in found]
+        found.update(
+            zip(
+                rest,
+                asyncio.run(self.__classify_all([contents[pending[k]] for k in rest])),
+            )
+        )
+        sent += len(rest)
+
+        if self.store is not None:
+            # a rejected answer kept would be served on every later run
+            new = {
+                key: found[key]
+                for key in pending
+                if found[key] and parse(found[key]) != default  # type: ignore
+            }
+            self.store.put_many(new)  # type: ignore
+            self.logger.info(
+                "Classification store: %s hits, %s misses (%s saved)",
+                hits,
+                len(pending),
+                len(new),
+            )
+
+        messages = [found[key] for key in keys]
+        failed = sum(found[key] is None for key in pending)
+        elapsed = time.perf_counter() - start
+        self.logger.info(
+            "Classified %s cases with %s requests in %.1fs (%.2f cases/s), %s failed"
+            " (concurrency limit %s, circuit %s)",
+            len(contents),
+            sent,
+            elapsed,
+            len(pending) / elapsed if elapsed else 0,
+            failed,
+            int(self.limiter.limit),
+            self.breaker.state,
+        )
+        if pending and failed / len(pending) > self.max_failed:
+            raise TransformError(
+                f"Classification failed for {failed} of {len(pending)} cases"
+            )
+        return [default if message is None else parse(message) for message in messages]
+
+    def __classify_batches(
+        self, batch: BatchOptions, pending: Dict[str, int]
+    ) -> Tuple[Dict[str, str], int]:
+        """
+        Sends the pending texts packed in batches and keeps the valid
+        answers of each item.
+        """
+        groups = pack_batches(
+            [batch.texts[index] for index in pending.values()],
+            batch.instructions,
+            batch.size,
+            batch.token_budget,
+        )
+        items = list(pending)
+        messages = asyncio.run(
+            self.__classify_all(
+                [
+                    chat_content(
+                        batch_prompt(
+                            [batch.texts[pending[items[i]]] for i in group],
+                            batch.instructions,
+                        ),
+                        batch.context,
+                    )
+                    for group in groups
+                ]
+            )
+        )
+
+        answers: Dict[str, str] = {}
+        for group, message in zip(groups, messages):
+            parsed = parse_batch(message or "", len(group))
+            for number, i in enumerate(group, 1):
+                if number in parsed and batch.is_valid(parsed[number]):
+                    answers[items[i]] = parsed[number]
+        self.logger.info(
+            "Batched %s items in %s requests, %s answered (%.1f items/request)",
+            len(items),
+            len(groups),
+            len(answers),
+            len(items) / len(groups),
+        )
+        return answers, len(groups)
+
+    async def __classify_all(self, contents: Sequence[Dict]) -> List[Optional[str]]:
+        bucket = TokenBucket(self.rate, self.concurrency)
+        async with create_async_client(max_connections=self.max_concurrency) as client:
+            return await asyncio.gather(
+                *(self.__request(client, bucket, content) for content in contents)
+            )
+
+    async def __request(
+        self, client: httpx.AsyncClient, bucket: TokenBucket, content: Dict
+    ) -> Optional[str]:
+        delay = self.delay
+        for attempt in range(1, self.tries + 1):
+            try:
+                probe = self.breaker.check()
+            except CircuitOpenError as exc:
+                self.logger.debug("%s", exc)
+                return None
+            try:
+                # the token first: a slot is never held while waiting for the rate
+                await bucket.acquire()
+                await self.limiter.acquire()
+                # only the request is timed, waiting for a slot is no regression
+                start = time.perf_counter()
+                overloaded = True
+                try:
+                    response = await client.post(
+                        self.url,
+                        auth=self.auth,
+                        json=content,
+                        timeout=self.timeout,
+                    )
+                    overloaded = response.status_code in OVERLOAD_STATUS
+                    # 429 is the endpoint up and throttling, only the limit reacts
+                    self.breaker.record(response.status_code not in FAILURE_STATUS)
+                    if response.status_code == 200:
+                        try:
+                            return response.json()["content"]
+                        except (KeyError, TypeError, ValueError) as exc:
+                            self.logger.warning("Malformed answer: %r", exc)
+                            return None
+                    if response.status_code not in RETRY_STATUS:
+                        self.logger.warning("Answered %s", response.status_code)
+                        return None
+                    error = f"status {response.status_code}"
+                    retry_after = response.headers.get("Retry-After", "")
+                    wait = float(retry_after) if retry_after.isdigit() else delay
+                except httpx.TransportError as exc:
+                    self.breaker.record(False)
+                    error, wait = repr(exc), delay
+                finally:
+                    await self.limiter.release(time.perf_counter() - start, overloaded)
+            finally:
+                # a probe cancelled or raising has no recorded outcome, the
+                # next request probes again
+                if probe:
+                    self.breaker.abandon()
+
+            if attempt < self.tries:
+                self.logger.warning("%s, retrying in %s seconds...", error, wait)
+                await asyncio.sleep(wait)
+                delay *= 2
+        self.logger.error("Request failed after %s tries: %s", self.tries, error)
+        return None
@@ -0,0 +1,283 @@
+"""
+This module implements the adaptive concurrency control of the requests to
+the classification endpoint, shared by the transformers of all pipelines.
+
+AdaptiveLimiter follows AIMD: the limit of requests in flight grows by one
+for each limit successful requests while the service is healthy, and is cut
+by a factor on overload signals (429, timeouts) or when the p95 latency of
+the last window regresses over the best one seen. CircuitBreaker fails
+fast after consecutive failures, while the service is down, and lets a
+single probe through after a cool down to close again.
+
+Both keep their state between runs of the same process, one instance of
+each per endpoint. Pipelines running concurrently, each one on its own
+event loop, share the slots of the limiter.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import numpy as np
+
+from src.utils.logger import setup_logger
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a request is refused by an open circuit.
+    """
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit of the requests in flight.
+
+    Args:
+        initial (int, optional): starting limit. Defaults to 8.
+        minimum (int, optional): lowest limit. Defaults to 1.
+        maximum (int, optional): highest limit. Defaults to 64.
+        decrease (float, optional): factor of the limit on overload.
+        Defaults to 0.5.
+        window (int, optional): latencies of each p95 measure. Defaults to 50.
+        tolerance (float, optional): p95 over tolerance times the best p95
+        is a regression. Defaults to 2.0.
+
+    methods:
+        acquire: waits for a free slot
+        release: frees a slot and adapts the limit to its outcome
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    _shared: Dict[str, "AdaptiveLimiter"] = {}
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 64,
+        decrease: float = 0.5,
+        window: int = 50,
+        tolerance: float = 2.0,
+    ) -> None:
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.window = window
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.best_p95: Optional[float] = None
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+        self.__conditions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def shared(
+        cls, endpoint: str, initial: int = 8, maximum: int = 64
+    ) -> "AdaptiveLimiter":
+        """
+        Process wide limiter of an endpoint, created with the limits of its
+        first caller.
+        """
+        if endpoint not in cls._shared:
+            cls._shared[endpoint] = cls(initial=initial, maximum=maximum)
+        return cls._shared[endpoint]
+
+    async def acquire(self) -> None:
+        """
+        Waits until the requests in flight are under the limit and takes a
+        slot.
+        """
+        condition = self.__get_condition()
+        async with condition:
+            await condition.wait_for(self.__take)
+
+    async def release(self, latency: float, overloaded: bool = False) -> None:
+        """
+        Frees a slot, growing the limit on healthy requests and cutting it on
+        overload or p95 regression.
+
+        Args:
+            latency (float): seconds spent on the request
+            overloaded (bool, optional): the request got a 429, a timeout or
+            other sign of overload. Defaults to False.
+        """
+        with self.lock:
+            self.in_flight -= 1
+            if overloaded:
+                self.__decrease("overload")
+            elif self.__regressed(latency):
+                self.__decrease("p95 regression")
+            else:
+                # one more slot for each limit healthy requests
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            loops = list(self.__conditions.items())
+        current = asyncio.get_running_loop()
+        for loop, condition in loops:
+            if loop is current:
+                await self.__notify(condition)
+            elif not loop.is_closed():
+                # waiters of the other pipelines wake up on their own loop
+                loop.call_soon_threadsafe(
+                    lambda c=condition: asyncio.ensure_future(self.__notify(c))
+                )
+
+    def __take(self) -> bool:
+        with self.lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    @staticmethod
+    async def __notify(condition: asyncio.Condition) -> None:
+        async with condition:
+            condition.notify_all()
+
+    def __regressed(self, latency: float) -> bool:
+        self.latencies.append(latency)
+        if len(self.latencies) < self.window:
+            return False
+        p95 = float(np.percentile(self.latencies, 95))
+        self.latencies.clear()
+        if self.best_p95 is None or p95 < self.best_p95:
+            self.best_p95 = p95
+            return False
+        return p95 > self.tolerance * self.best_p95
+
+    def __decrease(self, reason: str) -> None:
+        # requests sent before a cut answer with the same signal, only the
+        # first of them counts
+        now = time.monotonic()
+        if now - self.last_decrease < 1:
+            return
+        self.last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.logger.warning("Concurrency limit cut to %s (%s)", int(self.limit), reason)
+
+    def __get_condition(self) -> asyncio.Condition:
+        # each run has its own event loop, the limit is kept between them
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if loop not in self.__conditions:
+                self.__conditions[loop] = asyncio.Condition()
+            return self.__conditions[loop]
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an endpoint is down.
+
+    Args:
+        failures (int, optional): consecutive failures that open the
+        circuit. Defaults to 5.
+        reset_timeout (float, optional): seconds open before a probe.
+        Defaults to 30.
+
+    methods:
+        check: raises while the circuit is open
+        record: counts the outcome of a request
+        abandon: frees the way after a probe without outcome
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    _shared: Dict[str, "CircuitBreaker"] = {}
+
+    def __init__(self, failures: int = 5, reset_timeout: float = 30) -> None:
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.consecutive = 0
+        self.opened = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+        self.__state = CLOSED
+
+    @classmethod
+    def shared(cls, endpoint: str) -> "CircuitBreaker":
+        """
+        Process wide breaker of an endpoint.
+        """
+        if endpoint not in cls._shared:
+            cls._shared[endpoint] = cls()
+        return cls._shared[endpoint]
+
+    @property
+    def state(self) -> str:
+        """
+        "closed", "open" or "half-open" when the timeout of an open circuit
+        is over.
+        """
+        with self.lock:
+            return self.__current()
+
+    def check(self) -> bool:
+        """
+        Lets a request through, a single one while half open.
+
+        Returns:
+            bool: the request is the probe of a half open circuit, to
+            abandon if it ends without a recorded outcome
+
+        Raises:
+            CircuitOpenError: circuit open, or half open with a probe running
+        """
+        with self.lock:
+            state = self.__current()
+            if state == OPEN or (state == HALF_OPEN and self.probing):
+                raise CircuitOpenError(f"Circuit {state}, request refused")
+            if state == HALF_OPEN:
+                self.probing = True
+                return True
+            return False
+
+    def abandon(self) -> None:
+        """
+        Ends a probe cancelled or raising before its outcome was recorded,
+        the next request probes again.
+        """
+        with self.lock:
+            self.probing = False
+
+    def record(self, success: bool) -> None:
+        """
+        Counts the outcome of a request let through.
+
+        Args:
+            success (bool): the service answered, even with a client error
+        """
+        with self.lock:
+            self.probing = False
+            if success:
+                if self.__state != CLOSED:
+                    self.logger.info("Circuit closed")
+                self.consecutive, self.__state = 0, CLOSED
+                return
+            self.consecutive += 1
+            if self.__state == HALF_OPEN or self.consecutive >= self.failures:
+                if self.__state != OPEN:
+                    self.logger.error(
+                        "Circuit open for %ss after %s failures",
+                        self.reset_timeout,
+                        self.consecutive,
+                    )
+                self.__state, self.opened = OPEN, time.monotonic()
+
+    def __current(self) -> str:
+        if (
+            self.__state == OPEN
+            and time.monotonic() - self.opened >= self.reset_timeout
+        ):
+            self.__state = HALF_OPEN
+        return self.__state
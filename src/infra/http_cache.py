@@ -0,0 +1,354 @@
+"""
+This module implements a persistent HTTP response cache used by the
+shared clients of src.utils.funtions. Bodies are saved on disk next to a
+sqlite index with their ETag and Last-Modified validators, next requests
+are sent as conditional requests and a 304 answer is served from disk.
+The cache has a size cap, least recently used entries are evicted first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import IO, AsyncIterator, Dict, Iterator, Optional
+
+import httpx
+
+READ_SIZE = 1024 * 1024
+
+
+class HttpCache:
+    """
+    Disk storage of cached responses.
+
+    Args:
+        directory (str): folder where bodies and index are saved
+        max_bytes (int): size cap of all bodies saved
+    """
+
+    _default: Optional["HttpCache"] = None
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            os.path.join(directory, "index.sqlite3"),
+            timeout=30,
+            check_same_thread=False,
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    headers TEXT,
+                    size INTEGER,
+                    last_access REAL
+                );
+                """
+            )
+
+    @classmethod
+    def default(cls) -> "HttpCache":
+        """
+        Process wide cache configured by HTTP_CACHE_DIR and
+        HTTP_CACHE_MAX_MB environment variables.
+
+        Returns:
+            HttpCache: shared cache instance
+        """
+        if cls._default is None:
+            cls._default = cls(
+                os.getenv("HTTP_CACHE_DIR", "./data/cache/http"),
+                int(os.getenv("HTTP_CACHE_MAX_MB", "4096")) * 1024 * 1024,
+            )
+        return cls._default
+
+    @staticmethod
+    def key(request: httpx.Request) -> str:
+        """
+        Cache key of a request: hash of method and full url.
+        """
+        return hashlib.sha256(f"{request.method} {request.url}".encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        """
+        Path of the body file of an entry.
+        """
+        return os.path.join(self.directory, f"{key}.body")
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """
+        Finds a cached entry, only if its body is still on disk.
+
+        Returns:
+            Optional[Dict]: etag, last_modified and headers of the entry
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, headers FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None or not os.path.isfile(self.path(key)):
+            return None
+        headers = [tuple(item) for item in json.loads(row[2])]
+        return {"etag": row[0], "last_modified": row[1], "headers": headers}
+
+    def touch(self, key: str) -> None:
+        """
+        Marks an entry as recently used.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+
+    def store(self, key: str, response: httpx.Response, tmp_path: str) -> None:
+        """
+        Saves a completed body written on tmp_path as the entry of key and
+        evicts old entries above the size cap.
+        """
+        size = os.path.getsize(tmp_path)
+        if size > self.max_bytes:
+            os.remove(tmp_path)
+            return
+
+        os.replace(tmp_path, self.path(key))
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    str(response.request.url),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    json.dumps(response.headers.multi_items()),
+                    size,
+                    time.time(),
+                ),
+            )
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the cache fits max_bytes.
+        """
+        with self.lock, self.conn:
+            total = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            rows = self.conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access"
+            ).fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                if os.path.isfile(self.path(key)):
+                    os.remove(self.path(key))
+                total -= size
+
+    def conditional(self, request: httpx.Request) -> Optional[Dict]:
+        """
+        Adds If-None-Match and If-Modified-Since headers to a cacheable
+        request with a cached entry.
+
+        Returns:
+            Optional[Dict]: cached entry, None if the request is not cached
+        """
+        if request.method != "GET" or "Range" in request.headers:
+            return None
+        entry = self.lookup(self.key(request))
+        if entry is None:
+            return None
+        if entry["etag"]:
+            request.headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            request.headers["If-Modified-Since"] = entry["last_modified"]
+        return entry
+
+    def cached_response(
+        self, request: httpx.Request, entry: Dict
+    ) -> Optional[httpx.Response]:
+        """
+        Builds a 200 response with the body saved on disk. The body is opened
+        right away, an eviction while it is read does not cut it.
+
+        Returns:
+            Optional[httpx.Response]: None if the entry was evicted since
+            the request was sent
+        """
+        try:
+            file = open(self.path(self.key(request)), "rb")  # pylint: disable=R1732
+        except FileNotFoundError:
+            return None
+        self.touch(self.key(request))
+        return httpx.Response(
+            200,
+            headers=entry["headers"],
+            stream=_FileStream(file),
+            request=request,
+            extensions={"from_cache": True},
+        )
+
+    @staticmethod
+    def unconditional(request: httpx.Request) -> None:
+        """
+        Removes the validators added by conditional.
+        """
+        request.headers.pop("If-None-Match", None)
+        request.headers.pop("If-Modified-Since", None)
+
+    def is_cacheable(self, request: httpx.Request, response: httpx.Response) -> bool:
+        """
+        Only complete GET answers with validators are saved.
+        """
+        return (
+            request.method == "GET"
+            and "Range" not in request.headers
+            and response.status_code == 200
+            and ("ETag" in response.headers or "Last-Modified" in response.headers)
+        )
+
+
+class _FileStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    def __init__(self, file: IO[bytes]) -> None:
+        self.file = file
+
+    def __iter__(self) -> Iterator[bytes]:
+        with self.file:
+            while part := self.file.read(READ_SIZE):
+                yield part
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for part in self:
+            yield part
+
+    def close(self) -> None:
+        self.file.close()
+
+    async def aclose(self) -> None:
+        self.file.close()
+
+
+class _TeeStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """
+    Response stream that writes the body on a temp file while it is read,
+    the entry is only stored when the body was read until the end.
+    """
+
+    def __init__(self, cache: HttpCache, response: httpx.Response) -> None:
+        self.cache = cache
+        self.response = response
+        self.key = cache.key(response.request)
+        self.tmp_path = f"{cache.path(self.key)}.{uuid.uuid4().hex}.tmp"
+        self.complete = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        with open(self.tmp_path, "wb") as file:
+            for part in self.response.stream:  # type: ignore
+                file.write(part)
+                yield part
+        self.complete = True
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with open(self.tmp_path, "wb") as file:
+            async for part in self.response.stream:  # type: ignore
+                file.write(part)
+                yield part
+        self.complete = True
+
+    def close(self) -> None:
+        self.response.stream.close()  # type: ignore
+        self.__finish()
+
+    async def aclose(self) -> None:
+        await self.response.stream.aclose()  # type: ignore
+        self.__finish()
+
+    def __finish(self) -> None:
+        if self.complete:
+            self.cache.store(self.key, self.response, self.tmp_path)
+        elif os.path.isfile(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class CachingTransport(httpx.BaseTransport):
+    """
+    Transport that wraps another one, sending conditional requests and
+    answering 304 responses from the HttpCache.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, cache: HttpCache) -> None:
+        self.transport = transport
+        self.cache = cache
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self.cache.conditional(request)
+        response = self.transport.handle_request(request)
+
+        if entry is not None and response.status_code == 304:
+            response.close()
+            if (cached := self.cache.cached_response(request, entry)) is not None:
+                return cached
+            # evicted meanwhile, fetched again
+            self.cache.unconditional(request)
+            response = self.transport.handle_request(request)
+
+        if self.cache.is_cacheable(request, response):
+            response.request = request
+            return httpx.Response(
+                response.status_code,
+                headers=response.headers,
+                stream=_TeeStream(self.cache, response),
+                request=request,
+                extensions=response.extensions,
+            )
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncCachingTransport(httpx.AsyncBaseTransport):
+    """
+    Async version of CachingTransport.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, cache: HttpCache) -> None:
+        self.transport = transport
+        self.cache = cache
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self.cache.conditional(request)
+        response = await self.transport.handle_async_request(request)
+
+        if entry is not None and response.status_code == 304:
+            await response.aclose()
+            if (cached := self.cache.cached_response(request, entry)) is not None:
+                return cached
+            self.cache.unconditional(request)
+            response = await self.transport.handle_async_request(request)
+
+        if self.cache.is_cacheable(request, response):
+            response.request = request
+            return httpx.Response(
+                response.status_code,
+                headers=response.headers,
+                stream=_TeeStream(self.cache, response),
+                request=request,
+                extensions=response.extensions,
+            )
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
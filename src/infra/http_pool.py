@@ -0,0 +1,367 @@
+"""
+This module implements the process wide registry of pooled http clients
+used by all stages. Clients speak HTTP/2 when the server offers it (many
+requests multiplexed on one connection), keep connections alive between
+requests and route each host to its own connection pool behind the proxy,
+with its own connection limit. Connections opened and requests sent are
+counted by host, so the connection reuse shows on the logs.
+
+Sync clients live until the process exits. Async connections belong to
+the event loop that opened them, and each run has its own loop, so async
+clients are shared inside a loop and closed when its last user leaves.
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import weakref
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from src.infra.http_cache import AsyncCachingTransport, CachingTransport, HttpCache
+from src.utils.logger import setup_logger
+
+TIMEOUT = httpx.Timeout(10.0, connect=5.0, pool=4.0)
+
+
+def host_limits(config: str) -> Dict[str, int]:
+    """
+    Connection limits by host from "host=limit" pairs separated by commas,
+    ex: "api.openai.com=16,static.nhtsa.gov=4".
+    """
+    limits: Dict[str, int] = {}
+    for pair in filter(None, (part.strip() for part in config.split(","))):
+        host, _, limit = pair.partition("=")
+        limits[host.strip()] = int(limit)
+    return limits
+
+
+class PoolStats:
+    """
+    Requests and connections by host, fed by the httpcore trace events.
+
+    methods:
+        count_request: counts a request and traces its new connections
+        summary: one line of reuse stats by host
+    """
+
+    def __init__(self) -> None:
+        self.requests: Counter = Counter()
+        self.connections: Counter = Counter()
+        self.handshakes: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def count_request(self, request: httpx.Request, asynchronous: bool) -> None:
+        """
+        Counts a request and sets the trace extension counting its new
+        connections, an async callback for async clients.
+        """
+        host = request.url.host
+        with self.lock:
+            self.requests[host] += 1
+
+        def trace(event: str, _: Dict[str, Any]) -> None:
+            if event.endswith("connect_tcp.complete"):
+                with self.lock:
+                    self.connections[host] += 1
+            elif event.endswith("start_tls.complete"):
+                with self.lock:
+                    self.handshakes[host] += 1
+
+        async def atrace(event: str, info: Dict[str, Any]) -> None:
+            trace(event, info)
+
+        request.extensions["trace"] = atrace if asynchronous else trace
+
+    def summary(self) -> str:
+        """
+        Requests, new connections and reuse ratio of each host.
+        """
+        with self.lock:
+            return "; ".join(
+                f"{host}: {requests} requests, {self.connections[host]} "
+                + f"connections, {self.handshakes[host]} TLS handshakes "
+                + f"({1 - self.connections[host] / requests:.0%} reused)"
+                for host, requests in self.requests.items()
+            )
+
+
+class HostTransport(httpx.BaseTransport):
+    """
+    Routes each host to its own pooled transport.
+
+    Args:
+        factory (Callable[[int], httpx.BaseTransport]): transport with a
+        connection limit
+        limit (Callable[[str], int]): connection limit of a host
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[int], httpx.BaseTransport],
+        limit: Callable[[str], int],
+    ) -> None:
+        self.factory = factory
+        self.limit = limit
+        self.transports: Dict[str, httpx.BaseTransport] = {}
+        self.lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        with self.lock:
+            if host not in self.transports:
+                self.transports[host] = self.factory(self.limit(host))
+            transport = self.transports[host]
+        return transport.handle_request(request)
+
+    def close(self) -> None:
+        for transport in self.transports.values():
+            transport.close()
+
+
+class AsyncHostTransport(httpx.AsyncBaseTransport):
+    """
+    Async version of HostTransport, hosts get at least floor connections.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[int], httpx.AsyncBaseTransport],
+        limit: Callable[[str], int],
+    ) -> None:
+        self.factory = factory
+        self.limit = limit
+        self.floor = 1
+        self.transports: Dict[str, httpx.AsyncBaseTransport] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host not in self.transports:
+            self.transports[host] = self.factory(max(self.limit(host), self.floor))
+        return await self.transports[host].handle_async_request(request)
+
+    async def aclose(self) -> None:
+        for transport in self.transports.values():
+            await transport.aclose()
+
+
+class SharedClient(httpx.Client):
+    """
+    Pooled client kept open by the registry, "with" blocks reuse it and
+    log its stats instead of closing it.
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    stats: PoolStats
+
+    def __enter__(self) -> "SharedClient":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.logger.info("HTTP pool: %s", self.stats.summary())
+
+
+class SharedAsyncClient(httpx.AsyncClient):
+    """
+    Pooled async client of an event loop, closed when the last "async with"
+    block using it ends.
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    stats: PoolStats
+    hosts: AsyncHostTransport
+    users: int
+    release: Callable[[], None]
+
+    async def __aenter__(self) -> "SharedAsyncClient":
+        self.users += 1
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        self.users -= 1
+        if self.users == 0:
+            self.release()
+            await self.aclose()
+            self.logger.info("HTTP pool: %s", self.stats.summary())
+
+
+class ClientPool:
+    """
+    Registry of the pooled clients of the process.
+
+    Args:
+        proxy (Optional[str], optional): proxy of all requests. Defaults to
+        FORD_PROXY env var, no proxy when not set.
+        max_connections (Optional[int], optional): connections of each host.
+        Defaults to HTTP_MAX_CONNECTIONS env var or 32.
+        limits (Optional[Dict[str, int]], optional): connections of some
+        hosts. Defaults to HTTP_HOST_LIMITS env var (see host_limits).
+        http2 (Optional[bool], optional): negotiates HTTP/2. Defaults to
+        HTTP2 env var or True.
+        keepalive_expiry (float, optional): seconds an idle connection is
+        kept. Defaults to 60.
+
+    methods:
+        client: shared sync client
+        async_client: shared async client of the running event loop
+        close: closes the sync clients
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    _default: Optional["ClientPool"] = None
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        proxy: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        limits: Optional[Dict[str, int]] = None,
+        http2: Optional[bool] = None,
+        keepalive_expiry: float = 60,
+    ) -> None:
+        self.proxy = proxy or os.getenv("FORD_PROXY")
+        self.max_connections = max_connections or int(
+            os.getenv("HTTP_MAX_CONNECTIONS", "32")
+        )
+        self.limits = (
+            host_limits(os.getenv("HTTP_HOST_LIMITS", "")) if limits is None else limits
+        )
+        self.http2 = (
+            os.getenv("HTTP2", "true").lower() == "true" if http2 is None else http2
+        )
+        self.keepalive_expiry = keepalive_expiry
+        self.stats = PoolStats()
+        self.clients: Dict[bool, SharedClient] = {}
+        self.async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "ClientPool":
+        """
+        Process wide registry configured by the environment variables, its
+        sync clients are closed at exit.
+
+        Returns:
+            ClientPool: shared registry
+        """
+        if cls._default is None:
+            cls._default = cls()
+            atexit.register(cls._default.close)
+        return cls._default
+
+    def client(self, cache: bool = False) -> SharedClient:
+        """
+        Shared sync client.
+
+        Args:
+            cache (bool, optional): wraps the transport in the persistent
+            conditional response cache (see src.infra.http_cache). Defaults
+            to False.
+
+        Returns:
+            SharedClient: pooled client
+        """
+        with self.lock:
+            if cache not in self.clients:
+                transport: httpx.BaseTransport = HostTransport(
+                    lambda limit: httpx.HTTPTransport(
+                        proxy=self.proxy,
+                        limits=self.__limits(limit),
+                        http2=self.http2,
+                        verify=False,
+                    ),
+                    self.__host_limit,
+                )
+                if cache:
+                    transport = CachingTransport(transport, HttpCache.default())
+                client = SharedClient(
+                    timeout=TIMEOUT,
+                    transport=transport,
+                    verify=False,
+                    event_hooks={
+                        "request": [lambda r: self.stats.count_request(r, False)]
+                    },
+                )
+                client.stats = self.stats
+                self.clients[cache] = client
+            return self.clients[cache]
+
+    def async_client(
+        self, cache: bool = False, max_connections: Optional[int] = None
+    ) -> SharedAsyncClient:
+        """
+        Shared async client of the running event loop, to be called inside
+        of it.
+
+        Args:
+            cache (bool, optional): see client. Defaults to False.
+            max_connections (Optional[int], optional): min connections of the
+            hosts not connected yet, for callers with more requests in flight
+            than the host limit. Defaults to None.
+
+        Returns:
+            SharedAsyncClient: pooled client
+        """
+        clients: Dict[bool, SharedAsyncClient] = self.async_clients.setdefault(
+            asyncio.get_running_loop(), {}
+        )
+        if cache not in clients:
+
+            async def count_request(request: httpx.Request) -> None:
+                self.stats.count_request(request, True)
+
+            hosts = AsyncHostTransport(
+                lambda limit: httpx.AsyncHTTPTransport(
+                    proxy=self.proxy,
+                    limits=self.__limits(limit),
+                    http2=self.http2,
+                    verify=False,
+                    retries=3,
+                ),
+                self.__host_limit,
+            )
+            transport: httpx.AsyncBaseTransport = hosts
+            if cache:
+                transport = AsyncCachingTransport(hosts, HttpCache.default())
+            client = SharedAsyncClient(
+                timeout=TIMEOUT,
+                transport=transport,
+                verify=False,
+                event_hooks={"request": [count_request]},
+            )
+            client.stats, client.hosts, client.users = self.stats, hosts, 0
+            client.release = lambda: clients.pop(cache, None)  # type: ignore
+            clients[cache] = client
+        client = clients[cache]
+        client.hosts.floor = max(client.hosts.floor, max_connections or 1)
+        return client
+
+    def close(self) -> None:
+        """
+        Closes the sync clients and logs the stats of the process.
+        """
+        with self.lock:
+            for client in self.clients.values():
+                httpx.Client.close(client)
+            self.clients.clear()
+        if self.stats.requests:
+            self.logger.info("HTTP pool: %s", self.stats.summary())
+
+    def __host_limit(self, host: str) -> int:
+        return self.limits.get(host, self.max_connections)
+
+    def __limits(self, max_connections: int) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
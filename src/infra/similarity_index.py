@@ -0,0 +1,245 @@
+"""
+This module implements a similarity index over classified texts, so near
+copies of texts already classified (repeated submissions, templated
+narratives of the same defect) reuse their labels instead of a new request.
+
+Texts are reduced to MinHash signatures of their word shingles and indexed
+by locality sensitive hashing bands in sqlite: a lookup only compares the
+entries sharing at least one band with the text, and the label of the most
+similar one is reused when the estimated Jaccard similarity reaches the
+threshold. New labels are added incrementally.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.utils.logger import setup_logger
+
+PRIME = np.uint64((1 << 61) - 1)
+WORD = re.compile(r"[a-z0-9]+")
+
+
+class SimilarityIndex:
+    """
+    MinHash LSH index of classified texts.
+
+    Args:
+        path (str): sqlite database file
+        num_perm (int, optional): hash functions of the signatures. Defaults
+        to 64.
+        bands (int, optional): LSH bands, num_perm must be divisible by it.
+        More bands find less similar candidates. Defaults to 16.
+        shingle (int, optional): words of each shingle. Defaults to 3.
+
+    Raises:
+        ValueError: num_perm not divisible by bands
+
+    methods:
+        signature: MinHash signature of a text
+        lookup_many: labels of the most similar texts indexed
+        add_many: indexes labeled texts
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    _default: Optional["SimilarityIndex"] = None
+
+    def __init__(
+        self, path: str, num_perm: int = 64, bands: int = 16, shingle: int = 3
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError(f"num_perm {num_perm} not divisible by {bands} bands")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle = shingle
+        # fixed seed, signatures must be comparable across runs
+        rng = np.random.default_rng(num_perm)
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)[:, None]
+        self.reused = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    label TEXT,
+                    signature BLOB,
+                    created REAL
+                );
+                CREATE TABLE IF NOT EXISTS bands (key INTEGER, entry INTEGER);
+                CREATE INDEX IF NOT EXISTS bands_key ON bands (key);
+                """
+            )
+
+    @classmethod
+    def default(cls) -> "SimilarityIndex":
+        """
+        Process wide index configured by SIMILARITY_INDEX_PATH environment
+        variable.
+
+        Returns:
+            SimilarityIndex: shared index instance
+        """
+        if cls._default is None:
+            cls._default = cls(
+                os.getenv("SIMILARITY_INDEX_PATH", "./data/cache/similarity.sqlite3")
+            )
+        return cls._default
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        MinHash signature of the word shingles of a text, case and
+        punctuation are ignored.
+
+        Args:
+            text (str): text
+
+        Returns:
+            Optional[np.ndarray]: num_perm hashes, None for texts without words
+        """
+        words = WORD.findall(str(text).casefold())
+        if not words:
+            return None
+        size = min(self.shingle, len(words))
+        shingles = np.fromiter(
+            {
+                zlib.crc32(" ".join(words[i : i + size]).encode())
+                for i in range(len(words) - size + 1)
+            },
+            dtype=np.uint64,
+        )
+        return ((self.a * shingles + self.b) % PRIME).min(axis=1)
+
+    def lookup_many(
+        self, texts: Sequence[str], namespace: str, threshold: float = 0.9
+    ) -> List[Optional[Any]]:
+        """
+        Label of the most similar indexed text of each text.
+
+        Args:
+            texts (Sequence[str]): texts to look up
+            namespace (str): labeling version (ex: hash of the prompt), only
+            labels of the same namespace are reused
+            threshold (float, optional): min estimated Jaccard similarity.
+            Defaults to 0.9.
+
+        Returns:
+            List[Optional[Any]]: label of each text, None when no indexed
+            text is similar enough
+        """
+        signatures = [self.signature(text) for text in texts]
+        keys = [self.__band_keys(sig, namespace) for sig in signatures]
+        candidates, entries = self.__candidates(
+            {key for group in keys for key in group}
+        )
+
+        labels: List[Optional[Any]] = []
+        for signature, group in zip(signatures, keys):
+            best, label = threshold, None
+            for entry in {e for key in group for e in candidates.get(key, ())}:
+                stored, stored_label = entries[entry]
+                similarity = float(np.mean(stored == signature))
+                if similarity >= best:
+                    best, label = similarity, stored_label
+            labels.append(label)
+
+        found = sum(label is not None for label in labels)
+        self.reused += found
+        self.logger.info(
+            "Similarity index: %s of %s texts reuse a label", found, len(texts)
+        )
+        return labels
+
+    def add_many(self, texts: Sequence[str], labels: Sequence[Any], namespace: str):
+        """
+        Indexes labeled texts.
+
+        Args:
+            texts (Sequence[str]): classified texts
+            labels (Sequence[Any]): json serializable label of each text
+            namespace (str): labeling version, see lookup_many
+        """
+        now = time.time()
+        with self.lock, self.conn:
+            for text, label in zip(texts, labels):
+                if (signature := self.signature(text)) is None:
+                    continue
+                entry = self.conn.execute(
+                    "INSERT INTO entries (label, signature, created) VALUES (?, ?, ?)",
+                    (json.dumps(label), signature.astype("<u8").tobytes(), now),
+                ).lastrowid
+                self.conn.executemany(
+                    "INSERT INTO bands VALUES (?, ?)",
+                    ((key, entry) for key in self.__band_keys(signature, namespace)),
+                )
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __band_keys(self, signature: Optional[np.ndarray], namespace: str):
+        if signature is None:
+            return []
+        rows = self.num_perm // self.bands
+        return [
+            int.from_bytes(
+                hashlib.blake2b(
+                    namespace.encode()
+                    + band.to_bytes(2, "little")
+                    + signature[band * rows : (band + 1) * rows]
+                    .astype("<u8")
+                    .tobytes(),
+                    digest_size=8,
+                ).digest(),
+                "little",
+                signed=True,
+            )
+            for band in range(self.bands)
+        ]
+
+    def __candidates(
+        self, keys: Set[int]
+    ) -> Tuple[Dict[int, List[int]], Dict[int, Tuple[np.ndarray, Any]]]:
+        """
+        Entries of each band key, and the signature and label of each entry.
+        """
+        keys_list = list(keys)
+        candidates: Dict[int, List[int]] = {}
+        signatures: Dict[int, Tuple[np.ndarray, Any]] = {}
+        with self.lock:
+            for start in range(0, len(keys_list), 500):  # sqlite variables limit
+                part = keys_list[start : start + 500]
+                for key, entry in self.conn.execute(
+                    "SELECT key, entry FROM bands WHERE key IN "
+                    + f"({', '.join('?' * len(part))})",
+                    part,
+                ):
+                    candidates.setdefault(key, []).append(entry)
+            entries = list({e for group in candidates.values() for e in group})
+            for start in range(0, len(entries), 500):
+                part = entries[start : start + 500]
+                for entry, label, signature in self.conn.execute(
+                    "SELECT id, label, signature FROM entries WHERE id IN "
+                    + f"({', '.join('?' * len(part))})",
+                    part,
+                ):
+                    signatures[entry] = (
+                        np.frombuffer(signature, dtype="<u8"),
+                        json.loads(label),
+                    )
+        return candidates, signatures
@@ -0,0 +1,118 @@
+"""
+This module defines some test cases for the OAuth token manager
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from src.infra import auth as module
+from src.infra.auth import BearerAuth, TokenManager
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    """
+    test setup mocking the token endpoint, each token is numbered and lives
+    for "expires_in" seconds
+
+    Returns:
+        Dict[str, Any]: tokens issued and their lifetime
+    """
+    endpoint = {"issued": 0, "expires_in": 3600}
+    lock = threading.Lock()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(0.02)
+        with lock:
+            endpoint["issued"] += 1
+            token = f"token-{endpoint['issued']}"
+        return httpx.Response(
+            200,
+            json={"access_token": token, "expires_in": endpoint["expires_in"]},
+        )
+
+    monkeypatch.setattr(
+        module,
+        "create_client",
+        lambda **_: httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+    return endpoint
+
+
+def test_token_manager_cache_sucess(setup):
+    """
+    Test case for tokens cached by scope, concurrent callers share a request
+    """
+    manager = TokenManager("http://login")
+    threads = [threading.Thread(target=manager.get, args=("api",)) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert setup["issued"] == 1
+    assert manager.get("api") == "token-1"
+    assert manager.get("other") == "token-2"
+    manager.close()
+
+
+def test_token_manager_background_refresh_sucess(setup):
+    """
+    Test case for the token refreshed before its expiry
+    """
+    setup["expires_in"] = 1
+    manager = TokenManager("http://login", refresh_ahead=0.8)
+
+    assert manager.get("api") == "token-1"
+    time.sleep(0.7)
+    manager.close()
+
+    assert setup["issued"] >= 2
+    assert manager.get("api") != "token-1"
+
+
+def test_token_manager_short_lived_token_sucess(setup):
+    """
+    Test case for a token living less than refresh_ahead, refreshed halfway
+    through its lifetime instead of in a loop
+    """
+    setup["expires_in"] = 0.4
+    manager = TokenManager("http://login")
+
+    assert manager.get("api") == "token-1"
+    time.sleep(0.3)
+    manager.close()
+
+    assert setup["issued"] == 2
+
+
+def test_bearer_auth_replays_on_401_sucess(setup):
+    """
+    Test case for requests rejected with an old token, replayed once with a
+    single new token
+    """
+    manager = TokenManager("http://login")
+    revoked = {manager.get("api")}
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+        seen.append(token)
+        return httpx.Response(401 if token in revoked else 200)
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), auth=BearerAuth("api", manager)
+        ) as client:
+            return await asyncio.gather(*(client.get("http://api") for _ in range(8)))
+
+    responses = asyncio.run(run())
+    manager.close()
+
+    assert [response.status_code for response in responses] == [200] * 8
+    assert setup["issued"] == 2  # one refresh for all the rejected requests
+    assert seen.count("token-1") == 8 and seen.count("token-2") == 8
@@ -0,0 +1,57 @@
+"""
+This module defines some test cases for the micro-batch checkpoints
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from src.infra.checkpoint import BatchCheckpoint
+
+
+@pytest.fixture
+def setup(tmp_path):
+    """
+    test setup with an empty checkpoint and a batch of complaints
+
+    Returns:
+        Tuple[BatchCheckpoint, pd.DataFrame]: checkpoint and input rows
+    """
+    batch = pd.DataFrame(
+        {"ODINO": [11_000_000, 11_000_001], "CDESCR": ["DOOR FELL OFF", None]},
+        index=[10, 11],
+    )
+    return BatchCheckpoint("NHTSA_VOQs", str(tmp_path)), batch
+
+
+def test_checkpoint_key_sucess(setup):
+    """
+    Test case for batch keys stable on equal rows and options only
+    """
+    checkpoint, batch = setup
+
+    assert checkpoint.key(batch, "a") == checkpoint.key(batch.copy(), "a")
+    assert checkpoint.key(batch, "a") != checkpoint.key(batch, "b")
+    assert checkpoint.key(batch) != checkpoint.key(batch.iloc[:1])
+    assert checkpoint.key(batch) != checkpoint.key(batch.set_axis([0, 1]))
+
+
+def test_checkpoint_commit_sucess(setup, tmp_path):
+    """
+    Test case for committed batches restored by a new run, and cleared
+    """
+    checkpoint, batch = setup
+    key = checkpoint.key(batch)
+    transformed = batch.assign(FUNCTION_=["F8", "NOT F8"])
+
+    assert checkpoint.get(key) is None
+    checkpoint.put(key, transformed)
+    assert os.listdir(checkpoint.path) == [f"{key}.pkl"]
+
+    restarted = BatchCheckpoint("NHTSA_VOQs", str(tmp_path))
+    pd.testing.assert_frame_equal(restarted.get(key), transformed)
+    assert restarted.restored == 1
+
+    restarted.clear()
+    assert checkpoint.get(key) is None
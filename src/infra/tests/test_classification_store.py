@@ -0,0 +1,104 @@
+"""
+This module defines some test cases for the persistent classification store
+"""
+
+import httpx
+import pytest
+
+from src.infra import classifier as module
+from src.infra.classification_store import ClassificationStore
+from src.infra.classifier import MODEL, Classifier, chat_content
+
+
+@pytest.fixture
+def setup(monkeypatch, tmp_path):
+    """
+    test setup mocking the classification endpoint and an empty store
+
+    Returns:
+        Tuple[ClassificationStore, List[str]]: store and messages sent
+    """
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        message = httpx.Response(200, content=request.content).json()
+        message = message["messages"][0]["content"]
+        sent.append(message)
+        if message.startswith("broken"):
+            return httpx.Response(400)
+        if message.startswith("vague"):
+            return httpx.Response(200, json={"content": "I cannot tell"})
+        return httpx.Response(200, json={"content": f"F8~~~{message.upper()}"})
+
+    monkeypatch.setattr(
+        module,
+        "create_async_client",
+        lambda **_: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return ClassificationStore(str(tmp_path / "store.sqlite3")), sent
+
+
+def test_store_key_sucess():
+    """
+    Test case for keys ignoring case and spacing of the text only
+    """
+    key = ClassificationStore.key("The door  fell\noff", "prompt v1", MODEL)
+
+    assert key == ClassificationStore.key(" THE DOOR FELL OFF ", "prompt v1", MODEL)
+    assert key != ClassificationStore.key("THE DOOR FELL OFF", "prompt v2", MODEL)
+    assert key != ClassificationStore.key("THE DOOR FELL OFF", "prompt v1", "gpt-5")
+
+
+def test_store_skips_known_texts_sucess(setup):
+    """
+    Test case for re-runs only sending texts never classified
+    """
+    store, sent = setup
+    texts = ["door fell off", "Door fell  off", "hood rattles", "broken case"]
+
+    def run(texts):
+        engine = Classifier("http://llm", "token", rate=1000, tries=1, store=store)
+        return engine.classify(
+            [chat_content(text + " prompt") for text in texts],
+            lambda answer: answer.split("~~~")[1],
+            "NOT CLASSIFIED",
+            keys=[store.key(text, " prompt", MODEL) for text in texts],
+        )
+
+    first = run(texts)
+    second = run(texts + ["window broke"])
+
+    assert first == ["DOOR FELL OFF PROMPT"] * 2 + ["HOOD RATTLES PROMPT"] + [
+        "NOT CLASSIFIED"
+    ]
+    assert second == first + ["WINDOW BROKE PROMPT"]
+    assert sent == [
+        "door fell off prompt",
+        "hood rattles prompt",
+        "broken case prompt",
+        "broken case prompt",  # failed answers are not stored
+        "window broke prompt",
+    ]
+    assert (store.hits, store.misses, len(store)) == (2, 5, 3)
+
+
+def test_store_skips_rejected_answers_sucess(setup):
+    """
+    Test case for answers parsed into the default not being stored, they
+    are sent again on the next run
+    """
+    store, sent = setup
+    texts = ["door fell off", "vague case"]
+
+    def run():
+        engine = Classifier("http://llm", "token", rate=1000, tries=1, store=store)
+        return engine.classify(
+            [chat_content(text) for text in texts],
+            lambda answer: answer.split("~~~")[1] if "~~~" in answer else "-",
+            "-",
+            keys=[store.key(text, "", MODEL) for text in texts],
+        )
+
+    assert run() == run() == ["DOOR FELL OFF", "-"]
+    assert sorted(sent) == ["door fell off", "vague case", "vague case"]
+    assert len(store) == 1
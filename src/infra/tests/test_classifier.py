@@ -0,0 +1,213 @@
+"""
+This module defines some test cases for the async classification engine
+"""
+
+import asyncio
+import random
+import time
+
+import httpx
+import pytest
+
+from src.errors.transform_error import TransformError
+from src.infra import classifier as module
+from src.infra.classifier import BatchOptions, Classifier, chat_content
+from src.infra.concurrency import AdaptiveLimiter
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    """
+    test setup mocking the classification endpoint, it answers the message
+    back after a random delay and fails the first try of "flaky" messages
+
+    Returns:
+        Dict[str, int]: counters of requests sent and in flight
+    """
+    stats = {"sent": 0, "in_flight": 0, "max_in_flight": 0}
+    tried = set()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        message = httpx.Response(200, content=request.content).json()
+        message = message["messages"][0]["content"]
+        stats["sent"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        await asyncio.sleep(random.uniform(0.001, 0.02))
+        stats["in_flight"] -= 1
+
+        if message == "broken":
+            return httpx.Response(400)
+        if message.startswith("flaky") and message not in tried:
+            tried.add(message)
+            return httpx.Response(503)
+        return httpx.Response(200, json={"content": f"F8~~~{message}\nextra"})
+
+    monkeypatch.setattr(
+        module,
+        "create_async_client",
+        lambda **_: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return stats
+
+
+def test_classifier_keeps_order_sucess(setup):
+    """
+    Test case for results in prompt order with bounded concurrency
+    """
+    messages = [f"case {i}" for i in range(40)] + ["flaky 1", "broken"]
+    engine = Classifier(
+        "http://llm",
+        "token",
+        concurrency=4,
+        rate=1000,
+        delay=0,
+        limiter=AdaptiveLimiter(initial=4, maximum=4),
+    )
+
+    results = engine.classify(
+        [chat_content(message) for message in messages],
+        lambda answer: answer.split("\n")[0].split("~~~")[1],
+        "NOT CLASSIFIED",
+    )
+
+    assert results == messages[:-1] + ["NOT CLASSIFIED"]
+    assert setup["max_in_flight"] <= 4
+    assert setup["sent"] == len(messages) + 1  # flaky is retried once
+
+
+def test_classifier_rate_limit_sucess(setup):
+    """
+    Test case for the token bucket spacing requests
+    """
+    engine = Classifier("http://llm", "token", concurrency=2, rate=50)
+
+    start = time.perf_counter()
+    engine.classify([chat_content(str(i)) for i in range(12)], str, "")
+
+    # 2 requests of burst, the other 10 wait for tokens at 50 per second
+    assert time.perf_counter() - start >= 0.18
+
+
+def test_classifier_batches_sucess(monkeypatch):
+    """
+    Test case for batched prompts, items missing in an answer are re-sent
+    """
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        message = httpx.Response(200, content=request.content).json()
+        message = message["messages"][0]["content"]
+        sent.append(message)
+        lines = [line for line in message.split("\n")[1:] if "skip" not in line]
+        answer = "Answers:\n" + "\n".join(f"{line.upper()}~~~OK" for line in lines)
+        if not lines:  # single request
+            answer = f"{message.split('|')[0].upper()}~~~OK"
+        return httpx.Response(200, json={"content": answer})
+
+    monkeypatch.setattr(
+        module,
+        "create_async_client",
+        lambda **_: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    texts = [f"case {i}" for i in range(7)] + ["skip me"]
+    engine = Classifier("http://llm", "token", rate=1000)
+
+    results = engine.classify(
+        [chat_content(f"{text}|single") for text in texts],
+        str,
+        "NOT CLASSIFIED",
+        batch=BatchOptions(
+            texts, "instructions", size=3, is_valid=lambda a: "~~~" in a
+        ),
+    )
+
+    assert results == [f"CASE {i}~~~OK" for i in range(7)] + ["SKIP ME~~~OK"]
+    assert len(sent) == 4 and sent[-1] == "skip me|single"
+
+
+def test_classifier_releases_slots_sucess(monkeypatch):
+    """
+    Test case for the limiter slots released by requests raising an error
+    or cancelled while waiting for the rate limit
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise RuntimeError("handler failed")
+
+    monkeypatch.setattr(
+        module,
+        "create_async_client",
+        lambda **_: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    limiter = AdaptiveLimiter(initial=4, maximum=4)
+    engine = Classifier("http://llm", "token", concurrency=1, rate=1, limiter=limiter)
+
+    with pytest.raises(RuntimeError):
+        engine.classify([chat_content(str(i)) for i in range(8)], str, "")
+
+    assert limiter.in_flight == 0
+
+
+def test_classifier_malformed_answers_sucess(monkeypatch):
+    """
+    Test case for malformed answers failing on their own, and for too many
+    failures raising
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        message = httpx.Response(200, content=request.content).json()
+        message = message["messages"][0]["content"]
+        if message == "no content":
+            return httpx.Response(200, json={"error": "empty"})
+        if message == "not json":
+            return httpx.Response(200, text="<html>")
+        return httpx.Response(200, json={"content": message})
+
+    monkeypatch.setattr(
+        module,
+        "create_async_client",
+        lambda **_: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    engine = Classifier("http://llm", "token", rate=1000, max_failed=0.5)
+    messages = ["a", "no content", "b", "not json"]
+
+    results = engine.classify([chat_content(m) for m in messages], str, "-")
+
+    assert results == ["a", "-", "b", "-"]
+    with pytest.raises(TransformError):
+        engine.classify([chat_content(m) for m in messages[1:]], str, "-")
+
+
+def test_classifier_slow_slots_sucess(monkeypatch):
+    """
+    Test case for the limit kept when the slots are slower and slower to
+    acquire but the endpoint answers as fast
+    """
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"content": "ok"})
+
+    monkeypatch.setattr(
+        module,
+        "create_async_client",
+        lambda **_: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    limiter = AdaptiveLimiter(initial=4, maximum=4, window=4)
+    acquire, calls = limiter.acquire, []
+
+    async def slow_acquire() -> None:
+        calls.append(None)
+        await asyncio.sleep(0.01 * len(calls))
+        await acquire()
+
+    monkeypatch.setattr(limiter, "acquire", slow_acquire)
+    engine = Classifier(
+        "http://llm", "token", concurrency=1, rate=1000, limiter=limiter
+    )
+
+    results = engine.classify([chat_content(str(i)) for i in range(12)], str, "")
+
+    assert results == ["ok"] * 12
+    assert limiter.limit == 4
@@ -0,0 +1,234 @@
+"""
+This module defines some test cases for the adaptive concurrency control
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from src.errors.transform_error import TransformError
+from src.infra import classifier as module
+from src.infra import concurrency
+from src.infra.classifier import Classifier, chat_content
+from src.infra.concurrency import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    AdaptiveLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    """
+    test setup with a controllable clock for the limiter and the breaker
+
+    Returns:
+        Dict[str, float]: current time, edit "now" to move the clock
+    """
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(
+        concurrency, "time", SimpleNamespace(monotonic=lambda: clock["now"])
+    )
+    return clock
+
+
+def test_limiter_aimd_sucess(setup):
+    """
+    Test case for the additive increase and multiplicative decrease
+    """
+    limiter = AdaptiveLimiter(initial=4, maximum=6, window=1000)
+
+    async def run(requests: int, overloaded: bool = False):
+        for _ in range(requests):
+            await limiter.acquire()
+            await limiter.release(0.1, overloaded)
+
+    asyncio.run(run(5))
+    assert int(limiter.limit) == 5  # about one slot after limit healthy requests
+    asyncio.run(run(100))
+    assert limiter.limit == 6
+
+    asyncio.run(run(3, overloaded=True))
+    assert limiter.limit == 3  # a single cut for a burst of overloads
+    setup["now"] += 2
+    asyncio.run(run(1, overloaded=True))
+    assert limiter.limit == 1.5
+    setup["now"] += 2
+    asyncio.run(run(1, overloaded=True))
+    assert limiter.limit == 1  # minimum
+
+
+def test_limiter_p95_regression_sucess(setup):
+    """
+    Test case for the limit cut when the p95 latency regresses
+    """
+    limiter = AdaptiveLimiter(initial=8, window=20, tolerance=2.0)
+
+    async def run(latency: float):
+        for _ in range(20):
+            await limiter.acquire()
+            await limiter.release(latency)
+
+    asyncio.run(run(0.1))
+    asyncio.run(run(0.15))  # slower, under tolerance
+    healthy = limiter.limit
+    assert healthy > 8
+
+    asyncio.run(run(0.5))
+    assert limiter.limit < healthy * 0.75  # halved at the end of the window
+
+
+def test_limiter_bounds_in_flight_sucess(setup):
+    """
+    Test case for the requests in flight kept under the limit
+    """
+    limiter = AdaptiveLimiter(initial=3, maximum=3)
+    stats = {"in_flight": 0, "max": 0}
+
+    async def request():
+        await limiter.acquire()
+        stats["in_flight"] += 1
+        stats["max"] = max(stats["max"], stats["in_flight"])
+        await asyncio.sleep(0.001)
+        stats["in_flight"] -= 1
+        await limiter.release(0.001)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(30)))
+
+    asyncio.run(run())
+    asyncio.run(run())  # a new event loop keeps the limit
+    assert stats["max"] == 3 and limiter.in_flight == 0
+
+
+def test_limiter_shared_by_loops_sucess(setup):
+    """
+    Test case for pipelines running concurrently, each one on its own event
+    loop, sharing the slots of the limiter
+    """
+    limiter = AdaptiveLimiter(initial=3, maximum=3)
+    stats = {"in_flight": 0, "max": 0}
+    lock = threading.Lock()
+
+    async def request():
+        await limiter.acquire()
+        with lock:
+            stats["in_flight"] += 1
+            stats["max"] = max(stats["max"], stats["in_flight"])
+        await asyncio.sleep(0.002)
+        with lock:
+            stats["in_flight"] -= 1
+        await limiter.release(0.002)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(30)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(run(),)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert stats["max"] == 3 and limiter.in_flight == 0
+
+
+def test_breaker_states_sucess(setup):
+    """
+    Test case for the breaker opening, failing fast and closing on a probe
+    """
+    breaker = CircuitBreaker(failures=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.check()
+        breaker.record(False)
+    breaker.check()
+    breaker.record(True)  # consecutive failures only
+    assert breaker.state == CLOSED
+
+    for _ in range(3):
+        breaker.check()
+        breaker.record(False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    setup["now"] += 30
+    assert breaker.state == HALF_OPEN
+    breaker.check()  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record(False)
+    assert breaker.state == OPEN
+
+    setup["now"] += 30
+    breaker.check()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_classifier_endpoint_down_sucess(monkeypatch):
+    """
+    Test case for the classifier failing fast and cutting its limit while
+    the endpoint is down
+    """
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        return httpx.Response(503)
+
+    monkeypatch.setattr(
+        module,
+        "create_async_client",
+        lambda **_: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    limiter = AdaptiveLimiter(initial=8)
+    breaker = CircuitBreaker(failures=5)
+    engine = Classifier(
+        "http://down", "token", rate=1000, delay=0, limiter=limiter, breaker=breaker
+    )
+
+    with pytest.raises(TransformError):
+        engine.classify([chat_content(str(i)) for i in range(50)], str, "")
+
+    assert breaker.state == OPEN
+    assert len(sent) < 20  # 200 requests without the breaker
+    assert limiter.limit < 8
+
+
+def test_classifier_probe_raising_sucess(setup, monkeypatch):
+    """
+    Test case for a half open probe raising, the next request probes again
+    instead of being refused for good
+    """
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            raise RuntimeError("handler failed")
+        return httpx.Response(200, json={"content": "ok"})
+
+    monkeypatch.setattr(
+        module,
+        "create_async_client",
+        lambda **_: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    breaker = CircuitBreaker(failures=1, reset_timeout=30)
+    breaker.check()
+    breaker.record(False)
+    setup["now"] += 30
+    engine = Classifier("http://llm", "token", rate=1000, breaker=breaker)
+
+    with pytest.raises(RuntimeError):
+        engine.classify([chat_content("probe")], str, "")
+
+    assert breaker.state == HALF_OPEN and not breaker.probing
+    assert engine.classify([chat_content("probe")], str, "") == ["ok"]
+    assert breaker.state == CLOSED
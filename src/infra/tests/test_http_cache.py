@@ -0,0 +1,115 @@
+"""
+This module defines some test cases for the persistent conditional HTTP
+response cache
+"""
+
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from src.infra.http_cache import AsyncCachingTransport, CachingTransport, HttpCache
+
+
+@pytest.fixture
+def setup():
+    """
+    test setup mocking a server that answers 304 to known ETags
+
+    Returns:
+        Tuple[httpx.MockTransport, List[int]]: server transport and status sent
+    """
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        etag = f'"{request.url.path}"'
+        status = 304 if request.headers.get("If-None-Match") == etag else 200
+        sent.append(status)
+        body = b"" if status == 304 else request.url.path.encode() * 100
+        return httpx.Response(status, headers={"ETag": etag}, content=body)
+
+    return httpx.MockTransport(handler), sent
+
+
+def test_cache_serves_not_modified_from_disk(setup, tmp_path):
+    """
+    Test case for serving 304 responses with the body saved on disk
+    """
+    server, sent = setup
+    cache = HttpCache(str(tmp_path), max_bytes=1024**2)
+
+    with httpx.Client(transport=CachingTransport(server, cache)) as client:
+        first = client.get("https://example.com/listing").content
+        second = client.get("https://example.com/listing")
+
+    assert sent == [200, 304]
+    assert second.status_code == 200
+    assert second.content == first
+    assert second.extensions["from_cache"]
+
+
+def test_async_cache_serves_not_modified_from_disk(setup, tmp_path):
+    """
+    Test case for the async transport of the cache
+    """
+    server, sent = setup
+    cache = HttpCache(str(tmp_path), max_bytes=1024**2)
+
+    async def fetch_twice():
+        transport = AsyncCachingTransport(server, cache)
+        async with httpx.AsyncClient(transport=transport) as client:
+            first = (await client.get("https://example.com/recalls.csv")).content
+            second = (await client.get("https://example.com/recalls.csv")).content
+        return first, second
+
+    first, second = asyncio.run(fetch_twice())
+
+    assert sent == [200, 304]
+    assert first == second
+
+
+def test_cache_evicts_least_recently_used(setup, tmp_path):
+    """
+    Test case for the size cap of the cache
+    """
+    server, _ = setup
+    cache = HttpCache(str(tmp_path), max_bytes=2500)
+
+    with httpx.Client(transport=CachingTransport(server, cache)) as client:
+        for path in ("/aaaaaaaaaa", "/bbbbbbbbbb", "/cccccccccc"):
+            client.get(f"https://example.com{path}").read()
+
+    assert (
+        cache.lookup(cache.key(httpx.Request("GET", "https://example.com/aaaaaaaaaa")))
+        is None
+    )
+    assert cache.lookup(
+        cache.key(httpx.Request("GET", "https://example.com/cccccccccc"))
+    )
+
+
+def test_cache_entry_evicted_before_not_modified(setup, tmp_path):
+    """
+    Test case for an entry evicted while its conditional request is sent,
+    the body is fetched again
+    """
+    server, sent = setup
+    cache = HttpCache(str(tmp_path), max_bytes=1024**2)
+    url = "https://example.com/listing"
+
+    def evicting(request: httpx.Request) -> httpx.Response:
+        if "If-None-Match" in request.headers:
+            os.remove(cache.path(cache.key(request)))
+        return server.handle_request(request)
+
+    with httpx.Client(transport=CachingTransport(server, cache)) as client:
+        first = client.get(url).content
+    with httpx.Client(
+        transport=CachingTransport(httpx.MockTransport(evicting), cache)
+    ) as client:
+        second = client.get(url)
+
+    assert sent == [200, 304, 200]
+    assert second.content == first
+    assert "from_cache" not in second.extensions
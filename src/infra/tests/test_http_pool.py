@@ -0,0 +1,91 @@
+"""
+This module defines some test cases for the pooled http clients
+"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.infra.http_pool import ClientPool, host_limits
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):  # pylint: disable=C0103
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *_):
+        pass
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    """
+    test setup with a local keep-alive server and a pool without proxy
+
+    Returns:
+        Tuple[ClientPool, str]: pool and server url
+    """
+    monkeypatch.delenv("FORD_PROXY", raising=False)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    pool = ClientPool(limits={"127.0.0.1": 2}, http2=False)
+    yield pool, f"http://127.0.0.1:{server.server_address[1]}/"
+    pool.close()
+    server.shutdown()
+
+
+def test_pool_reuses_connections_sucess(setup):
+    """
+    Test case for a single connection reused by all "with" blocks
+    """
+    pool, url = setup
+    for _ in range(3):
+        with pool.client() as client:
+            for _ in range(4):
+                assert client.get(url).text == "ok"
+
+    assert pool.client() is client and not client.is_closed
+    assert pool.stats.requests["127.0.0.1"] == 12
+    assert pool.stats.connections["127.0.0.1"] == 1
+    assert "(92% reused)" in pool.stats.summary()
+
+
+def test_pool_async_clients_sucess(setup):
+    """
+    Test case for async clients shared inside an event loop and closed with
+    its last user
+    """
+    pool, url = setup
+
+    async def run():
+        async with pool.async_client(max_connections=2) as first:
+            async with pool.async_client() as second:
+                assert first is second
+                await asyncio.gather(*(second.get(url) for _ in range(10)))
+            assert not first.is_closed
+        return first
+
+    client = asyncio.run(run())
+    assert client.is_closed and client.hosts.floor == 2
+    assert asyncio.run(run()) is not client
+    assert pool.stats.requests["127.0.0.1"] == 20
+    assert pool.stats.connections["127.0.0.1"] == 4  # host limit of 2 by loop
+
+
+def test_host_limits_sucess():
+    """
+    Test case for the host limits configuration
+    """
+    assert host_limits("") == {}
+    assert host_limits("api.example.com=16, static.nhtsa.gov=4,") == {
+        "api.example.com": 16,
+        "static.nhtsa.gov": 4,
+    }
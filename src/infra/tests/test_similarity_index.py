@@ -0,0 +1,86 @@
+"""
+This module defines some test cases for the similarity index of classified
+complaints
+"""
+
+import pytest
+
+from src.infra.similarity_index import SimilarityIndex
+
+TEMPLATE = (
+    "TL* THE CONTACT OWNS A 2015 FORD F-150. WHILE DRIVING {speed} MPH, THE "
+    + "DRIVER SIDE DOOR OPENED WITHOUT WARNING. THE VEHICLE WAS NOT REPAIRED. "
+    + "THE MANUFACTURER WAS NOT NOTIFIED OF THE FAILURE. THE FAILURE MILEAGE "
+    + "WAS {miles}."
+)
+
+
+@pytest.fixture
+def setup(tmp_path):
+    """
+    test setup with an index of two classified complaints
+
+    Returns:
+        Tuple[SimilarityIndex, str]: index and its database path
+    """
+    path = str(tmp_path / "similarity.sqlite3")
+    index = SimilarityIndex(path)
+    index.add_many(
+        [
+            TEMPLATE.format(speed=45, miles="52,000"),
+            "THE ENGINE STALLED ON THE HIGHWAY AND THE TRANSMISSION SLIPPED.",
+        ],
+        [["F8", "DOOR LATCH", "OWD"], ["NOT F8", "~", "~"]],
+        "v1",
+    )
+    return index, path
+
+
+def test_lookup_near_copies_sucess(setup):
+    """
+    Test case for near copies reusing labels, other texts and versions not
+    """
+    index, path = setup
+
+    labels = index.lookup_many(
+        [
+            TEMPLATE.format(speed=45, miles="52,000").lower(),
+            TEMPLATE.format(speed=35, miles="52,000"),
+            "MY RADIO DOES NOT TURN ON WHEN IT IS COLD OUTSIDE.",
+            "",
+        ],
+        "v1",
+        threshold=0.7,
+    )
+
+    assert labels == [
+        ["F8", "DOOR LATCH", "OWD"],
+        ["F8", "DOOR LATCH", "OWD"],
+        None,
+        None,
+    ]
+    assert index.lookup_many([TEMPLATE.format(speed=45, miles="52,000")], "v2") == [
+        None
+    ]
+    assert index.reused == 2
+    # signatures are stable across processes
+    assert SimilarityIndex(path).lookup_many(
+        ["THE ENGINE STALLED ON THE HIGHWAY AND THE TRANSMISSION SLIPPED!"], "v1"
+    ) == [["NOT F8", "~", "~"]]
+
+
+def test_index_incremental_sucess(setup):
+    """
+    Test case for labels added after a lookup being found by the next one
+    """
+    index, _ = setup
+    text = "THE REAR WINDOW SHATTERED WHILE PARKED, NO IMPACT, NO ONE AROUND."
+
+    assert index.lookup_many([text], "v1") == [None]
+
+    index.add_many([text, "   "], [["F8", "REAR WINDOW", "SHATTERED"], ["x"]], "v1")
+
+    assert index.lookup_many([text], "v1") == [["F8", "REAR WINDOW", "SHATTERED"]]
+    assert len(index) == 3
+    with pytest.raises(ValueError):
+        SimilarityIndex("unused.sqlite3", num_perm=64, bands=10)
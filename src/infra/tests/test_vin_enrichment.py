@@ -0,0 +1,103 @@
+"""
+This module defines some test cases for the VIN enrichment service
+"""
+
+import httpx
+import pandas as pd
+import pytest
+
+from src.infra import vin_enrichment as module
+from src.infra.vin_enrichment import VIN_FIELDS, VinEnricher, VinStore
+
+
+@pytest.fixture
+def setup(monkeypatch, tmp_path):
+    """
+    test setup mocking the GSAR WERS endpoint and an empty store, unknown
+    VINs answer 404 and "FLAKY" VINs fail their first try
+
+    Returns:
+        Tuple[VinStore, List[str]]: store and VINs requested
+    """
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        vin = request.url.params["vin"]
+        sent.append(vin)
+        if vin.startswith("UNKNOWN"):
+            return httpx.Response(404)
+        if vin.startswith("FLAKY") and sent.count(vin) == 1:
+            return httpx.Response(503)
+        return httpx.Response(
+            200, json={"prodDate": "01-JAN-2020", "plant": vin[-3:], "other": 1}
+        )
+
+    monkeypatch.setattr(
+        module,
+        "create_async_client",
+        lambda **_: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return VinStore(str(tmp_path / "vins.sqlite3"), ttl=3600), sent
+
+
+def test_enrich_joins_unique_vins_sucess(setup):
+    """
+    Test case for each valid VIN requested once and joined back on its rows
+    """
+    store, sent = setup
+    vins = pd.Series(
+        [
+            "1FA6P8TH0J5100001",
+            " ~ ",
+            "1FA6P8TH0J5100001",
+            "1FA6P8TH0J51*****",
+            "UNKNOWN0J51000002",
+            "FLAKY8TH0J5100003",
+            None,
+        ],
+        index=range(10, 17),
+    )
+    enricher = VinEnricher("http://gsar", "token", store=store, delay=0)
+
+    enriched = enricher.enrich(vins)
+
+    assert list(enriched.columns) == list(VIN_FIELDS.values())
+    assert list(enriched.index) == list(vins.index)
+    assert list(enriched["ASSEMBLY_PLANT"]) == ["001", "", "001", "", "", "003", ""]
+    assert enriched.loc[10, "PROD_DATE"] == "01-JAN-2020"
+    assert enriched.loc[10, "VEHICLE_LINE_WERS"] == ""
+    assert sorted(sent) == sorted(
+        [
+            "1FA6P8TH0J5100001",
+            "UNKNOWN0J51000002",
+            "FLAKY8TH0J5100003",
+            "FLAKY8TH0J5100003",
+        ]
+    )
+
+    enricher.enrich(vins)  # answers and unknown VINs come from the store
+
+    assert len(sent) == 4
+
+
+def test_store_expires_answers_sucess(tmp_path):
+    """
+    Test case for answers older than the time to live being ignored
+    """
+    path = str(tmp_path / "vins.sqlite3")
+    VinStore(path, ttl=3600).put_many({"1FA6P8TH0J5100001": {"plant": "001"}})
+
+    assert VinStore(path, ttl=3600).get_many(["1FA6P8TH0J5100001"]) == {
+        "1FA6P8TH0J5100001": {"plant": "001"}
+    }
+    assert VinStore(path, ttl=-1).get_many(["1FA6P8TH0J5100001"]) == {}
+
+
+def test_vin_store_default_sucess(tmp_path, monkeypatch):
+    """
+    Test case for a single process wide store, a connection opened once
+    """
+    monkeypatch.setenv("VIN_STORE_PATH", str(tmp_path / "vins.sqlite3"))
+    monkeypatch.setattr(VinStore, "_default", None)
+
+    assert VinStore.default() is VinStore.default()
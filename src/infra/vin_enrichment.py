@@ -0,0 +1,221 @@
+"""
+This module implements the VIN enrichment service, which fills the vehicle
+columns of the complaints from the GSAR WERS endpoint. VINs are
+deduplicated and validated up front, the unknown ones are queried
+concurrently on a pooled async client and the answers are saved in a local
+store with a time to live, so the next runs only query new VINs.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+import pandas as pd
+
+from src.infra.auth import StaticBearerAuth, gsar_auth
+from src.utils.funtions import create_async_client
+from src.utils.logger import setup_logger
+
+# GSAR WERS answer fields and the complaint columns they fill
+VIN_FIELDS = {
+    "prodDate": "PROD_DATE",
+    "wersVl": "VEHICLE_LINE_WERS",
+    "awsVl": "VEHICLE_LINE_GSAR",
+    "globVl": "VEHICLE_LINE_GLOBAL",
+    "plant": "ASSEMBLY_PLANT",
+    "origWarantDate": "WARRANTY_START_DATE",
+}
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_valid_vin(vin: object) -> bool:
+    """
+    Full VINs have 17 characters, masked ones have "*".
+    """
+    return isinstance(vin, str) and len(vin) == 17 and "*" not in vin
+
+
+class VinStore:
+    """
+    Sqlite store of GSAR WERS answers by VIN.
+
+    Args:
+        path (str): sqlite database file
+        ttl (float): seconds an answer stays valid
+    """
+
+    _default: Optional["VinStore"] = None
+
+    def __init__(self, path: str, ttl: float) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS vins (
+                    vin TEXT PRIMARY KEY,
+                    info TEXT,
+                    fetched REAL
+                );
+                """
+            )
+
+    @classmethod
+    def default(cls) -> "VinStore":
+        """
+        Process wide store configured by VIN_STORE_PATH and
+        VIN_STORE_TTL_DAYS environment variables.
+        """
+        if cls._default is None:
+            cls._default = cls(
+                os.getenv("VIN_STORE_PATH", "./data/cache/vins.sqlite3"),
+                float(os.getenv("VIN_STORE_TTL_DAYS", "30")) * 24 * 3600,
+            )
+        return cls._default
+
+    def get_many(self, vins: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Answers saved for some VINs, expired ones are ignored.
+        """
+        vins = list(vins)
+        found: Dict[str, Dict[str, str]] = {}
+        oldest = time.time() - self.ttl
+        with self.lock:
+            for start in range(0, len(vins), 500):  # sqlite variables limit
+                part = vins[start : start + 500]
+                rows = self.conn.execute(
+                    "SELECT vin, info FROM vins WHERE fetched >= ? AND vin IN "
+                    + f"({', '.join('?' * len(part))})",
+                    [oldest, *part],
+                ).fetchall()
+                found.update((vin, json.loads(info)) for vin, info in rows)
+        return found
+
+    def put_many(self, infos: Dict[str, Dict[str, str]]) -> None:
+        """
+        Saves answers by VIN.
+        """
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO vins VALUES (?, ?, ?)",
+                ((vin, json.dumps(info), now) for vin, info in infos.items()),
+            )
+
+
+class VinEnricher:
+    """
+    Fills the vehicle columns of VINs from GSAR WERS.
+
+    Args:
+        url (Optional[str], optional): endpoint. Defaults to GSAR_WERS_URL.
+        token (Optional[str], optional): fixed bearer token. Defaults to the
+        auth of src.infra.auth.gsar_auth.
+        store (Optional[VinStore], optional): answers store. Defaults to
+        VinStore.default().
+        concurrency (Optional[int], optional): requests in flight. Defaults
+        to VIN_CONCURRENCY env var or 8.
+        tries (int, optional): attempts of each request. Defaults to 3.
+        delay (float, optional): first wait between tries, doubled on each
+        retry. Defaults to 2.
+
+    methods:
+        enrich: vehicle columns of a series of VINs
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        url: Optional[str] = None,
+        token: Optional[str] = None,
+        store: Optional[VinStore] = None,
+        concurrency: Optional[int] = None,
+        tries: int = 3,
+        delay: float = 2,
+    ) -> None:
+        self.url = url or str(os.getenv("GSAR_WERS_URL"))
+        self.auth = StaticBearerAuth(token) if token else gsar_auth()
+        self.store = store or VinStore.default()
+        self.concurrency = concurrency or int(os.getenv("VIN_CONCURRENCY", "8"))
+        self.tries = tries
+        self.delay = delay
+
+    def enrich(self, vins: pd.Series) -> pd.DataFrame:
+        """
+        Queries each valid VIN once and joins the answers back on the rows.
+        Invalid, masked and failed VINs get empty values.
+
+        Args:
+            vins (pd.Series): full VIN of each row
+
+        Returns:
+            pd.DataFrame: VIN_FIELDS columns, with the index of vins
+        """
+        unique = [vin for vin in pd.unique(vins.dropna()) if is_valid_vin(vin)]
+        infos = self.store.get_many(unique)
+        missing = [vin for vin in unique if vin not in infos]
+
+        fetched = asyncio.run(self.__fetch_all(missing)) if missing else {}
+        self.store.put_many(fetched)
+        infos.update(fetched)
+        self.logger.info(
+            "VIN enrichment: %s rows, %s valid VINs, %s from store, %s fetched, "
+            + "%s failed",
+            len(vins),
+            len(unique),
+            len(unique) - len(missing),
+            len(fetched),
+            len(missing) - len(fetched),
+        )
+
+        table = pd.DataFrame.from_dict(
+            infos, orient="index", columns=list(VIN_FIELDS), dtype=object
+        ).rename(columns=VIN_FIELDS)
+        enriched = table.reindex(vins.to_numpy()).fillna("")
+        enriched.index = vins.index
+        return enriched
+
+    async def __fetch_all(self, vins: List[str]) -> Dict[str, Dict[str, str]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with create_async_client(max_connections=self.concurrency) as client:
+            infos = await asyncio.gather(
+                *(self.__fetch(client, semaphore, vin) for vin in vins)
+            )
+        return {vin: info for vin, info in zip(vins, infos) if info is not None}
+
+    async def __fetch(
+        self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, vin: str
+    ) -> Optional[Dict[str, str]]:
+        delay = self.delay
+        for attempt in range(1, self.tries + 1):
+            try:
+                async with semaphore:
+                    response = await client.get(
+                        self.url,
+                        params={"vin": vin},
+                        auth=self.auth,
+                        timeout=60,
+                    )
+                if response.status_code == 200:
+                    data = dict(response.json())
+                    return {key: str(data[key]) for key in VIN_FIELDS if key in data}
+                if response.status_code not in RETRY_STATUS:
+                    # unknown VIN, saved as empty so it is not asked again
+                    return {} if response.status_code == 404 else None
+            except (httpx.TransportError, ValueError) as exc:
+                self.logger.warning("VIN %s: %r", vin, exc)
+            if attempt < self.tries:
+                await asyncio.sleep(delay)
+                delay *= 2
+        return None
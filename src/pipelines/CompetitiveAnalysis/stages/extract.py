@@ -57,7 +57,7 @@ class DataExtractor:
         """
         try:
             tomorow = date.today() + timedelta(days=1)
-            with create_client() as client:
+            with create_client(cache=True) as client:
                 response = client.get(
                     "",
                     params={
@@ -5,9 +5,9 @@ This module defines the basic flow of data Loading from NHTSA portal
 import logging
 from datetime import date
 
-import dotenv
 import pandas as pd
 
+from src.utils.funtions import save_env_vars
 from src.utils.logger import setup_logger
 from src.errors.load_error import LoadError
 from src.utils.decorators import time_logger
@@ -42,11 +42,7 @@ class DataLoader:
         try:
             # self.__append_processed_data_excel(contract.content)
             self.__save_other_processed_data_csv(contract.content)
-            dotenv.set_key(
-                dotenv.find_dotenv(),
-                "LAST_RECALL_WAVE_DATE",
-                date.today().strftime("%Y%m%d"),
-            )
+            save_env_vars(LAST_RECALL_WAVE_DATE=date.today().strftime("%Y%m%d"))
         except Exception as exc:
             self.logger.exception(exc)
             raise LoadError(str(exc)) from exc
@@ -5,30 +5,37 @@ retrived from NHTSA.
 
 import logging
 from typing import Tuple
-from functools import lru_cache
 
-import httpx
 from pandas import DataFrame, to_datetime
 
 from src.utils.logger import setup_logger
-from src.utils.decorators import rate_limiter, retry, time_logger
+from src.utils.reference_data import reference_data
+from src.utils.decorators import time_logger
 from src.errors.transform_error import TransformError
+from src.infra.auth import classifier_credentials
+from src.infra.classifier import (
+    CONTEXT,
+    MODEL,
+    BatchOptions,
+    Classifier,
+    chat_content,
+)
+from src.infra.classification_store import ClassificationStore
 from src.pipelines.CompetitiveAnalysis.contracts.extract_contract import ExtractContract
 from src.pipelines.CompetitiveAnalysis.contracts.transform_contract import (
     TransformContract,
 )
-from src.utils.funtions import (
-    classify_binning,
-    extract_url,
-    load_categories,
-    load_classifier_credentials,
-)
+from src.utils.vectorized import extract_urls, failure_modes
 
 
 class DataTransformer:
     """
     Class to define the flow of the data transformation step
 
+    Args:
+        batch_size (int, optional): recalls classified in each request, 1
+        sends one request per recall. Defaults to 1.
+
     methods:
         transform -> TransformContract: increase the dataset, adding columns
     """
@@ -36,7 +43,8 @@ class DataTransformer:
     logger = logging.getLogger(__name__)
     setup_logger()
 
-    def __init__(self) -> None:
+    def __init__(self, batch_size: int = 1) -> None:
+        self.batch_size = batch_size
         self.parts = (
             "door, window, windshield, wiper, glass, hood, trunk, moonroof, "
             + "bumper, tail light, pillar, undershield, roof rack, latch, he"
@@ -75,50 +83,58 @@ class DataTransformer:
             List[TransformedDataset]: list of dict, alike a pandas dataframe
         """
         data = contract.raw_data
-        credentials = load_classifier_credentials()
+        credentials = classifier_credentials()
 
         data["REPORT_RECEIVED_DATE"] = to_datetime(  # TODO: change to %m-%d-%Y
             data["REPORT_RECEIVED_DATE"], format="%Y-%m-%d"
         )
-        data["RECALL_LINK"].apply(extract_url)
+        data["RECALL_LINK"] = extract_urls(data["RECALL_LINK"])
         data["POTENTIALLY_AFFECTED"] = data["POTENTIALLY_AFFECTED"].astype(int)
-        data[["FUNCTION_", "BINNING"]] = data.apply(
-            lambda row: self.__classify_case(
-                (
-                    f'With this problematic component {str(row["COMPONENT"])} '
-                    + f'and this decription: {str(row["RECALL_DESCRIPTION"])}.'
-                ),
-                credentials["url"],
-                credentials["token"],
+        instructions = self.__build_prompt()
+        texts = [
+            f"With this problematic component {component} "
+            + f"and this decription: {description}."
+            for component, description in zip(
+                data["COMPONENT"].astype(str), data["RECALL_DESCRIPTION"].astype(str)
             )
+        ]
+        store = ClassificationStore.default()
+        classifier = Classifier(credentials["url"], credentials["auth"], store=store)
+        data[["FUNCTION_", "BINNING"]] = classifier.classify(
+            [
+                chat_content(text + instructions, CONTEXT + text + instructions)
+                for text in texts
+            ],
+            self.__process_response,
+            ("Not Classified", "Not Classified"),
+            keys=[store.key(text, CONTEXT + instructions, MODEL) for text in texts],
+            batch=(
+                BatchOptions(
+                    texts,
+                    instructions,
+                    size=self.batch_size,
+                    is_valid=lambda answer: "~~~" in answer,
+                )
+                if self.batch_size > 1
+                else None
+            ),
         )
-        data["FAILURE_MODE"] = data["BINNING"].apply(classify_binning)
+        data["FAILURE_MODE"] = failure_modes(data["BINNING"])
         data["EXTRACTED_DATE"] = contract.extract_date
 
         return data
 
-    @retry([Exception])
-    @rate_limiter(70, 1)
-    @lru_cache(maxsize=70)
-    def __classify_case(self, prompt: str, url: str, token: str) -> Tuple[str, str]:
+    def __build_prompt(self) -> str:
         """
-        Uses ChatGPT-4.0 to classify each recall by failure mode
-
-        Args:
-            decription (str): complaint description
-            url (str): api endpoint
-            token (str): authorization token
-
-        Raises:
-            exc: ConnectionError, API not responded
+        Instructions sent after each recall description to classify it by
+        failure mode, built once per run
 
         Returns:
-            str: result of classificaiton (failure mode)
+            str: classification instructions
         """
-        classes = list(load_categories("Failures"))
-        text = (
-            prompt
-            + "Question 1: For this description, check if it's related to an"
+        classes = reference_data().prompts["failures"]
+        return (
+            "Question 1: For this description, check if it's related to an"
             + f" external part of the car, body exterior, ({self.parts}). If"
             + " yes, answer 'F8'. IF not, answer 'NOT F8'. Note that most of"
             + " the problems related to power liftgate electrical problems a"
@@ -137,31 +153,6 @@ class DataTransformer:
             + "st, answer 1, and answer 2 must be NA. You should be objectiv"
             + "e and cold. Never change the answer format mentioned."
         )
-        content = {
-            "model": "gpt-4",
-            "context": (
-                "You are a helpful text reader and analyzer. You need to give me 2 answers."
-                + text
-            ),  # sets the overall behavior of the assistant.
-            "messages": [{"role": "user", "content": text}],
-            "parameters": {
-                "temperature": 0.05,  # Determines the randomnes of the model's response.
-            },
-        }
-        try:
-            response = httpx.post(
-                url,
-                headers={"Authorization": f"Bearer {token}"},
-                json=content,
-                timeout=360,
-            )
-        except Exception as exc:
-            self.logger.exception(exc)
-            raise TransformError(str(exc)) from Exception
-
-        if response.status_code == 200:
-            return self.__process_response(response.json()["content"])
-        return ("Not Classified", "Not Classified")
 
     def __process_response(self, message: str) -> Tuple[str, str]:
         """
@@ -176,8 +167,8 @@ class DataTransformer:
         """
         message = message.split("\n")[0] if "\n" in message else message
 
-        if len(parts := message.split("~~~")) == 2:
-            function, result = parts
+        if len(parts := message.strip(" '\"`").split("~~~")) == 2:
+            function, result = (part.strip() for part in parts)
             if function == "NOT F8":
                 return (function, "~")
             if function == "F8":
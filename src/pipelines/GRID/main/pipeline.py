@@ -2,10 +2,13 @@
 This module defines the main flow of processing data.
 """
 
+import os
 import time
 import logging
+from typing import Optional
 
 from src.utils.logger import setup_logger
+from src.utils.pipelining import stream
 from src.pipelines.GRID.stages.load import DataLoader
 from src.pipelines.GRID.stages.extract import DataExtractor
 from src.pipelines.GRID.stages.transform import DataTransformer
@@ -14,10 +17,21 @@ from src.pipelines.GRID.stages.transform import DataTransformer
 class Pipeline:
     """
     Class to define the main flow of data processing
+
+    Args:
+        streaming (Optional[bool], optional): runs the stages concurrently on
+        chunks of PIPELINE_CHUNK_ROWS issues (see src.utils.pipelining).
+        Defaults to PIPELINE_STREAMING env var or False.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, streaming: Optional[bool] = None) -> None:
         self.logger = logging.getLogger(__name__)
+        self.streaming = (
+            os.getenv("PIPELINE_STREAMING", "false").lower() == "true"
+            if streaming is None
+            else streaming
+        )
+        self.chunk_rows = int(os.getenv("PIPELINE_CHUNK_ROWS", "500"))
         self.extractor = DataExtractor()
         self.transformer = DataTransformer()
         self.loader = DataLoader()
@@ -29,7 +43,15 @@ class Pipeline:
         """
         start_time = time.time()
         self.logger.debug("Starting: GRID pipeline")
-        self.loader.load_data(self.transformer.transform(self.extractor.extract()))
+        if self.streaming:
+            stream(
+                self.extractor.extract_chunks(self.chunk_rows),
+                [("transform", self.transformer.transform)],
+                self.loader.append_data,
+            )
+            self.loader.commit()
+        else:
+            self.loader.load_data(self.transformer.transform(self.extractor.extract()))
         self.logger.debug(
             "GRID pipeline: completed successfully in %s minutes",
             round((time.time() - start_time) / 60, 2),
@@ -4,7 +4,7 @@ This module defines the basic flow of data Extraction from NHTSA portal
 
 import logging
 import os
-from typing import Dict, List
+from typing import Dict, Iterator, List
 from datetime import date
 
 import pandas as pd
@@ -53,6 +53,22 @@ class DataExtractor:
         except FileNotFoundError as exc:
             raise ExtractError(str(exc)) from exc
 
+    def extract_chunks(self, chunk_rows: int = 500) -> Iterator[ExtractContract]:
+        """
+        Streaming version of extract, the new issues split in chunks.
+
+        Args:
+            chunk_rows (int, optional): issues of each chunk. Defaults to 500.
+
+        Yields:
+            Iterator[ExtractContract]: chunks of new issues
+        """
+        contract = self.extract()
+        for start in range(0, len(contract.raw_data), chunk_rows):
+            yield contract._replace(
+                raw_data=contract.raw_data[start : start + chunk_rows]
+            )
+
     def __verify_new_issues(self, data: pd.DataFrame) -> List[Dict[str, str]]:
         """
         Verifies new issues from filtered data and returns the columns:
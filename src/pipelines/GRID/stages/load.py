@@ -2,13 +2,14 @@
 This module defines the basic flow of data Loading from NHTSA portal
 """
 
+import os
 import time
 import logging
 from datetime import date
 
-import dotenv
 import pandas as pd
 from src.utils.decorators import time_logger
+from src.utils.funtions import save_env_vars
 
 from src.utils.logger import setup_logger
 from src.errors.load_error import LoadError
@@ -22,6 +23,8 @@ class DataLoader:
 
     methods:
         load_data: saves processed data in serialized file and database.
+        append_data: stages a chunk of the streaming pipeline.
+        commit: ends the streaming load, publishing the chunks staged.
     """
 
     logger = logging.getLogger(__name__)
@@ -29,6 +32,8 @@ class DataLoader:
 
     def __init__(self) -> None:
         self.names = []
+        self.appended = 0
+        self.path = ""  # CSV of the streaming run, staged until commit
 
     @time_logger(logger)
     def load_data(self, contract: TransformContract) -> None:
@@ -46,23 +51,57 @@ class DataLoader:
         try:
             self.logger.info("Running Load stage")
             self.__save_processed_data_csv(contract.content)
-            dotenv.set_key(
-                dotenv.find_dotenv(),
-                "LAST_GRID_ISSUE_DATE",
-                date.today().strftime("%Y-%m-%d"),
-            )
+            save_env_vars(LAST_GRID_ISSUE_DATE=date.today().strftime("%Y-%m-%d"))
         except Exception as exc:
             raise LoadError(str(exc)) from exc
 
-    def __save_processed_data_csv(self, content: pd.DataFrame) -> None:
+    def append_data(self, contract: TransformContract) -> None:
+        """
+        Streaming version of load_data, appends a chunk to a staging CSV,
+        published as the CSV of the run on commit
+
+        Args:
+            contract (TransformContract): chunk processed
+
+        Raises:
+            LoadError: Error during serialization.
+        """
+        self.path = self.path or self.__csv_path()
+        self.__save_processed_data_csv(
+            contract.content, self.appended > 0, self.path + ".part"
+        )
+        self.appended += contract.content.shape[0]
+
+    def commit(self) -> None:
+        """
+        Ends the streaming load, publishing the CSV of the run and saving
+        its date
+
+        Raises:
+            LoadError: no chunk appended.
+        """
+        if self.appended == 0:
+            raise LoadError("There is no new data")
+        os.replace(self.path + ".part", self.path)
+        save_env_vars(LAST_GRID_ISSUE_DATE=date.today().strftime("%Y-%m-%d"))
+        self.appended, self.path = 0, ""
+
+    def __csv_path(self) -> str:
+        today = date.today().strftime("%Y-%m-%d")
+        return f"./data/processed/GRID_PROCESSED_{today}.csv"
+
+    def __save_processed_data_csv(
+        self, content: pd.DataFrame, append: bool = False, path: str = ""
+    ) -> None:
         try:
-            today = date.today().strftime("%Y-%m-%d")
-            path = f"./data/processed/GRID_PROCESSED_{today}.csv"
+            path = path or self.__csv_path()
 
             if content.shape[0] == 0:
                 raise LoadError("There is no new data")
 
-            content.to_csv(path, index=False)
+            content.to_csv(
+                path, index=False, mode="a" if append else "w", header=not append
+            )
 
         except Exception as exc:
             raise LoadError(str(exc)) from exc
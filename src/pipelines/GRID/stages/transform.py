@@ -4,16 +4,18 @@ retrived from NHTSA.
 """
 
 import logging
-from typing import Dict
 
-import httpx
 import pandas as pd
 
 from src.utils.logger import setup_logger
-from src.utils.decorators import retry, time_logger
-from src.utils.funtions import load_categories, load_classifier_credentials, load_new_models
+from src.utils.decorators import time_logger
+from src.utils.funtions import load_new_models
+from src.utils.reference_data import reference_data
 
 from src.errors.transform_error import TransformError
+from src.infra.auth import classifier_credentials
+from src.infra.classifier import MODEL, BatchOptions, Classifier, chat_content
+from src.infra.classification_store import ClassificationStore
 from src.pipelines.GRID.contracts.extract_contract import ExtractContract
 from src.pipelines.GRID.contracts.transform_contract import TransformContract
 
@@ -22,6 +24,10 @@ class DataTransformer:
     """
     Class to define the flow of the data transformation step.
 
+    Args:
+        batch_size (int, optional): issues classified in each request, 1
+        sends one request per issue. Defaults to 1.
+
     methods:
         transform -> TransformContract: increase the dataset, adding columns
     """
@@ -29,7 +35,8 @@ class DataTransformer:
     logger = logging.getLogger(__name__)
     setup_logger()
 
-    def __init__(self) -> None:
+    def __init__(self, batch_size: int = 1) -> None:
+        self.batch_size = batch_size
         self.names = []
 
     @time_logger(logger=logger)
@@ -66,36 +73,42 @@ class DataTransformer:
         if len(contract.raw_data) == 0:
             raise TransformError("No new data to Classify")
 
-        credentials = load_classifier_credentials()
+        credentials = classifier_credentials()
         issues = pd.DataFrame(contract.raw_data)
         issues["Affected Vehicles"].replace(load_new_models())
         issues["Extracted Date"] = contract.extract_date
-        issues["Binning"] = issues.apply(
-            lambda row: self.__classify_case(
-                row["Issue Title"] + "," + row["Description"], credentials
+        instructions = self.__build_prompt()
+        texts = [
+            f"{title},{description}"
+            for title, description in zip(issues["Issue Title"], issues["Description"])
+        ]
+        store = ClassificationStore.default()
+        classifier = Classifier(credentials["url"], credentials["auth"], store=store)
+        issues["Binning"] = classifier.classify(
+            [chat_content(text + instructions) for text in texts],
+            lambda message: message.split("\n")[0],
+            "NOT CLASSIFIED",
+            keys=[store.key(text, instructions, MODEL) for text in texts],
+            batch=(
+                BatchOptions(texts, instructions, size=self.batch_size)
+                if self.batch_size > 1
+                else None
             ),
-            axis=1,
         )
         return issues
 
-    @retry([Exception])
-    def __classify_case(self, data: str, credentials: Dict[str, str]) -> str:
+    def __build_prompt(self) -> str:
         """
-        Uses ChatGPT-4.0 to classify each recall by failure mode
-
-        Args:
-            data (str): issue title and description
-            credentials (Dict[str, str]): api endpoint and authorization token
-
-        Raises:
-            exc: ConnectionError, API not responded
+        Instructions sent after each issue title and description to classify
+        it by failure mode, built once per run
 
         Returns:
-            str: result of classificaiton (failure mode)
+            str: classification instructions
         """
-        text = (
-            f"{data}. For this sentences that, check if it is related to onl"
-            + f"y one of the following categories: {list(load_categories())}"
+        categories = reference_data().prompts["binnings"]
+        return (
+            ". For this sentences that, check if it is related to onl"
+            + f"y one of the following categories: {categories}"
             + ". Your answer must be only one of these categories. Note: 'OW"
             + "D' means 'opened while driving' and 'F&F' means 'fit and fini"
             + "sh', for problems related to flushness and margin. Note 2: Fo"
@@ -106,33 +119,3 @@ class DataTransformer:
             + "bjective and cold. Never change the answer format mentioned a"
             + "nd Never create a new categorie."
         )
-        content = {
-            "model": "gpt-4",
-            "context": (
-                "You are a helpful text reader and analyzer. You need to give me 2 answers."
-            ),  # sets the overall behavior of the assistant.
-            "messages": [{"role": "user", "content": text}],
-            "parameters": {
-                "temperature": 0.05,  # Determines the randomnes of the model's response.
-            },
-        }
-        try:
-            response = httpx.post(
-                credentials["url"],
-                headers={"Authorization": f"Bearer {credentials['token']}"},
-                json=content,
-                timeout=360,
-            )
-        except Exception as exc:
-            self.logger.exception(exc)
-            self.logger.error(exc)
-            raise TransformError(str(exc)) from Exception
-
-        self.logger.info("New response: %s", response.status_code)
-        if response.status_code == 200:
-            message = response.json()["content"]
-            if "\n" in message:
-                return message.split("\n")[0]
-
-            return message
-        return "NOT CLASSIFIED"
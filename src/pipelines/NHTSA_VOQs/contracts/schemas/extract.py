@@ -30,6 +30,7 @@ schema = DataFrameSchema(
             required=True,
             description="Name of the vehicle Manufacturer",
             title="MANUFACTURER NAME",
+            metadata={"categorical": True},
         ),
         "MAKETXT": Column(
             dtype=String,
@@ -37,6 +38,7 @@ schema = DataFrameSchema(
             required=True,
             description="Name of the vehicle Make",
             title="MAKE NAME",
+            metadata={"categorical": True},
         ),
         "MODELTXT": Column(
             dtype=String,
@@ -44,6 +46,7 @@ schema = DataFrameSchema(
             required=True,
             description="Name of the vehicle Model",
             title="MODEL NAME",
+            metadata={"categorical": True},
         ),
         "YEARTXT": Column(
             dtype=UInt,
@@ -95,6 +98,7 @@ schema = DataFrameSchema(
             required=True,
             description="Description of the problematic component (not reliable)",
             title="COMPONENT DESCRIPTION",
+            metadata={"categorical": True},
         ),
         "CITY": Column(
             dtype=String,
@@ -106,6 +110,7 @@ schema = DataFrameSchema(
             dtype="object",
             required=True,
             description=None,
+            metadata={"categorical": True},
         ),
         "VIN": Column(
             dtype=String,
@@ -170,6 +175,7 @@ schema = DataFrameSchema(
             required=True,
             description="Complaint type",
             title="COMPLAINT TYPE",
+            metadata={"categorical": True},
         ),
         "POLICE_RPT_YN": Column(
             dtype=Bool,
@@ -346,6 +352,7 @@ schema = DataFrameSchema(
             dtype=String,
             nullable=True,
             required=True,
+            metadata={"categorical": True},
         ),
         "DEALER_ZIP": Column(
             dtype=String,
@@ -4,10 +4,21 @@ and Loading Step. A named tuple representing the contract for transforming
 data with:
 
 1. content: The content to be transformed
+2. checkpoint: The checkpoints of a micro-batched transform, cleared once
+the content is loaded, None when the transform ran at once
 """
 
-from typing import NamedTuple
+from typing import NamedTuple, Optional
 
 from pandas import DataFrame
 
-TransformContract = NamedTuple("TransformContract", [("content", DataFrame)])
+from src.infra.checkpoint import BatchCheckpoint
+
+
+class TransformContract(NamedTuple):
+    """
+    Contract of the transformed dataset.
+    """
+
+    content: DataFrame
+    checkpoint: Optional[BatchCheckpoint] = None
@@ -0,0 +1,337 @@
+"""
+This module defines the historical backfill of the NHTSA_VOQs pipeline, to
+reprocess the Ford complaints already collected, ex: after a change of the
+binnings. The complaints of the local archive (see ComplaintsArchive) are
+split in partitions, by model year or by ODINO range, and each partition is
+transformed on a worker process with checkpoints of its own, so a failed
+backfill restarts from the batches already enriched. The outputs are merged
+in ODINO order: the same archive and options give the same file, whatever
+the order the partitions end.
+
+Usage: python -m src.pipelines.NHTSA_VOQs.main.backfill --by year --years
+2015 2016 --columns BINNING VFG
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Collection, List, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd
+from dotenv import find_dotenv, load_dotenv
+
+from src.errors.extract_error import ExtractError
+from src.infra.checkpoint import BatchCheckpoint
+from src.pipelines.NHTSA_VOQs.contracts.extract_contract import ExtractContract
+from src.pipelines.NHTSA_VOQs.stages.archive import ComplaintsArchive
+from src.pipelines.NHTSA_VOQs.stages.transform import (
+    ENRICHMENT_COLUMNS,
+    DataTransformer,
+)
+from src.utils.logger import setup_logger
+
+MANUFACTURER = "Ford Motor Company"
+# columns kept with the enrichment columns asked, to merge them back
+KEY_COLUMNS = ["ODINO", "CMPLID", "MODELTXT", "YEARTXT"]
+
+
+class Partition(NamedTuple):
+    """
+    Complaints transformed by a worker.
+
+    Attributes:
+        name (str): partition name, the namespace of its checkpoints
+        years (Optional[Tuple[Optional[int], ...]]): model years, None for
+        all of them
+        low (int): ODINO excluded lower bound
+        high (Optional[int]): ODINO included upper bound, None for no bound
+    """
+
+    name: str
+    years: Optional[Tuple[Optional[int], ...]]
+    low: int = 0
+    high: Optional[int] = None
+
+
+class Task(NamedTuple):
+    """
+    Work order of a partition, sent to the worker processes.
+    """
+
+    partition: Partition
+    archive: str
+    folder: str
+    columns: Optional[Tuple[str, ...]]
+    micro_batch: int
+    extract_date: date
+
+
+class BackfillReport(NamedTuple):
+    """
+    Result of a backfill.
+
+    Attributes:
+        partitions (int): partitions transformed
+        rows (int): complaints of the merged output
+        path (str): merged output CSV
+        elapsed (float): seconds of the backfill
+    """
+
+    partitions: int
+    rows: int
+    path: str
+    elapsed: float
+
+
+def plan_partitions(
+    archive: ComplaintsArchive,
+    by: str = "year",
+    years: Optional[Collection[int]] = None,
+    span: int = 250_000,
+) -> List[Partition]:
+    """
+    Partitions of the Ford complaints of the archive.
+
+    Args:
+        archive (ComplaintsArchive): complaints history
+        by (str, optional): "year", one partition per model year, or "odino",
+        ranges of span ODINOs. Defaults to "year".
+        years (Optional[Collection[int]], optional): model years reprocessed.
+        Defaults to None, all of them.
+        span (int, optional): ODINOs of each range. Defaults to 250000.
+
+    Raises:
+        ValueError: unknown partitioning
+
+    Returns:
+        List[Partition]: partitions in ODINO or model year order
+    """
+    rows = {
+        year: count
+        for year, count in archive.model_years(MANUFACTURER).items()
+        if years is None or year in years
+    }
+    if by == "year":
+        return [
+            Partition(
+                f"year-{'unknown' if year == -1 else year}",
+                (None if year == -1 else year,),
+            )
+            for year in rows
+        ]
+    if by != "odino":
+        raise ValueError(f"Unknown partitioning: {by}")
+
+    selected = None if years is None else tuple(years)
+    bounds = [
+        (info["min_odino"], info["max_odino"])
+        for info in archive.manifest["partitions"].values()
+        if info["MFR_NAME"] == MANUFACTURER
+        and (selected is None or info["YEARTXT"] in selected)
+    ]
+    if not bounds:
+        return []
+    first = min(low for low, _ in bounds) // span * span
+    last = max(high for _, high in bounds)
+    return [
+        Partition(f"odino-{low + 1}", selected, low, low + span)
+        for low in range(first - 1, last, span)
+    ]
+
+
+def _transform_partition(task: Task) -> Tuple[str, int]:
+    """
+    Transforms the complaints of a partition on a worker process.
+
+    Args:
+        task (Task): partition and options
+
+    Returns:
+        Tuple[str, int]: output pickle, "" without complaints, and its rows
+    """
+    partition = task.partition
+    raw = ComplaintsArchive(task.archive).read_range(
+        MANUFACTURER, partition.years, partition.low, partition.high
+    )
+    raw = raw.drop_duplicates("ODINO", ignore_index=True)  # sorted by CMPLID
+    if raw.empty:
+        return "", 0
+
+    transformer = DataTransformer(
+        micro_batch=task.micro_batch,
+        checkpoint=BatchCheckpoint(f"NHTSA_VOQs_backfill/{partition.name}"),
+        enrich=task.columns,
+    )
+    content = transformer.transform(ExtractContract(raw, task.extract_date)).content
+    if task.columns is not None:
+        content = content[KEY_COLUMNS + [c for c in task.columns if c in content]]
+    path = os.path.join(task.folder, f"{partition.name}.pkl")
+    content.to_pickle(path)
+    return path, len(content)
+
+
+class Backfill:
+    """
+    Reprocesses the Ford complaints of the archive, partitioned across a
+    process pool.
+
+    Args:
+        by (str, optional): see plan_partitions. Defaults to "year".
+        years (Optional[Collection[int]], optional): model years reprocessed.
+        Defaults to None, all of them.
+        columns (Optional[Sequence[str]], optional): ENRICHMENT_COLUMNS
+        recomputed, the output has KEY_COLUMNS and them. Defaults to None,
+        the whole transform.
+        workers (Optional[int], optional): worker processes. Defaults to
+        BACKFILL_WORKERS env var or 4, 1 runs on this process.
+        span (int, optional): see plan_partitions. Defaults to 250000.
+        archive (str, optional): archive folder. Defaults to
+        ./data/raw/complaints_archive.
+        folder (str, optional): outputs of the partitions. Defaults to
+        ./data/cache/backfill.
+
+    methods:
+        run: transforms the partitions and merges their outputs
+
+    Raises:
+        ValueError: columns out of ENRICHMENT_COLUMNS
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        by: str = "year",
+        years: Optional[Collection[int]] = None,
+        columns: Optional[Sequence[str]] = None,
+        workers: Optional[int] = None,
+        span: int = 250_000,
+        archive: str = "./data/raw/complaints_archive",
+        folder: str = "./data/cache/backfill",
+    ) -> None:
+        if columns is not None and (
+            unknown := [c for c in columns if c not in ENRICHMENT_COLUMNS]
+        ):
+            raise ValueError(f"Not enrichment columns: {', '.join(unknown)}")
+        self.by = by
+        self.years = years
+        self.columns = None if columns is None else tuple(columns)
+        self.workers = workers or int(os.getenv("BACKFILL_WORKERS", "4"))
+        self.span = span
+        self.archive = archive
+        self.folder = folder
+        self.micro_batch = int(os.getenv("TRANSFORM_MICRO_BATCH", "500")) or 500
+
+    def run(self) -> BackfillReport:
+        """
+        Transforms the partitions and merges their outputs in a CSV of
+        data/processed, the checkpoints are cleared once it is saved.
+
+        Raises:
+            ExtractError: no complaints to reprocess
+            TransformError: error of a partition, the others keep their
+            checkpoints
+
+        Returns:
+            BackfillReport: partitions, rows and output
+        """
+        start = time.perf_counter()
+        partitions = plan_partitions(
+            ComplaintsArchive(self.archive), self.by, self.years, self.span
+        )
+        if not partitions:
+            raise ExtractError("No archived complaints to reprocess")
+        os.makedirs(self.folder, exist_ok=True)
+        tasks = [
+            Task(
+                partition,
+                self.archive,
+                self.folder,
+                self.columns,
+                self.micro_batch,
+                date.today(),
+            )
+            for partition in partitions
+        ]
+        self.logger.info(
+            "Backfill of %s partitions on %s workers", len(tasks), self.workers
+        )
+
+        if self.workers == 1:
+            outputs = [_transform_partition(task) for task in tasks]
+        else:
+            # spawned workers open their own http pools and tokens
+            with ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                outputs = list(pool.map(_transform_partition, tasks))
+
+        path, rows = self.__merge([output for output, _ in outputs if output])
+        for partition in partitions:
+            BatchCheckpoint(f"NHTSA_VOQs_backfill/{partition.name}").clear()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+        report = BackfillReport(len(tasks), rows, path, time.perf_counter() - start)
+        self.logger.info(
+            "Backfill: %s complaints of %s partitions saved in %s (%.1fs)",
+            report.rows,
+            report.partitions,
+            report.path,
+            report.elapsed,
+        )
+        return report
+
+    def __merge(self, outputs: List[str]) -> Tuple[str, int]:
+        """
+        Merges the partition outputs, in ODINO order, a complaint of two
+        model years is kept once.
+        """
+        if not outputs:
+            raise ExtractError("No Ford complaints in the partitions")
+        merged = (
+            pd.concat([pd.read_pickle(output) for output in outputs])
+            .sort_values(["ODINO", "CMPLID"], kind="mergesort")
+            .drop_duplicates("ODINO")
+            .reset_index(drop=True)
+        )
+        today = date.today().strftime("%Y-%m-%d")
+        path = f"./data/processed/NHTSA_VOQS_BACKFILL_{today}.csv"
+        merged.to_csv(path, index=False)
+        return path, len(merged)
+
+
+def main(
+    argv: Optional[Sequence[str]] = None, prog: Optional[str] = None
+) -> BackfillReport:
+    """
+    Command line entry of the backfill.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): arguments. Defaults to None,
+        the process arguments.
+        prog (Optional[str], optional): command shown in the usage. Defaults
+        to None, the script name.
+
+    Returns:
+        BackfillReport: result of the backfill
+    """
+    parser = argparse.ArgumentParser(prog, description=__doc__.split("\n\n")[0])
+    parser.add_argument("--by", choices=["year", "odino"], default="year")
+    parser.add_argument("--years", type=int, nargs="+")
+    parser.add_argument("--columns", nargs="+", choices=ENRICHMENT_COLUMNS)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--span", type=int, default=250_000)
+    args = parser.parse_args(argv)
+
+    load_dotenv(find_dotenv())
+    return Backfill(args.by, args.years, args.columns, args.workers, args.span).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,15 @@
 This module defines the main flow of processing data.
 """
 
+import os
 import time
 import logging
+from typing import Optional
+
+import pandas as pd
 
 from src.utils.logger import setup_logger
+from src.utils.pipelining import stream
 from src.pipelines.NHTSA_VOQs.stages.load import DataLoader
 from src.pipelines.NHTSA_VOQs.stages.extract import DataExtractor
 from src.pipelines.NHTSA_VOQs.stages.transform import DataTransformer
@@ -13,13 +18,33 @@ from src.pipelines.NHTSA_VOQs.stages.transform import DataTransformer
 
 class Pipeline:
     """
-    Class to define the main flow of data processing
+    Class to define the main flow of data processing, the complaints are
+    transformed at once, or in checkpointed micro-batches of
+    TRANSFORM_MICRO_BATCH env var cases when it is set over 0.
+
+    Args:
+        streaming (Optional[bool], optional): runs the stages concurrently on
+        chunks of PIPELINE_CHUNK_ROWS cases (see src.utils.pipelining).
+        Defaults to PIPELINE_STREAMING env var or False.
+        grid (Optional[pd.DataFrame], optional): GRID issues joined to the
+        complaints by model and binning. Defaults to None, no join.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self, streaming: Optional[bool] = None, grid: Optional[pd.DataFrame] = None
+    ) -> None:
         self.logger = logging.getLogger(__name__)
-        self.extractor = DataExtractor()
-        self.transformer = DataTransformer()
+        self.streaming = (
+            os.getenv("PIPELINE_STREAMING", "false").lower() == "true"
+            if streaming is None
+            else streaming
+        )
+        self.chunk_rows = int(os.getenv("PIPELINE_CHUNK_ROWS", "500"))
+        self.extractor = DataExtractor(streaming=self.streaming)
+        self.transformer = DataTransformer(
+            micro_batch=int(os.getenv("TRANSFORM_MICRO_BATCH", "0")) or None,
+            grid=grid,
+        )
         self.loader = DataLoader()
         setup_logger()
 
@@ -29,9 +54,17 @@ class Pipeline:
         """
         start_time = time.time()
         self.logger.info("Starting the ETL pipeline")
-        extracted = self.extractor.extract()
-        transformed = self.transformer.transform(extracted)
-        self.loader.load_data(transformed)
+        if self.streaming:
+            stream(
+                self.extractor.extract_chunks(self.chunk_rows),
+                [("transform", self.transformer.transform)],
+                self.loader.append_data,
+            )
+            self.loader.commit()
+        else:
+            extracted = self.extractor.extract()
+            transformed = self.transformer.transform(extracted)
+            self.loader.load_data(transformed)
         self.logger.info("ETL pipeline completed successfully")
         self.logger.info(
             "--- %s minutes ---", round((time.time() - start_time) / 60, 2)
@@ -0,0 +1,272 @@
+"""
+This module defines a local columnar archive of the whole NHTSA complaints
+history. The flat file is saved as a Parquet dataset partitioned by model
+year and manufacturer, with a manifest of the CMPLID/ODINO ranges covered
+by each partition. Each run only appends the complaints newer than the
+archive and "new since watermark" queries only open the partitions that
+have complaints above the watermark.
+"""
+
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Collection, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from src.utils.logger import setup_logger
+from src.utils.parsing import arrow_schema, arrow_types_mapper
+from src.pipelines.NHTSA_VOQs.contracts.schemas.extract import schema
+
+PARTITION_COLUMNS = ["YEARTXT", "MFR_NAME"]
+
+
+class ComplaintsArchive:
+    """
+    Parquet dataset of complaints partitioned by YEARTXT and MFR_NAME.
+
+    Args:
+        path (str, optional): root folder of the dataset. Defaults to
+        ./data/raw/complaints_archive.
+        flush_rows (int, optional): rows buffered before writing files, keeps
+        the number of small files low on the first ingest. Defaults to 1M.
+
+    methods:
+        append: saves the complaints newer than the archive
+        read_since: loads complaints with ODINO above a watermark
+        read_range: loads complaints of some model years and ODINO range
+        model_years: complaints of each model year
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    def __init__(
+        self, path: str = "./data/raw/complaints_archive", flush_rows: int = 1_000_000
+    ) -> None:
+        self.path = path
+        self.flush_rows = flush_rows
+        self.columns: List[str] = list(schema.columns.keys())
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self.manifest = self.__load_manifest()
+
+    @property
+    def max_odino(self) -> int:
+        """
+        Highest ODINO saved in the archive, 0 when empty.
+        """
+        return int(self.manifest["max_odino"])
+
+    def append(self, frames: Iterable[pd.DataFrame]) -> int:
+        """
+        Saves the rows with ODINO above the archive max_odino. Frames must
+        come from the typed parse with all columns of the schema.
+
+        Args:
+            frames (Iterable[pd.DataFrame]): chunks of the complaints flat file
+
+        Returns:
+            int: number of rows appended
+        """
+        watermark, run_id = self.max_odino, uuid.uuid4().hex[:8]
+        buffer: List[pd.DataFrame] = []
+        buffered = appended = flushes = 0
+
+        for frame in frames:
+            delta = frame[frame["ODINO"] > watermark]
+            if delta.empty:
+                continue
+            buffer.append(delta)
+            buffered += len(delta)
+            if buffered >= self.flush_rows:
+                self.__write(pd.concat(buffer), f"{run_id}-{flushes}")
+                appended, buffer, buffered = appended + buffered, [], 0
+                flushes += 1
+
+        if buffer:
+            self.__write(pd.concat(buffer), f"{run_id}-{flushes}")
+            appended += buffered
+
+        self.manifest["runs"].append(
+            {"run_id": run_id, "rows": appended, "at": datetime.now().isoformat()}
+        )
+        self.__save_manifest()
+        self.logger.info("Archive: %s new complaints appended", appended)
+        return appended
+
+    def read_since(
+        self, watermark: int, manufacturer: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Loads the complaints with ODINO above the watermark, only reading the
+        partitions whose ODINO range goes above it.
+
+        Args:
+            watermark (int): last ODINO already processed
+            manufacturer (Optional[str], optional): MFR_NAME filter. Defaults
+            to None, all manufacturers.
+
+        Returns:
+            pd.DataFrame: complaints in the schema column order
+        """
+        return self.read_range(manufacturer, low=watermark)
+
+    def read_range(
+        self,
+        manufacturer: Optional[str] = None,
+        years: Optional[Collection[Optional[int]]] = None,
+        low: int = 0,
+        high: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Loads the complaints with low < ODINO <= high, only reading the
+        partitions of the model years whose ODINO range overlaps it.
+
+        Args:
+            manufacturer (Optional[str], optional): MFR_NAME filter. Defaults
+            to None, all manufacturers.
+            years (Optional[Collection[Optional[int]]], optional): model
+            years, None for the complaints without one. Defaults to None, all
+            model years.
+            low (int, optional): ODINO excluded lower bound. Defaults to 0.
+            high (Optional[int], optional): ODINO included upper bound.
+            Defaults to None, no bound.
+
+        Returns:
+            pd.DataFrame: complaints in the schema column order
+        """
+        import pyarrow.dataset as ds  # pylint: disable=C0415
+
+        partitions = [
+            info
+            for info in self.manifest["partitions"].values()
+            if info["max_odino"] > low
+            and (high is None or info["min_odino"] <= high)
+            and manufacturer in (None, info["MFR_NAME"])
+            and (years is None or info["YEARTXT"] in years)
+        ]
+        if not partitions:
+            return pd.DataFrame(columns=self.columns)
+
+        rows = ds.field("ODINO") > low
+        if high is not None:
+            rows &= ds.field("ODINO") <= high
+        known = sorted({i["YEARTXT"] for i in partitions if i["YEARTXT"] is not None})
+        predicate = ds.field("YEARTXT").isin(known) & rows
+        if any(info["YEARTXT"] is None for info in partitions):
+            predicate |= ds.field("YEARTXT").is_null() & rows
+        if manufacturer is not None:
+            predicate &= ds.field("MFR_NAME") == manufacturer
+
+        self.logger.info("Archive: reading %s partitions", len(partitions))
+        table = self.__dataset().to_table(filter=predicate)
+        df = table.to_pandas(types_mapper=arrow_types_mapper())
+        return df[self.columns].sort_values("CMPLID", ignore_index=True)
+
+    def model_years(self, manufacturer: Optional[str] = None) -> Dict[int, int]:
+        """
+        Complaints of each model year in the archive, from the manifest.
+
+        Args:
+            manufacturer (Optional[str], optional): MFR_NAME filter. Defaults
+            to None, all manufacturers.
+
+        Returns:
+            Dict[int, int]: rows by model year, -1 for the unknown year
+        """
+        rows: Dict[int, int] = {}
+        for info in self.manifest["partitions"].values():
+            if manufacturer in (None, info["MFR_NAME"]):
+                year = -1 if info["YEARTXT"] is None else info["YEARTXT"]
+                rows[year] = rows.get(year, 0) + info["rows"]
+        return dict(sorted(rows.items()))
+
+    def __dataset(self):
+        import pyarrow.dataset as ds  # pylint: disable=C0415
+
+        return ds.dataset(
+            self.path,
+            format="parquet",
+            partitioning=self.__partitioning(),
+            schema=self.__schema(),
+            exclude_invalid_files=True,
+        )
+
+    def __partitioning(self):
+        import pyarrow as pa  # pylint: disable=C0415
+        import pyarrow.dataset as ds  # pylint: disable=C0415
+
+        fields = self.__schema()
+        return ds.partitioning(
+            pa.schema([fields.field(name) for name in PARTITION_COLUMNS]),
+            flavor="hive",
+        )
+
+    def __schema(self):
+        import pyarrow as pa  # pylint: disable=C0415
+
+        # MFR_NAME is a partition key, so it is saved as plain string
+        fields = arrow_schema(schema, self.columns)
+        index = fields.get_field_index("MFR_NAME")
+        return fields.set(index, pa.field("MFR_NAME", pa.string()))
+
+    def __write(self, delta: pd.DataFrame, basename: str) -> None:
+        import pyarrow as pa  # pylint: disable=C0415
+        import pyarrow.dataset as ds  # pylint: disable=C0415
+
+        delta = delta.astype({"MFR_NAME": "object"})
+        table = pa.Table.from_pandas(
+            delta, schema=self.__schema(), preserve_index=False
+        )
+        ds.write_dataset(
+            table,
+            self.path,
+            format="parquet",
+            partitioning=self.__partitioning(),
+            basename_template=f"part-{basename}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            max_partitions=100_000,
+        )
+        self.__update_manifest(delta)
+
+    def __update_manifest(self, delta: pd.DataFrame) -> None:
+        stats = delta.groupby(PARTITION_COLUMNS, dropna=False, observed=True).agg(
+            rows=("ODINO", "size"),
+            min_odino=("ODINO", "min"),
+            max_odino=("ODINO", "max"),
+            min_cmplid=("CMPLID", "min"),
+            max_cmplid=("CMPLID", "max"),
+        )
+        for (year, maker), row in stats.iterrows():
+            year = None if pd.isna(year) else int(year)
+            maker = None if pd.isna(maker) else str(maker)
+            key = f"YEARTXT={year}/MFR_NAME={maker}"
+            info = self.manifest["partitions"].setdefault(
+                key, {"YEARTXT": year, "MFR_NAME": maker, "rows": 0}
+            )
+            info["rows"] += int(row["rows"])
+            for name in ("odino", "cmplid"):
+                low, high = int(row[f"min_{name}"]), int(row[f"max_{name}"])
+                info[f"min_{name}"] = min(info.get(f"min_{name}", low), low)
+                info[f"max_{name}"] = max(info.get(f"max_{name}", high), high)
+
+        self.manifest["max_odino"] = max(self.max_odino, int(delta["ODINO"].max()))
+        self.manifest["max_cmplid"] = max(
+            int(self.manifest["max_cmplid"]), int(delta["CMPLID"].max())
+        )
+        self.__save_manifest()
+
+    def __load_manifest(self) -> Dict:
+        if os.path.isfile(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        return {"max_odino": 0, "max_cmplid": 0, "partitions": {}, "runs": []}
+
+    def __save_manifest(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
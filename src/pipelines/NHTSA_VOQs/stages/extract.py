@@ -3,22 +3,57 @@ This module defines the basic flow of data Extraction from NHTSA portal
 """
 
 import os
+import csv
 import logging
 from io import BytesIO
 from zipfile import ZipFile
-from typing import Dict, List
+from typing import IO, Dict, List, Callable, Iterator, Optional, Set
 from datetime import date, datetime
 
-import bs4
 import pandas as pd
 import pandera as pa
 
 from src.utils.logger import setup_logger
 from src.utils.funtions import create_client
+from src.utils.parsing import read_typed_csv
+from src.utils.validation import SchemaValidator
+from src.utils.downloads import (
+    download_segmented,
+    download_to_spool,
+    iter_line_blocks,
+)
 from src.errors.extract_error import ExtractError
 from src.utils.decorators import retry, time_logger
 from src.pipelines.NHTSA_VOQs.contracts.schemas.extract import schema
 from src.pipelines.NHTSA_VOQs.contracts.extract_contract import ExtractContract
+from src.pipelines.NHTSA_VOQs.stages.archive import ComplaintsArchive
+from src.pipelines.NHTSA_VOQs.stages.offsets import OffsetIndex
+
+# raw columns consumed by the transform and load stages, the only ones kept
+# when the typed parse is enabled
+USED_COLUMNS = [
+    "CMPLID",
+    "ODINO",
+    "MFR_NAME",
+    "MAKETXT",
+    "MODELTXT",
+    "YEARTXT",
+    "CRASH",
+    "FAILDATE",
+    "FIRE",
+    "INJURED",
+    "DEATHS",
+    "COMPDESC",
+    "STATE",
+    "VIN",
+    "DATEA",
+    "LDATE",
+    "MILES",
+    "CDESCR",
+    "VEH_SPEED",
+    "DEALER_NAME",
+    "DEALER_STATE",
+]
 
 
 class DataExtractor:
@@ -27,13 +62,53 @@ class DataExtractor:
     1. Request dataset file from url
     2. Mounts the dataset as a pandas DataFrame
     3. Filters what's new and returns.
+
+    Args:
+        streaming (bool, optional): downloads the dataset to a spooled temp
+        file and parses it in blocks, filtering each one, so memory usage
+        depends on block_size and not on the archive size. Defaults to False.
+        block_size (int, optional): bytes parsed at each step of the
+        streaming mode. Defaults to 32 MiB.
+        segments (int, optional): concurrent byte ranges used to download the
+        dataset in streaming mode, 1 means a single stream. Defaults to 1.
+        typed (bool, optional): parses only USED_COLUMNS with dtypes derived
+        from the schema (see src.utils.parsing). Defaults to False.
+        engine (str, optional): parser of the typed mode, "c" or the
+        multithreaded "pyarrow". Defaults to "c".
+        archive (Optional[ComplaintsArchive], optional): streams the flat
+        file into the local Parquet archive, appending only complaints newer
+        than it, and answers the new cases from the archive. Defaults to None.
+        offsets (Optional[OffsetIndex], optional): byte offset index of the
+        flat file, the streaming and archive modes seek past the blocks
+        already processed instead of parsing them. Defaults to None.
+        validator (Optional[SchemaValidator], optional): validates the new
+        cases against the extract schema, on delta level the watermark is
+        LAST_ODINO_CAPTURED. Defaults to None.
     """
 
     logger = logging.getLogger(__name__)
     setup_logger()
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        streaming: bool = False,
+        block_size: int = 32 * 1024**2,
+        segments: int = 1,
+        typed: bool = False,
+        engine: str = "c",
+        archive: Optional[ComplaintsArchive] = None,
+        offsets: Optional[OffsetIndex] = None,
+        validator: Optional[SchemaValidator] = None,
+    ) -> None:
         self.columns: List[str] = list(schema.columns.keys())
+        self.streaming = streaming
+        self.block_size = block_size
+        self.segments = segments
+        self.typed = typed
+        self.engine = engine
+        self.archive = archive
+        self.offsets = offsets
+        self.validator = validator
 
     @time_logger(logger)
     @retry([ConnectionError])
@@ -49,32 +124,193 @@ class DataExtractor:
         """
         try:
             datasets = self.__extract_links_from_page(str(os.getenv("NHTSA_BASE_URL")))
-            retrived = self.__mount_dataset_from_content(datasets[0])
+            if self.archive is not None:
+                retrived = self.__mount_dataset_from_archive(datasets[0])
+            elif self.streaming:
+                retrived = self.__mount_dataset_from_stream(datasets[0])
+            else:
+                retrived = self.__mount_dataset_from_content(datasets[0])
             self.logger.info("Collected %s new cases", retrived.shape[0])
+            if self.validator is not None:
+                self.__validate(retrived)
             return ExtractContract(raw_data=retrived, extract_date=date.today())
 
         except Exception as exc:
             self.logger.exception(exc)
             raise ExtractError(str(exc)) from exc
 
+    def extract_chunks(self, chunk_rows: int = 500) -> Iterator[ExtractContract]:
+        """
+        Streaming version of extract, for the streaming pipeline. In streaming
+        mode the new cases are yielded as the flat file blocks are parsed,
+        otherwise the extracted dataset is split in chunks.
+
+        Args:
+            chunk_rows (int, optional): min cases of each chunk, the last one
+            may be smaller. Defaults to 500.
+
+        Raises:
+            ExtractError: error occurred during extraction
+
+        Yields:
+            Iterator[ExtractContract]: chunks of new cases
+        """
+        if self.archive is not None or not self.streaming:
+            contract = self.extract()
+            for start in range(0, len(contract.raw_data), chunk_rows):
+                yield contract._replace(
+                    raw_data=contract.raw_data.iloc[start : start + chunk_rows].copy()
+                )
+            return
+
+        try:
+            datasets = self.__extract_links_from_page(str(os.getenv("NHTSA_BASE_URL")))
+            pending: List[pd.DataFrame] = []
+            for chunk in self.__iter_new_cases(datasets[0]):
+                pending.append(chunk)
+                if sum(len(part) for part in pending) >= chunk_rows:
+                    yield self.__chunk_contract(pending)
+                    pending = []
+            if sum(len(part) for part in pending):
+                yield self.__chunk_contract(pending)
+
+        except Exception as exc:
+            self.logger.exception(exc)
+            raise ExtractError(str(exc)) from exc
+
+    def __chunk_contract(self, parts: List[pd.DataFrame]) -> ExtractContract:
+        chunk = pd.concat(parts, ignore_index=True)
+        self.logger.info("Collected a chunk of %s new cases", chunk.shape[0])
+        if self.validator is not None:
+            self.__validate(chunk)
+        return ExtractContract(raw_data=chunk, extract_date=date.today())
+
     # @pa.check_output(schema, lazy=True)
     def __mount_dataset_from_content(self, info: Dict) -> pd.DataFrame:
-        with create_client() as client:
+        with create_client(cache=True) as client:
             self.logger.info("Mounting extracted Dataset")
             resp = client.get(info["url"], timeout=160).content
 
         with ZipFile(BytesIO(resp)) as myzip:
             with myzip.open(myzip.namelist()[0]) as file:
-                df = pd.read_csv(file, sep="\t", header=None, names=self.columns)
+                df = self.__parse(file)
                 df.drop_duplicates(subset=["ODINO"], inplace=True)
 
+        return self.__filter_new_cases(df)
+
+    def __mount_dataset_from_stream(self, info: Dict) -> pd.DataFrame:
+        """
+        Streaming version of __mount_dataset_from_content. The zip member is
+        inflated while read and each block of lines is parsed and filtered
+        before the next one, only the new Ford cases are kept in memory.
+        """
+        return pd.concat(self.__iter_new_cases(info), ignore_index=True)
+
+    def __iter_new_cases(self, info: Dict) -> Iterator[pd.DataFrame]:
+        """
+        New Ford cases of each parsed block of the flat file, without the
+        cases already found in previous blocks.
+        """
+        self.logger.info("Streaming extracted Dataset")
+        spool = self.__download(info)
+        seen: Set[int] = set()
+
+        with spool, ZipFile(spool) as myzip:
+            with myzip.open(myzip.namelist()[0]) as file:
+                for chunk in self.__iter_chunks(
+                    file,
+                    int(str(os.getenv("LAST_ODINO_CAPTURED"))),
+                    self.__parse,
+                ):
+                    chunk = self.__filter_new_cases(chunk)
+                    chunk = chunk[~chunk["ODINO"].isin(seen)]
+                    chunk = chunk.drop_duplicates(subset=["ODINO"])
+                    seen.update(chunk["ODINO"])
+                    yield chunk
+
+    def __mount_dataset_from_archive(self, info: Dict) -> pd.DataFrame:
+        """
+        Streams the flat file into the archive and reads the new Ford cases
+        only from the archive partitions above LAST_ODINO_CAPTURED.
+        """
+        self.logger.info("Updating complaints archive")
+        spool = self.__download(info)
+
+        with spool, ZipFile(spool) as myzip:
+            with myzip.open(myzip.namelist()[0]) as file:
+                self.archive.append(
+                    self.__iter_chunks(
+                        file,
+                        self.archive.max_odino,
+                        lambda block: read_typed_csv(
+                            block, schema, self.columns, self.engine
+                        ),
+                    )
+                )
+
+        df = self.archive.read_since(
+            int(str(os.getenv("LAST_ODINO_CAPTURED"))), "Ford Motor Company"
+        )
+        return df.drop_duplicates(subset=["ODINO"], ignore_index=True)
+
+    def __iter_chunks(
+        self,
+        file: IO[bytes],
+        watermark: int,
+        parse: Callable[[IO[bytes]], pd.DataFrame],
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Parses the flat file block by block. With an offset index, the file
+        is first moved to the block holding the watermark and the offset of
+        every block parsed is recorded for the next run.
+        """
+        start, head = (
+            (0, b"") if self.offsets is None else self.offsets.seek(file, watermark)
+        )
+        for offset, block in iter_line_blocks(file, self.block_size, start, head):
+            chunk = parse(BytesIO(block))
+            if self.offsets is not None and not chunk.empty:
+                self.offsets.record(offset, block, chunk["ODINO"].max())
+            yield chunk
+
+        if self.offsets is not None:
+            self.offsets.save()
+
+    def __download(self, info: Dict) -> IO[bytes]:
+        if self.segments > 1:
+            return download_segmented(info["url"], self.segments, timeout=160)
+        with create_client(cache=True) as client:
+            return download_to_spool(client, info["url"], timeout=160)
+
+    def __parse(self, source: IO[bytes]) -> pd.DataFrame:
+        """
+        NHTSA flat file has one record per line and no quoted fields, every
+        parse disables quoting: a quote in a description never joins lines,
+        and the blocks of the streaming parse stay aligned with the records.
+        """
+        if self.typed:
+            return read_typed_csv(source, schema, USED_COLUMNS, engine=self.engine)
+        return pd.read_csv(
+            source, sep="\t", header=None, names=self.columns, quoting=csv.QUOTE_NONE
+        )
+
+    def __validate(self, df: pd.DataFrame) -> None:
+        report = self.validator.validate(
+            df, watermark=int(str(os.getenv("LAST_ODINO_CAPTURED")))
+        )
+        if not report.valid:
+            raise ValueError(f"Invalid extracted data: {report.summary()}")
+
+    def __filter_new_cases(self, df: pd.DataFrame) -> pd.DataFrame:
         return df[
             (df["ODINO"] > int(str(os.getenv("LAST_ODINO_CAPTURED"))))
             & (df["MFR_NAME"] == "Ford Motor Company")
         ]
 
     def __extract_links_from_page(self, url) -> List:
-        with create_client() as client:
+        import bs4  # pylint: disable=C0415
+
+        with create_client(cache=True) as client:
             self.logger.info("Acessing NHSTA datasets...")
             soup = bs4.BeautifulSoup(client.get(url).text, "html.parser")
 
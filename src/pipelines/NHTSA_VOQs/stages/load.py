@@ -3,15 +3,17 @@ This module defines the basic flow of data Loading from NHTSA portal
 """
 
 import logging
+import os
 from datetime import date
+from typing import List, Optional
 
 import pandas as pd
-from openpyxl import Workbook
-from dotenv import set_key, find_dotenv
 
+from src.utils.funtions import save_env_vars
 from src.utils.logger import setup_logger
 from src.errors.load_error import LoadError
 from src.utils.decorators import time_logger
+from src.infra.checkpoint import BatchCheckpoint
 from src.pipelines.NHTSA_VOQs.contracts.transform_contract import TransformContract
 
 
@@ -22,12 +24,20 @@ class DataLoader:
 
     methods:
         load_data: saves processed data in serialized file and database.
+        append_data: stages a chunk of the streaming pipeline.
+        commit: ends the streaming load, saving the chunks staged and moving
+        the watermark.
     """
 
     logger = logging.getLogger(__name__)
     setup_logger()
 
     def __init__(self) -> None:
+        self.appended = 0
+        self.max_odino = 0
+        self.checkpoint: Optional[BatchCheckpoint] = None
+        self.staged: List[pd.DataFrame] = []  # F8 cases of the sheet
+        self.path = ""  # CSV of the streaming run, staged until commit
         self.columns = [
             "CMPLID",
             "ODINO",
@@ -73,7 +83,8 @@ class DataLoader:
     @time_logger(logger=logger)
     def load_data(self, contract: TransformContract) -> None:
         """
-        Saves data localy in data/processed directory
+        Saves data localy in data/processed directory, the checkpoints of a
+        micro-batched transform are cleared once the data is saved
 
         Args:
             transform_contract (TransformContract): content processed
@@ -87,27 +98,82 @@ class DataLoader:
             self.__append_processed_data_excel(contract.content)
             self.__save_other_processed_data_csv(contract.content)
             self.__update_env_vars(contract.content["ODINO"].max())
+            if contract.checkpoint is not None:
+                contract.checkpoint.clear()
         except Exception as exc:
             self.logger.exception(exc)
             raise LoadError(str(exc)) from exc
 
-    def __save_other_processed_data_csv(self, content: pd.DataFrame) -> None:
+    def append_data(self, contract: TransformContract) -> None:
+        """
+        Streaming version of load_data, appends a chunk to a staging CSV and
+        keeps its F8 cases for the sheet. The sheet, the CSV of the run and
+        the watermark are only written on commit, a failed run leaves them
+        untouched.
+
+        Args:
+            contract (TransformContract): chunk processed
+
+        Raises:
+            LoadError: Error during serialization.
+        """
+        content = contract.content
+        self.path = self.path or self.__csv_path()
+        try:
+            content.to_csv(
+                self.path + ".part",
+                index=False,
+                mode="a" if self.appended > 0 else "w",
+                header=self.appended == 0,
+            )
+        except Exception as exc:
+            self.logger.exception(exc)
+            raise LoadError(str(exc)) from exc
+        self.staged.append(content[content["FUNCTION_"] == "F8"])
+        self.appended += content.shape[0]
+        self.max_odino = max(self.max_odino, int(contract.content["ODINO"].max()))
+        self.checkpoint = contract.checkpoint or self.checkpoint
+
+    def commit(self) -> None:
+        """
+        Ends the streaming load: writes the F8 cases staged to the sheet at
+        once, publishes the CSV of the run, moves the watermark to the last
+        case appended and clears the transform checkpoints.
+
+        Raises:
+            LoadError: no chunk appended or error during serialization.
+        """
+        if self.appended == 0:
+            raise LoadError("There is no new data")
+        try:
+            self.__append_processed_data_excel(pd.concat(self.staged))
+            os.replace(self.path + ".part", self.path)
+            self.__update_env_vars(self.max_odino)
+        except Exception as exc:
+            self.logger.exception(exc)
+            raise LoadError(str(exc)) from exc
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        self.logger.info(
+            "Streaming load done, %s cases saved on %s", self.appended, self.path
+        )
+        self.appended, self.max_odino, self.checkpoint = 0, 0, None
+        self.staged, self.path = [], ""
+
+    def __csv_path(self) -> str:
         today = date.today().strftime("%Y-%m-%d")
-        path = f"./data/processed/NHTSA_COMPLAINTS_PROCESSED_{today}.csv"
+        return f"./data/processed/NHTSA_COMPLAINTS_PROCESSED_{today}.csv"
 
+    def __save_other_processed_data_csv(self, content: pd.DataFrame) -> None:
+        today = date.today().strftime("%Y-%m-%d")
+        path = self.__csv_path()
         content.to_csv(path, index=False)
         self.logger.info("Run of (%s) done. Weekly data saved on %s", today, path)
 
     def __update_env_vars(self, odino: int) -> None:
-        set_key(
-            find_dotenv(),
-            "LAST_COMPLAINT_WAVE_DATE",
-            date.today().strftime("%Y%m%d"),
-        )
-        set_key(
-            find_dotenv(),
-            "LAST_ODINO_CAPTURED",
-            str(odino),
+        save_env_vars(
+            LAST_COMPLAINT_WAVE_DATE=date.today().strftime("%Y%m%d"),
+            LAST_ODINO_CAPTURED=str(odino),
         )
 
     def __append_processed_data_excel(self, dataset: pd.DataFrame) -> None:
@@ -175,6 +241,7 @@ class DataLoader:
                 )
         except FileNotFoundError as exc:
             self.logger.info(exc)
+            from openpyxl import Workbook  # pylint: disable=C0415
 
             workbook = Workbook()
             workbook.create_sheet(sheet_name)
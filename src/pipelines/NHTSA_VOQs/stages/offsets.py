@@ -0,0 +1,122 @@
+"""
+This module defines a sparse index of byte offsets of the uncompressed
+complaints flat file. Each entry marks the start of a parsed block with
+the CMPLID/ODINO of its first line and the highest ODINO inside it, so
+the next run can seek straight to the first block that may hold cases
+above the watermark instead of parsing the whole file.
+"""
+
+import json
+import logging
+import os
+from typing import IO, Dict, List, Optional, Tuple
+
+from src.utils.logger import setup_logger
+
+
+class OffsetIndex:
+    """
+    Sparse ODINO/CMPLID to byte offset index persisted between runs.
+
+    Args:
+        path (str, optional): json file of the index. Defaults to
+        ./data/raw/complaints_offsets.json.
+
+    methods:
+        seek: moves a stream close to the watermark, after verifying the index
+        record: saves the entry of a parsed block
+        save: persists the entries
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    def __init__(self, path: str = "./data/raw/complaints_offsets.json") -> None:
+        self.path = path
+        self.entries: List[Dict[str, int]] = []
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.entries = json.load(file)["entries"]
+
+    def seek(self, stream: IO[bytes], watermark: int) -> Tuple[int, bytes]:
+        """
+        Seeks the stream to the start of the first indexed block with ODINO
+        above the watermark. Blocks before it only hold older cases. The
+        entry is checked against the first line of the block, read without
+        seeking back, as a backward seek restarts the inflation of a zip
+        member. A stale index is discarded and the stream is rewound for a
+        full scan.
+
+        Args:
+            stream (IO[bytes]): seekable uncompressed flat file
+            watermark (int): last ODINO already processed
+
+        Returns:
+            Tuple[int, bytes]: offset of the block and its first line,
+            already read from the stream (see iter_line_blocks head)
+        """
+        position = next(
+            (i for i, e in enumerate(self.entries) if e["max_odino"] > watermark),
+            len(self.entries) - 1,
+        )
+        if position <= 0:
+            return 0, b""
+
+        entry = self.entries[position]
+        if (line := self.__verify(stream, entry)) is None:
+            self.logger.warning("Offset index is stale, running a full scan")
+            self.entries = []
+            stream.seek(0)
+            return 0, b""
+
+        self.entries = self.entries[:position]
+        self.logger.info("Offset index: skipping %s bytes", entry["offset"])
+        return entry["offset"], line
+
+    def record(self, offset: int, block: bytes, max_odino: int) -> None:
+        """
+        Saves the entry of a parsed block.
+
+        Args:
+            offset (int): offset of the block in the uncompressed file
+            block (bytes): block content, starting at a line
+            max_odino (int): highest ODINO inside the block
+        """
+        cmplid, odino = block.split(b"\t", 2)[:2]
+        self.entries.append(
+            {
+                "offset": offset,
+                "cmplid": int(cmplid),
+                "odino": int(odino),
+                "max_odino": int(max_odino),
+            }
+        )
+
+    def save(self) -> None:
+        """
+        Persists the entries on the json file.
+        """
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"entries": self.entries}, file)
+        os.replace(tmp_path, self.path)
+
+    def __verify(self, stream: IO[bytes], entry: Dict[str, int]) -> Optional[bytes]:
+        """
+        The byte before the offset must end a line and the line at the
+        offset must have the indexed CMPLID and ODINO, the line is returned.
+        """
+        try:
+            stream.seek(entry["offset"] - 1)
+            if stream.read(1) != b"\n":
+                return None
+            line = stream.readline()
+            cmplid, odino = line.split(b"\t", 2)[:2]
+            if (int(cmplid), int(odino)) != (entry["cmplid"], entry["odino"]):
+                return None
+            return line
+        except (ValueError, OSError):
+            return None
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,169 @@
+"""
+This module defines a local pre-classifier of the complaints, labeling the
+clear NOT F8 cases before the LLM classification, so only complaints that
+may be related to the body exterior cost an endpoint request.
+
+Each complaint gets a NOT F8 confidence: a prior from its NHTSA component
+(COMPDESC), lowered by each mention of a body exterior part in its
+description (CDESCR). Complaints at or above the threshold are gated.
+"""
+
+import re
+from typing import Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# NHTSA components that hold no body exterior failures
+MECHANICAL_COMPONENTS = (
+    "AIR BAGS",
+    "BACK OVER PREVENTION",
+    "CHILD SEAT",
+    "ELECTRONIC STABILITY CONTROL",
+    "ENGINE",
+    "FORWARD COLLISION AVOIDANCE",
+    "FUEL",
+    "HYBRID PROPULSION SYSTEM",
+    "LANE DEPARTURE",
+    "PARKING BRAKE",
+    "POWER TRAIN",
+    "SEAT BELTS",
+    "SEATS",
+    "SERVICE BRAKES",
+    "STEERING",
+    "SUSPENSION",
+    "TIRES",
+    "TRAILER",
+    "VEHICLE SPEED CONTROL",
+    "WHEELS",
+)
+BODY_COMPONENTS = (
+    "EXTERIOR LIGHTING",
+    "LATCHES/LOCKS/LINKAGES",
+    "STRUCTURE",
+    "VISIBILITY",
+)
+# body exterior words missing on the parts list of the prompt
+BODY_TERMS = (
+    "brake light",
+    "check arm",
+    "emblem",
+    "fender",
+    "grille",
+    "handle",
+    "hatch",
+    "headlamp",
+    "hinge",
+    "keypad",
+    "lamp",
+    "lift gate",
+    "liftgate",
+    "lock",
+    "mirror",
+    "molding",
+    "moulding",
+    "roof",
+    "seal",
+    "sunroof",
+    "tail gate",
+    "tailgate",
+    "taillight",
+    "trim",
+    "weather strip",
+)
+MECHANICAL_PRIOR = 0.9
+UNKNOWN_PRIOR = 0.5
+BODY_PRIOR = 0.1
+
+
+class GateReport(NamedTuple):
+    """
+    Gate result of a dataset.
+
+    Attributes:
+        gated (np.ndarray): mask of the complaints labeled NOT F8
+        confidence (np.ndarray): NOT F8 confidence of each complaint
+    """
+
+    gated: np.ndarray
+    confidence: np.ndarray
+
+    @property
+    def avoided(self) -> int:
+        """
+        Classification requests avoided.
+        """
+        return int(self.gated.sum())
+
+
+class F8PreGate:
+    """
+    Lexical pre-classifier of clear NOT F8 complaints.
+
+    Args:
+        parts (str): comma separated body exterior parts, as in the prompt
+        threshold (float, optional): NOT F8 confidence over which complaints
+        are gated. Defaults to 0.8, only mechanical components without any
+        body part mentioned.
+        keyword_factor (float, optional): confidence multiplier of each body
+        part mentioned. Defaults to 0.25.
+
+    methods:
+        confidence: NOT F8 confidence of each complaint
+        gate: complaints labeled NOT F8
+    """
+
+    def __init__(
+        self, parts: str, threshold: float = 0.8, keyword_factor: float = 0.25
+    ) -> None:
+        self.threshold = threshold
+        self.keyword_factor = keyword_factor
+        self.pattern = self.__compile(
+            [part.strip() for part in parts.split(",") if part.strip() != "etc"]
+            + list(BODY_TERMS)
+        )
+
+    def confidence(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        NOT F8 confidence of each complaint, from COMPDESC (when present)
+        and CDESCR columns.
+
+        Args:
+            data (pd.DataFrame): complaints
+
+        Returns:
+            np.ndarray: confidence between 0 and 1
+        """
+        prior = np.full(len(data), UNKNOWN_PRIOR)
+        if "COMPDESC" in data.columns:
+            # "STRUCTURE:BODY:DOOR" and "FUEL SYSTEM, GASOLINE" are compared
+            # by their first level
+            component = data["COMPDESC"].astype("string").str.split(r"[:,]", n=1).str[0]
+            component = component.str.strip().fillna("")
+            prior[
+                component.str.startswith(MECHANICAL_COMPONENTS).to_numpy()
+            ] = MECHANICAL_PRIOR
+            prior[component.str.startswith(BODY_COMPONENTS).to_numpy()] = BODY_PRIOR
+
+        hits = data["CDESCR"].astype("string").fillna("").str.count(self.pattern)
+        return prior * self.keyword_factor ** hits.to_numpy(dtype="float64")
+
+    def gate(self, data: pd.DataFrame) -> GateReport:
+        """
+        Complaints clear enough to be labeled NOT F8 without the LLM.
+
+        Args:
+            data (pd.DataFrame): complaints
+
+        Returns:
+            GateReport: gated mask and confidence
+        """
+        confidence = self.confidence(data)
+        return GateReport(confidence >= self.threshold, confidence)
+
+    @staticmethod
+    def __compile(terms: Iterable[str]) -> re.Pattern:
+        # longest first, so "door handle" counts once and not as "door"
+        ordered = sorted(set(terms), key=len, reverse=True)
+        words = "|".join(re.escape(term).replace(r"\ ", r"[\s-]?") for term in ordered)
+        return re.compile(rf"\b(?:{words})(?:s|es)?\b", re.IGNORECASE)
@@ -0,0 +1,67 @@
+"""
+This module defines some test cases for the local Parquet archive of the
+complaints history
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from src.pipelines.NHTSA_VOQs.contracts.schemas.extract import schema
+from src.pipelines.NHTSA_VOQs.stages.archive import ComplaintsArchive
+
+
+def _complaints(odinos, maker="Ford Motor Company", year=2020) -> pd.DataFrame:
+    df = pd.DataFrame({name: [None] * len(odinos) for name in schema.columns})
+    df["CMPLID"] = pd.array([odino - 10_000_000 for odino in odinos], dtype="UInt32")
+    df["ODINO"] = pd.array(odinos, dtype="UInt32")
+    df["MFR_NAME"] = maker
+    df["YEARTXT"] = pd.array([year] * len(odinos), dtype="UInt32")
+    df["CDESCR"] = "THE DOOR FELL OFF"
+    return df
+
+
+@pytest.fixture
+def setup(tmp_path):
+    """
+    test setup with an archive of two runs
+
+    Returns:
+        ComplaintsArchive: archive with complaints 11000000 to 11000005
+    """
+    archive = ComplaintsArchive(str(tmp_path / "archive"), flush_rows=2)
+    archive.append(
+        [
+            _complaints([11_000_000, 11_000_001], year=2018),
+            _complaints([11_000_002], maker="Toyota", year=2018),
+        ]
+    )
+    archive.append([_complaints([11_000_001, 11_000_003, 11_000_004, 11_000_005])])
+    return archive
+
+
+def test_archive_appends_only_delta(setup):
+    """
+    Test case for appending only complaints newer than the archive
+    """
+    archive = ComplaintsArchive(setup.path)
+
+    assert archive.max_odino == 11_000_005
+    assert [run["rows"] for run in archive.manifest["runs"]] == [3, 3]
+    partition = archive.manifest["partitions"][
+        "YEARTXT=2018/MFR_NAME=Ford Motor Company"
+    ]
+    assert (partition["min_odino"], partition["max_odino"]) == (11_000_000, 11_000_001)
+    assert os.path.isfile(os.path.join(setup.path, "manifest.json"))
+
+
+def test_archive_read_since_sucess(setup):
+    """
+    Test case for reading the new cases of a manufacturer
+    """
+    new = setup.read_since(11_000_001, "Ford Motor Company")
+
+    assert new["ODINO"].tolist() == [11_000_003, 11_000_004, 11_000_005]
+    assert list(new.columns) == list(schema.columns)
+    assert setup.read_since(11_000_005).empty
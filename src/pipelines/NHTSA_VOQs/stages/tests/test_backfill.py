@@ -0,0 +1,154 @@
+"""
+This module defines some test cases for the historical backfill of the
+archived complaints
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from src.pipelines.NHTSA_VOQs.contracts.schemas.extract import schema
+from src.pipelines.NHTSA_VOQs.main.backfill import Backfill, plan_partitions
+from src.pipelines.NHTSA_VOQs.stages.archive import ComplaintsArchive
+from src.pipelines.NHTSA_VOQs.stages.transform import DataTransformer, References
+
+
+def _complaints(odinos, maker="Ford Motor Company", year=2020) -> pd.DataFrame:
+    df = pd.DataFrame({name: [None] * len(odinos) for name in schema.columns})
+    df["CMPLID"] = pd.array([odino - 10_000_000 for odino in odinos], dtype="UInt32")
+    df["ODINO"] = pd.array(odinos, dtype="UInt32")
+    df["MFR_NAME"] = maker
+    df["YEARTXT"] = pd.array([year] * len(odinos), dtype="UInt32")
+    df["MODELTXT"] = "ESCAPE"
+    df["CDESCR"] = "THE DOOR FELL OFF"
+    return df
+
+
+@pytest.fixture
+def setup(monkeypatch, tmp_path):
+    """
+    test setup of an archive of three model years, in a folder with the
+    processed data and checkpoints, and a transform labeling by model year
+
+    Returns:
+        Dict[str, Any]: archive path and options of the transforms
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    os.makedirs("data/processed")
+    archive = ComplaintsArchive(str(tmp_path / "archive"))
+    archive.append(
+        [
+            _complaints([11_000_000, 11_000_003], year=2018),
+            _complaints([11_000_001], maker="Toyota", year=2018),
+            _complaints([11_000_002, 11_000_005], year=2019),
+            _complaints([11_000_004], year=2020),
+        ]
+    )
+    calls = {"archive": archive.path, "enrich": []}
+
+    def transform_complaints(transformer, contract, _):
+        calls["enrich"].append(transformer.enrich)
+        data = contract.raw_data
+        return data.assign(
+            BINNING=data["YEARTXT"].astype(str), VFG="DOORS", FULL_STATE="~"
+        )
+
+    monkeypatch.setattr(
+        DataTransformer, "_DataTransformer__transform_complaints", transform_complaints
+    )
+    monkeypatch.setattr(DataTransformer, "_DataTransformer__references", lambda _: None)
+    return calls
+
+
+def test_plan_partitions_sucess(setup):
+    """
+    Test case for Ford partitions by model year and by ODINO range
+    """
+    archive = ComplaintsArchive(setup["archive"])
+
+    by_year = plan_partitions(archive, "year", years=[2018, 2019])
+    by_odino = plan_partitions(archive, "odino", span=4)
+
+    assert [p.name for p in by_year] == ["year-2018", "year-2019"]
+    assert [(p.low, p.high) for p in by_odino] == [
+        (10_999_999, 11_000_003),
+        (11_000_003, 11_000_007),
+    ]
+    with pytest.raises(ValueError):
+        plan_partitions(archive, "state")
+
+
+def test_backfill_merge_sucess(setup):
+    """
+    Test case for the same merged output from both partitionings, with the
+    columns asked only
+    """
+    by_year = Backfill("year", columns=["BINNING"], workers=1, archive=setup["archive"])
+    report = by_year.run()
+    year_output = pd.read_csv(report.path)
+    os.remove(report.path)
+    by_odino = Backfill(
+        "odino", columns=["BINNING"], workers=1, span=2, archive=setup["archive"]
+    )
+    odino_output = pd.read_csv(by_odino.run().path)
+
+    assert report.partitions == 3 and report.rows == 5
+    assert year_output["ODINO"].tolist() == [
+        11_000_000,
+        11_000_002,
+        11_000_003,
+        11_000_004,
+        11_000_005,
+    ]
+    assert list(year_output.columns) == [
+        "ODINO",
+        "CMPLID",
+        "MODELTXT",
+        "YEARTXT",
+        "BINNING",
+    ]
+    assert year_output["BINNING"].tolist() == [2018, 2019, 2018, 2020, 2019]
+    pd.testing.assert_frame_equal(year_output, odino_output)
+    assert setup["enrich"][0] == frozenset({"BINNING"})
+    assert os.listdir("checkpoints/NHTSA_VOQs_backfill/year-2018") == []
+    with pytest.raises(ValueError):
+        Backfill(columns=["CDESCR"])
+
+
+def test_backfill_real_transform_sucess(monkeypatch, tmp_path):
+    """
+    Test case for the archived complaints, with the typed columns and an
+    unknown model year, through the transform with a mocked classifier
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    os.makedirs("data/processed")
+    complaints = _complaints([11_000_000, 11_000_001])
+    complaints["YEARTXT"] = pd.array([2020, None], dtype="UInt32")
+    complaints["CRASH"] = pd.array([True, False], dtype="boolean")
+    complaints["FAILDATE"] = pd.array([20240226, None], dtype="UInt32")
+    complaints["DATEA"] = pd.to_datetime(["20240301", None], format="%Y%m%d")
+    archive = ComplaintsArchive(str(tmp_path / "archive"))
+    archive.append([complaints])
+    monkeypatch.setattr(
+        DataTransformer,
+        "_DataTransformer__classify",
+        lambda _, texts, __: [["F8", "DOOR", "FELL OFF"] for _ in texts],
+    )
+    monkeypatch.setattr(
+        DataTransformer,
+        "_DataTransformer__references",
+        lambda _: References({"DOOR | FELL OFF": "V31"}, {}, {}, {}),
+    )
+
+    report = Backfill(workers=1, archive=archive.path).run()
+    output = pd.read_csv(report.path, keep_default_na=False)
+
+    assert report.partitions == 2 and report.rows == 2
+    assert output["YEARTXT"].tolist() == ["2020", ""]
+    assert output["CRASH"].tolist() == ["Y", "N"]
+    assert output["FAIL_QUARTER"].tolist() == ["Q1", "~"]
+    assert output["DATEA"].tolist()[0] == "03/01/2024"
+    assert output["VFG"].tolist() == ["V31", "V31"]
@@ -0,0 +1,134 @@
+"""
+This module defines some test cases for the micro-batched transform and
+its resume after a failure
+"""
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from src.errors.transform_error import TransformError
+from src.infra.checkpoint import BatchCheckpoint
+from src.pipelines.NHTSA_VOQs.contracts.extract_contract import ExtractContract
+from src.pipelines.NHTSA_VOQs.stages.transform import DataTransformer
+
+
+@pytest.fixture
+def setup(monkeypatch, tmp_path):
+    """
+    test setup replacing the enrichment of the complaints by a counted one,
+    failing on the complaints listed in "fail"
+
+    Returns:
+        Dict[str, Any]: complaints enriched and failing ones
+    """
+    calls = {"enriched": [], "fail": set()}
+
+    def transform_complaints(_, contract, __):
+        data = contract.raw_data
+        if calls["fail"] & set(data["ODINO"]):
+            raise TransformError("Classifier unavailable")
+        calls["enriched"].extend(data["ODINO"])
+        return data.assign(
+            FUNCTION_="F8", EXTRACTED_DATE=contract.extract_date.strftime("%m/%d/%Y")
+        )
+
+    monkeypatch.setattr(
+        DataTransformer, "_DataTransformer__transform_complaints", transform_complaints
+    )
+    monkeypatch.setattr(DataTransformer, "_DataTransformer__references", lambda _: None)
+    calls["checkpoint"] = str(tmp_path)
+    return calls
+
+
+def test_micro_batch_resume_sucess(setup):
+    """
+    Test case for a failed run restarted from its last committed batch
+    """
+    contract = ExtractContract(
+        pd.DataFrame({"ODINO": range(11_000_000, 11_000_010)}), date(2024, 3, 4)
+    )
+    setup["fail"] = {11_000_007}
+    with pytest.raises(TransformError):
+        DataTransformer(
+            micro_batch=3, checkpoint=BatchCheckpoint("NHTSA", setup["checkpoint"])
+        ).transform(contract)
+    assert setup["enriched"] == list(range(11_000_000, 11_000_006))
+
+    setup["fail"], setup["enriched"] = set(), []
+    checkpoint = BatchCheckpoint("NHTSA", setup["checkpoint"])
+    transformed = DataTransformer(micro_batch=3, checkpoint=checkpoint).transform(
+        contract
+    )
+
+    assert setup["enriched"] == list(range(11_000_006, 11_000_010))
+    assert checkpoint.restored == 2 and checkpoint.committed == 2
+    assert transformed.checkpoint is checkpoint
+    pd.testing.assert_frame_equal(
+        transformed.content,
+        contract.raw_data.assign(FUNCTION_="F8", EXTRACTED_DATE="03/04/2024"),
+    )
+
+
+def test_micro_batch_resume_next_day_sucess(setup):
+    """
+    Test case for a failed run restarted on the next day, the batches
+    committed are restored with the date of the new run
+    """
+    raw = pd.DataFrame({"ODINO": range(11_000_000, 11_000_006)})
+    setup["fail"] = {11_000_005}
+    with pytest.raises(TransformError):
+        DataTransformer(
+            micro_batch=3, checkpoint=BatchCheckpoint("NHTSA", setup["checkpoint"])
+        ).transform(ExtractContract(raw.copy(), date(2024, 3, 4)))
+
+    setup["fail"] = set()
+    checkpoint = BatchCheckpoint("NHTSA", setup["checkpoint"])
+    transformed = DataTransformer(micro_batch=3, checkpoint=checkpoint).transform(
+        ExtractContract(raw.copy(), date(2024, 3, 5))
+    )
+
+    assert checkpoint.restored == 1 and checkpoint.committed == 1
+    assert set(transformed.content["EXTRACTED_DATE"]) == {"03/05/2024"}
+
+
+def test_grid_join_sucess():
+    """
+    Test case for the GRID issues of the model and binning of each complaint
+    """
+    grid = pd.DataFrame(
+        {
+            "Issue #": ["24-101", "24-102", "24-103"],
+            "Affected Vehicles": ["ESCAPE", "ESCAPE", "BRONCO"],
+            "Binning": ["DOOR | OWD", "DOOR | OWD", "HOOD | F&F"],
+        }
+    )
+    data = pd.DataFrame(
+        {"MODELTXT": ["ESCAPE", "BRONCO", "ESCAPE"], "BINNING": ["DOOR | OWD"] * 3}
+    )
+    transformer = DataTransformer(grid=grid)
+
+    issues = transformer._DataTransformer__grid_issues(data)  # pylint: disable=W0212
+
+    assert list(issues) == ["24-101, 24-102", "", "24-101, 24-102"]
+
+
+def test_micro_batch_grid_changed_sucess(setup):
+    """
+    Test case for the batches transformed with other GRID issues, of the
+    same size, transformed again
+    """
+    contract = ExtractContract(
+        pd.DataFrame({"ODINO": range(11_000_000, 11_000_004)}), date(2024, 3, 4)
+    )
+    for issue in ["24-101", "24-102"]:
+        grid = pd.DataFrame(
+            {"Issue #": [issue], "Affected Vehicles": ["F-150"], "Binning": ["X"]}
+        )
+        checkpoint = BatchCheckpoint("NHTSA", setup["checkpoint"])
+        DataTransformer(micro_batch=2, checkpoint=checkpoint, grid=grid).transform(
+            contract
+        )
+
+        assert checkpoint.restored == 0 and checkpoint.committed == 2
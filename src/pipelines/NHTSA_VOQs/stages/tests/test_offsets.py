@@ -0,0 +1,78 @@
+"""
+This module defines some test cases for the byte offset index of the
+complaints flat file
+"""
+
+from io import BytesIO
+
+import pytest
+
+from src.utils.downloads import iter_line_blocks
+from src.pipelines.NHTSA_VOQs.stages.offsets import OffsetIndex
+
+
+class ForwardStream(BytesIO):
+    """
+    Stream refusing to seek back, as a zip member would start over
+    """
+
+    def seek(self, offset, whence=0):
+        if whence == 0 and offset < self.tell():
+            raise AssertionError(f"Seek back from {self.tell()} to {offset}")
+        return super().seek(offset, whence)
+
+
+def _flat_file(odinos) -> bytes:
+    return b"".join(
+        f"{odino - 10_000_000}\t{odino}\tFord Motor Company\n".encode()
+        for odino in odinos
+    )
+
+
+@pytest.fixture
+def setup(tmp_path):
+    """
+    test setup with an index built from a full scan
+
+    Returns:
+        Tuple[bytes, str]: flat file content and path of the saved index
+    """
+    content = _flat_file(range(11_000_000, 11_000_100))
+    index = OffsetIndex(str(tmp_path / "offsets.json"))
+    for offset, block in iter_line_blocks(BytesIO(content), 300):
+        odinos = [int(line.split(b"\t")[1]) for line in block.splitlines()]
+        index.record(offset, block, max(odinos))
+    index.save()
+    return content, index.path
+
+
+def test_offsets_seek_past_watermark_sucess(setup):
+    """
+    Test case for skipping the blocks below the watermark
+    """
+    content, path = setup
+    index, stream = OffsetIndex(path), ForwardStream(content)
+
+    start, head = index.seek(stream, 11_000_050)
+    blocks = list(iter_line_blocks(stream, 300, start, head))
+    lines = b"".join(block for _, block in blocks)
+    odinos = [int(line.split(b"\t")[1]) for line in lines.splitlines()]
+
+    assert 0 < start < len(content) and blocks[0][0] == start
+    assert content[start:].startswith(head) and head.endswith(b"\n")
+    assert odinos[0] <= 11_000_051 and odinos[-1] == 11_000_099
+    assert odinos == sorted(set(odinos))
+    assert all(entry["offset"] < start for entry in index.entries)
+
+
+def test_offsets_stale_index_full_scan_sucess(setup):
+    """
+    Test case for discarding an index that does not match the file
+    """
+    content, path = setup
+    index = OffsetIndex(path)
+    stream = BytesIO(b"999\t999\tToyota\n" + content)
+
+    assert index.seek(stream, 11_000_050) == (0, b"")
+    assert stream.tell() == 0
+    assert len(index) == 0
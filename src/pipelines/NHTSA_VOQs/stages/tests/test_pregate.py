@@ -0,0 +1,76 @@
+"""
+This module defines some test cases for the lexical F8 pre-gate
+"""
+
+import pandas as pd
+import pytest
+
+from src.pipelines.NHTSA_VOQs.stages.pregate import F8PreGate
+
+
+@pytest.fixture
+def setup():
+    """
+    test setup with complaints of mechanical, body and unknown components
+
+    Returns:
+        pd.DataFrame: complaints
+    """
+    return pd.DataFrame(
+        {
+            "COMPDESC": [
+                "ENGINE AND ENGINE COOLING",
+                "POWER TRAIN:AUTOMATIC TRANSMISSION",
+                "FUEL SYSTEM, GASOLINE",
+                "STRUCTURE:BODY",
+                "UNKNOWN OR OTHER",
+                None,
+            ],
+            "CDESCR": [
+                "ENGINE STALLED ON THE HIGHWAY.",
+                "TRANSMISSION SLIPS, ALSO THE REAR WINDOWS RATTLE.",
+                "FUEL PUMP FAILED.",
+                "NOTHING TO SAY.",
+                "THE ENGINE MAKES A NOISE.",
+                None,
+            ],
+        }
+    )
+
+
+def test_gate_sucess(setup):
+    """
+    Test case for only mechanical complaints without body parts being gated
+    """
+    gate = F8PreGate("door, window, tail light, etc")
+
+    report = gate.gate(setup)
+
+    assert report.gated.tolist() == [True, False, True, False, False, False]
+    assert report.avoided == 2
+    assert report.confidence[1] == pytest.approx(0.9 * 0.25)
+    assert F8PreGate("door", threshold=0.5).gate(setup).gated.tolist() == [
+        True,
+        True,
+        True,
+        False,
+        True,
+        True,
+    ]
+
+
+def test_gate_terms_sucess(setup):
+    """
+    Test case for part mentions with plurals, hyphens and longer terms first
+    """
+    gate = F8PreGate("door, door handle, tail light, etc")
+    texts = pd.Series(
+        [
+            "THE DOOR HANDLE BROKE",
+            "TAIL-LIGHTS AND TAILGATE",
+            "INDOOR NOISE",
+            "THE DOORS AND THE LIFT GATE",
+        ]
+    )
+
+    assert texts.str.count(gate.pattern).tolist() == [1, 2, 0, 2]
@@ -3,37 +3,90 @@ This module defines the basic flow of data Tranformation from data
 retrived from NHTSA.
 """
 
-import os
+import hashlib
 import logging
-from typing import List
-from functools import lru_cache
+from typing import Any, Collection, Dict, List, NamedTuple, Optional
 
-import httpx
+import numpy as np
 import pandas as pd
 
 from src.errors.transform_error import TransformError
+from src.infra.auth import classifier_credentials
+from src.infra.checkpoint import BatchCheckpoint
+from src.infra.classifier import MODEL, BatchOptions, Classifier, chat_content
+from src.infra.classification_store import ClassificationStore
+from src.infra.similarity_index import SimilarityIndex
+from src.infra.vin_enrichment import VIN_FIELDS, VinEnricher
 from src.pipelines.NHTSA_VOQs.contracts.extract_contract import ExtractContract
 from src.pipelines.NHTSA_VOQs.contracts.transform_contract import TransformContract
+from src.pipelines.NHTSA_VOQs.stages.pregate import F8PreGate
+from src.utils.dates import DateNormalizer
 from src.utils.logger import setup_logger
-from src.utils.decorators import rate_limiter, retry, time_logger
+from src.utils.map_unique import UniqueMapper
+from src.utils.parsing import raw_formats
+from src.utils.reference_data import reference_data
+from src.utils.decorators import time_logger
 from src.utils.funtions import (
-    load_categories,
-    convert_code_into_state,
-    get_quarter,
-    get_mileage_class,
-    classify_binning,
-    load_classifier_credentials,
     load_full_vins,
     load_new_models,
     load_vfgs,
 )
+from src.utils.vectorized import (
+    failure_modes,
+    mileage_classes,
+    quarters,
+    state_names,
+)
+
+CLASSIFICATION_COLUMNS = [
+    "FUNCTION_",
+    "COMPONET",
+    "FAILURE",
+    "BINNING",
+    "VFG",
+    "FAILURE_MODE",
+]
+# columns of the paid enrichments, the LLM classification and the VIN lookups
+ENRICHMENT_COLUMNS = CLASSIFICATION_COLUMNS + list(VIN_FIELDS.values())
+
+
+class References(NamedTuple):
+    """
+    Reference data of the transform, loaded once per run.
+    """
+
+    vfgs: Dict[str, str]
+    vins: Dict[str, str]
+    new_models: Dict[str, str]
+    credentials: Dict[str, Any]
 
 
 class DataTransformer:
     """
     Class to define the flow of the data transformation step
-    TODO: add informations from GRID dataset
-    TODO: add middle async function to handle processing of requests
+
+    Args:
+        batch_size (int, optional): complaints classified in each request,
+        1 sends one request per complaint. Defaults to 1.
+        gate_threshold (Optional[float], optional): NOT F8 confidence over
+        which complaints are labeled locally, without requests (see
+        F8PreGate). Defaults to None, all complaints are sent.
+        similarity_threshold (Optional[float], optional): similarity over
+        which complaints reuse the label of a near copy already classified
+        (see SimilarityIndex). Defaults to None, no reuse.
+        micro_batch (Optional[int], optional): complaints transformed at a
+        time, each transformed batch is checkpointed and a failed run
+        restarts from the batches already committed, even on a later day.
+        Defaults to None, the whole dataset at once (the pipeline passes the
+        TRANSFORM_MICRO_BATCH env var, 0 or not set for None).
+        checkpoint (Optional[BatchCheckpoint], optional): store of the
+        micro-batches. Defaults to the NHTSA_VOQs checkpoints.
+        grid (Optional[pd.DataFrame], optional): GRID issues processed, the
+        complaints get the issues of their model and binning in GRID_ISSUES.
+        Defaults to None, no join.
+        enrich (Optional[Collection[str]], optional): ENRICHMENT_COLUMNS
+        computed, the classification or the VIN lookups are skipped when
+        none of their columns is asked. Defaults to None, all of them.
 
     methods:
         transform -> TransformContract: increase the dataset, adding columns
@@ -42,7 +95,25 @@ class DataTransformer:
     logger = logging.getLogger(__name__)
     setup_logger()
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        batch_size: int = 1,
+        gate_threshold: Optional[float] = None,
+        similarity_threshold: Optional[float] = None,
+        micro_batch: Optional[int] = None,
+        checkpoint: Optional[BatchCheckpoint] = None,
+        grid: Optional[pd.DataFrame] = None,
+        enrich: Optional[Collection[str]] = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.gate_threshold = gate_threshold
+        self.similarity_threshold = similarity_threshold
+        self.micro_batch = micro_batch
+        self.checkpoint = checkpoint
+        self.grid = grid
+        self.enrich = None if enrich is None else frozenset(enrich)
+        # one client and store for every micro-batch of the run
+        self.enricher = VinEnricher() if self.__enriches(VIN_FIELDS.values()) else None
         self.parts = (
             "door, window, windshield, wiper, glass, hood, trunk, moonroof, "
             + "bumper, tail light, pillar, undershield, roof rack, latch, he"
@@ -66,81 +137,125 @@ class DataTransformer:
             TransformContract: contract with transformed data to the next step
         """
         try:
-            return TransformContract(content=self.__transform_complaints(contract))
+            if self.micro_batch is None:
+                return TransformContract(
+                    content=self.__transform_complaints(contract, self.__references())
+                )
+            self.checkpoint = self.checkpoint or BatchCheckpoint("NHTSA_VOQs")
+            return TransformContract(
+                content=self.__transform_micro_batches(
+                    contract, self.micro_batch, self.checkpoint
+                ),
+                checkpoint=self.checkpoint,
+            )
         except TransformError as exc:
             self.logger.exception(exc)
             raise exc
 
-    def __transform_complaints(self, contract: ExtractContract) -> pd.DataFrame:
+    def __transform_micro_batches(
+        self, contract: ExtractContract, size: int, checkpoint: BatchCheckpoint
+    ) -> pd.DataFrame:
+        """
+        Transforms size complaints at a time and commits each transformed
+        batch, batches committed by a failed run are restored
+
+        Args:
+            contract (ExtractContract): dataset collected
+            size (int): complaints of each batch
+            checkpoint (BatchCheckpoint): store of the transformed batches
+
+        Returns:
+            pd.DataFrame: transformed dataset
+        """
+        data = contract.raw_data
+        references = self.__references()
+        options = repr(
+            (
+                self.batch_size,
+                self.gate_threshold,
+                self.similarity_threshold,
+                self.__grid_digest(),
+                None if self.enrich is None else sorted(self.enrich),
+            )
+        )
+        batches = []
+        for start in range(0, len(data), size):
+            raw = data.iloc[start : start + size]
+            key = checkpoint.key(raw, options)
+            if (batch := checkpoint.get(key)) is None:
+                batch = self.__transform_complaints(
+                    ExtractContract(raw.copy(), contract.extract_date), references
+                )
+                checkpoint.put(key, batch)
+            elif "EXTRACTED_DATE" in batch:
+                # batch of a run started on an earlier day
+                batch["EXTRACTED_DATE"] = contract.extract_date.strftime("%m/%d/%Y")
+            batches.append(batch)
+        self.logger.info(
+            "Micro-batches: %s restored from checkpoint, %s transformed",
+            checkpoint.restored,
+            checkpoint.committed,
+        )
+        if not batches:
+            return self.__transform_complaints(contract, references)
+        return pd.concat(batches)
+
+    def __grid_digest(self) -> Optional[str]:
+        """
+        Digest of the content of the GRID issues, None without the join
+        """
+        if self.grid is None:
+            return None
+        hashes = pd.util.hash_pandas_object(self.grid, index=False)
+        return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+    def __references(self) -> References:
+        return References(
+            load_vfgs(), load_full_vins(), load_new_models(), classifier_credentials()
+        )
+
+    def __transform_complaints(
+        self, contract: ExtractContract, references: References
+    ) -> pd.DataFrame:
         """
         increments the dataset with addtional columns
         # TODO: parse formulas on certain columns https://openpyxl.readthedocs.io/en/stable/formula.html
         Args:
             contract (ExtractContract): dataset collected
+            references (References): reference data of the run
 
         Returns:
             List[TransformedDataset]: list of dict, alike a pandas dataframe
         """
-        data = contract.raw_data
-        vfgs = load_vfgs()
-        vins = load_full_vins()
-        new_models = load_new_models()
-        credentials = load_classifier_credentials()
-        gsar_token = "eyJ0eXAiOiJKV1QiLCJhbGciOiJSUzI1NiIsIng1dCI6ImFSZ2hZU01kbXI2RFZpMTdWVVJtLUJlUENuayJ9.eyJhdWQiOiJ1cm46Z3NhcjpyZXNvdXJjZTp3ZWI6cHJvZCIsImlzcyI6Imh0dHBzOi8vY29ycC5zdHMuZm9yZC5jb20vYWRmcy9zZXJ2aWNlcy90cnVzdCIsImlhdCI6MTcwOTU2NzEzOCwiZXhwIjoxNzA5NTk1OTM4LCJDb21tb25OYW1lIjoiVkRVQVJUMTAiLCJzdWIiOiJWRFVBUlQxMCIsInVpZCI6InZkdWFydDEwIiwiZm9yZEJ1c2luZXNzVW5pdENvZGUiOiJGU0FNUiIsImdpdmVuTmFtZSI6IlZpY3RvciIsInNuIjoiRHVhcnRlIiwiaW5pdGlhbHMiOiJWLiIsIm1haWwiOiJ2ZHVhcnQxMEBmb3JkLmNvbSIsImVtcGxveWVlVHlwZSI6Ik0iLCJzdCI6IkJBIiwiYyI6IkJSQSIsImZvcmRDb21wYW55TmFtZSI6IklOU1QgRVVWQUxETyBMT0RJIE4gUkVHSU9OQUwgQkFISUEiLCJmb3JkRGVwdENvZGUiOiIwNjY0Nzg0MDAwIiwiZm9yZERpc3BsYXlOYW1lIjoiRHVhcnRlLCBWaWN0b3IgKFYuKSIsImZvcmREaXZBYmJyIjoiUFJEIiwiZm9yZERpdmlzaW9uIjoiUEQgT3BlcmF0aW9ucyBhbmQgUXVhbGl0eSIsImZvcmRDb21wYW55Q29kZSI6IjAwMDE1ODM4IiwiZm9yZE1hbmFnZXJDZHNpZCI6Im1tYWdyaTEiLCJmb3JkTVJSb2xlIjoiTiIsImZvcmRTaXRlQ29kZSI6IjY1MzYiLCJmb3JkVXNlclR5cGUiOiJFbXBsb3llZSIsImFwcHR5cGUiOiJQdWJsaWMiLCJhcHBpZCI6InVybjpnc2FyOmNsaWVudGlkOndlYjpwcm9kIiwiYXV0aG1ldGhvZCI6Imh0dHA6Ly9zY2hlbWFzLm1pY3Jvc29mdC5jb20vd3MvMjAwOC8wNi9pZGVudGl0eS9hdXRoZW50aWNhdGlvbm1ldGhvZC93aW5kb3dzIiwiYXV0aF90aW1lIjoiMjAyNC0wMy0wNFQxNTo1MDozOC4yNTJaIiwidmVyIjoiMS4wIn0.lYjmzFBWdsfgxXjstnnpX09kljnga5YtbhlvsrvOx1IReKftzNQDd-mHSaOkP9YON7AVc85GAZzUsipZOfYUBMIOVNuG4-QhzbBiyHI3G_vJUTkk7US3YjJzOiH1_Ds6xs8EkfYX0sJEcWLHP5O0-7OTrTsbQamdLlzj08uMwJ0-fl60oHqhpPz2VGx2uMnBKS8vtweVZ_vWMk11KVs44y63T95Ozgybk-2MChF7VOTnn6zUmdCS5IiqFMjsZ0byiRB39aUYSMSMzG6MbJTHn9afCrwFZoea2Jc-IEa5gmCF7lYMGa5OiLQLgEqJBuQq8QjNCoU1FlUC5sGDepDhIg"
+        # typed parses (see DataExtractor typed and the archive) as raw ones
+        data = raw_formats(contract.raw_data)
+        vfgs, vins, new_models, credentials = references
+        mapper = UniqueMapper()
 
         try:
             data["MODELTXT"].replace(new_models)
-            data["YEARTXT"] = data["YEARTXT"].astype("int64").replace(9999, None)
-            data["FULL_STATE"] = data["STATE"].apply(convert_code_into_state)
-            data["FAIL_QUARTER"] = data["FAILDATE"].apply(get_quarter)
+            # nullable, the archive keeps complaints without a model year
+            data["YEARTXT"] = data["YEARTXT"].astype("Int64").replace(9999, None)
+            data["FULL_STATE"] = state_names(data["STATE"])
+            data["FAIL_QUARTER"] = quarters(data["FAILDATE"])
             data["FULL_VIN"] = data["ODINO"].apply(lambda x: vins.get(x, " ~ "))
-            data[["FUNCTION_", "COMPONET", "FAILURE"]] = (
-                data["CDESCR"]
-                .apply(
-                    lambda row: self.__classify_case(
-                        row, credentials["url"], credentials["token"]
-                    )
+            if self.__enriches(CLASSIFICATION_COLUMNS):
+                gated = self.__gate(data)
+                classified = iter(
+                    self.__classify(data.loc[~gated, "CDESCR"].tolist(), credentials)
                 )
-                .to_list()
-            )
-            data["BINNING"] = data["COMPONET"] + " | " + data["FAILURE"]
-            data["VFG"] = data["BINNING"].apply(lambda x: vfgs.get(x, " ~ "))
-            data["FAILURE_MODE"] = data["BINNING"].apply(classify_binning)
-            data[
-                [
-                    "PROD_DATE",
-                    "VEHICLE_LINE_WERS",
-                    "VEHICLE_LINE_GSAR",
-                    "VEHICLE_LINE_GLOBAL",
-                    "ASSEMBLY_PLANT",
-                    "WARRANTY_START_DATE",
+                data[["FUNCTION_", "COMPONET", "FAILURE"]] = [
+                    ["NOT F8", "~", "~"] if skip else next(classified) for skip in gated
                 ]
-            ] = (
-                data["FULL_VIN"]
-                .apply(lambda vin: self.__get_info_by_vin(vin, gsar_token))
-                .to_list()
-            )
-            data["DATEA"] = pd.to_datetime(data["DATEA"], format="%Y%m%d").dt.strftime(
-                "%m/%d/%Y"
-            )
-            data["LDATE"] = pd.to_datetime(data["LDATE"], format="%Y%m%d").dt.strftime(
-                "%m/%d/%Y"
-            )
-            data["FAILDATE"] = pd.to_datetime(
-                data["FAILDATE"], format="%Y%m%d"
-            ).dt.strftime("%m/%d/%Y")
-            data["PROD_DATE"] = (
-                pd.to_datetime(data["PROD_DATE"], format="%d-%b-%Y", errors="coerce")
-                .dt.strftime("%m/%d/%Y")
-                .replace({"NaT": ""}, regex=True)
-            )
-            data["WARRANTY_START_DATE"] = (
-                pd.to_datetime(
-                    data["WARRANTY_START_DATE"], format="%d-%b-%Y", errors="coerce"
-                )
-                .dt.strftime("%m/%d/%Y")
-                .replace({"NaT": ""}, regex=True)
-            )
+                data["BINNING"] = data["COMPONET"] + " | " + data["FAILURE"]
+                data["VFG"] = mapper.map(data["BINNING"], lambda x: vfgs.get(x, " ~ "))
+                data["FAILURE_MODE"] = failure_modes(data["BINNING"])
+            dates = DateNormalizer.default()
+            dates.normalize_columns(data, ["DATEA", "LDATE", "FAILDATE"], strict=True)
+            if self.enricher is not None:
+                enriched = self.enricher.enrich(data["FULL_VIN"])
+                data[list(VIN_FIELDS.values())] = enriched
+                dates.normalize_columns(data, ["PROD_DATE", "WARRANTY_START_DATE"])
             data["REPAIR_DATE_1"] = ""
             data["REPAIR_DATE_2"] = ""
             data["To_be_Binned"] = ""
@@ -148,74 +263,133 @@ class DataTransformer:
                 "New"  # https://openpyxl.readthedocs.io/en/stable/formula.html
             )
             data["New_Failure_Mode"] = ""
-            data["MILEAGE_CLASS"] = data["MILES"].apply(get_mileage_class)
+            data["MILEAGE_CLASS"] = mileage_classes(data["MILES"])
             data["EXTRACTED_DATE"] = contract.extract_date.strftime("%m/%d/%Y")
+            if self.grid is not None and "BINNING" in data:
+                data["GRID_ISSUES"] = self.__grid_issues(data)
 
         except Exception as exc:
             self.logger.exception(exc)
             raise exc
 
-        # grid = pd.read_csv("./data/processed/GRID_PROCESSED_2024-02-27.csv")
-        # grid.rename(
-        #     columns={"Affected Vehicles": "MODELTXT", "Binning": "BINNING"},
-        #     inplace=True,
-        # )
-        # merged_df = pd.merge(data, grid, on=["MODELTXT", "BINNING"], how="left")
-
         return data
 
-    @retry([Exception])
-    @rate_limiter(70, 1)
-    @lru_cache(maxsize=70)
-    def __get_info_by_vin(self, vin: str, token: str) -> list[str | None]:
-        # TODO: change this to retrive from BigQuery
-        keys = ["prodDate", "wersVl", "awsVl", "globVl", "plant", "origWarantDate"]
-        retrived = dict.fromkeys(keys, "")
-
-        if vin and vin[-1] != "*" and len(vin) == 17:
-            response = httpx.get(
-                str(os.getenv("GSAR_WERS_URL")),
-                params={"vin": vin},
-                headers={"Authorization": f"Bearer {token}"},
-                proxies={
-                    "http://": "http://internet.ford.com:83",
-                    "https://": "http://internet.ford.com:83",
-                },
+    def __enriches(self, columns: Collection[str]) -> bool:
+        return self.enrich is None or not self.enrich.isdisjoint(columns)
+
+    def __grid_issues(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        GRID issues of the model and binning of each complaint
+
+        Args:
+            data (pd.DataFrame): complaints classified
+
+        Returns:
+            np.ndarray: issue numbers separated by commas, "" without issues
+        """
+        issues = (
+            self.grid.astype(str)  # type: ignore
+            .rename(columns={"Affected Vehicles": "MODELTXT", "Binning": "BINNING"})
+            .groupby(["MODELTXT", "BINNING"])["Issue #"]
+            .agg(", ".join)
+            .rename("GRID_ISSUES")
+        )
+        joined = data[["MODELTXT", "BINNING"]].join(issues, on=["MODELTXT", "BINNING"])
+        return joined["GRID_ISSUES"].fillna("").to_numpy()
+
+    def __classify(
+        self, texts: List[str], credentials: Dict[str, Any]
+    ) -> List[List[str]]:
+        """
+        Classifies complaints with the LLM, near copies of complaints already
+        classified with the same prompt reuse their labels
+
+        Args:
+            texts (List[str]): complaint descriptions
+            credentials (Dict[str, Any]): classifier url and auth
+
+        Returns:
+            List[List[str]]: function, component and failure of each complaint
+        """
+        prompt = self.__build_prompt()
+        namespace = hashlib.sha256((prompt + MODEL).encode()).hexdigest()
+        index: Optional[SimilarityIndex] = None
+        reused: List[Optional[List[str]]] = [None] * len(texts)
+        if self.similarity_threshold is not None:
+            index = SimilarityIndex.default()
+            reused = index.lookup_many(texts, namespace, self.similarity_threshold)
+
+        pending = [text for text, label in zip(texts, reused) if label is None]
+        store = ClassificationStore.default()
+        classifier = Classifier(credentials["url"], credentials["auth"], store=store)
+        classified = classifier.classify(
+            [chat_content(complaint + prompt) for complaint in pending],
+            self.__process_response,
+            ["NOT CLASSIFIED", "~", "~"],
+            keys=[store.key(text, prompt, MODEL) for text in pending],
+            batch=(
+                BatchOptions(
+                    pending,
+                    prompt,
+                    size=self.batch_size,
+                    is_valid=lambda answer: "~~~" in answer,
+                )
+                if self.batch_size > 1
+                else None
+            ),
+        )
+        if index is not None:
+            answered = [
+                (text, label)
+                for text, label in zip(pending, classified)
+                if label[0] != "NOT CLASSIFIED"
+            ]
+            index.add_many(
+                [text for text, _ in answered],
+                [label for _, label in answered],
+                namespace,
             )
-            data = dict(response.json())
-            for key in keys:
-                if key in data:
-                    retrived[key] = str(data.get(key))
 
-        return list(retrived.values())
+        answers = iter(classified)
+        return [next(answers) if label is None else label for label in reused]
 
-    @retry([Exception])
-    @rate_limiter(70, 1)
-    @lru_cache(maxsize=70)
-    def __classify_case(self, complaint: str, url: str, token: str) -> List[str]:
+    def __gate(self, data: pd.DataFrame) -> np.ndarray:
         """
-        Uses ChatGPT-4.0 to classify each recall by failure mode
+        Complaints labeled NOT F8 by the local pre-classifier
 
         Args:
-            decription (str): complaint description
-            url (str): api endpoint
-            token (str): authorization token
+            data (pd.DataFrame): complaints
 
-        Raises:
-            exc: ConnectionError, API not responded
+        Returns:
+            np.ndarray: mask of the complaints not sent to the classifier
+        """
+        if self.gate_threshold is None:
+            return np.zeros(len(data), dtype=bool)
+        report = F8PreGate(self.parts, self.gate_threshold).gate(data)
+        self.logger.info(
+            "F8 pre-gate: %s of %s complaints labeled NOT F8, requests avoided",
+            report.avoided,
+            len(data),
+        )
+        return report.gated
+
+    def __build_prompt(self) -> str:
+        """
+        Instructions sent after each complaint to classify it by failure mode,
+        the same for every complaint, so it is built once per run
 
         Returns:
-            str: result of classificaiton (failure mode)
+            str: classification instructions
         """
-        categories = load_categories("Binnings")
-        text = (
+        categories = reference_data().prompts["binnings"]
+        return (
             "Question 1: For this complaint, check if it's related to an ext"
             + f"ernal part of the car, body exterior, ({self.parts}). If yes"
             + ", answer 'F8'. IF not, answer 'NOT F8'. Note that most of the"
             + " problems related to power liftgate electrical problems and r"
             + "ear view camera are NOT F8. Question 2: For each of these sen"
             + "tences that your answer 1 was 'F8', check if it is related to"
-            + f" only one of the following categories: {list(categories)}. Y"
+            + f" only one of the following categories: {categories}. Y"
             + "ou should give only one answer with one answer for Question 1"
             + " and one answer for Question 2 in the following format: 'ANSW"
             + "ER 1~~~ANSWER 2'. Note: 'OWD' means 'opened while driving' an"
@@ -228,30 +402,6 @@ class DataTransformer:
             + "assist, answer 1, and answer 2 must be NA. You should be obje"
             + "ctive and cold. Never change the answer format mentioned."
         )
-        content = {
-            "model": "gpt-4",
-            "context": (
-                "You are a helpful text reader and analyzer. You need to give me 2 answers."
-            ),  # sets the overall behavior of the assistant.
-            "messages": [{"role": "user", "content": complaint + text}],
-            "parameters": {
-                "temperature": 0.05,  # Determines the randomnes of the model's response.
-            },
-        }
-        try:
-            response = httpx.post(
-                url,
-                headers={"Authorization": f"Bearer {token}"},
-                json=content,
-                timeout=360,
-            )
-        except Exception as exc:
-            self.logger.exception(exc)
-            raise TransformError(str(exc)) from Exception
-
-        if response.status_code == 200:
-            return self.__process_response(response.json()["content"])
-        return ["NOT CLASSIFIED", "~", "~"]
 
     def __process_response(self, message: str) -> List[str]:
         """
@@ -267,8 +417,8 @@ class DataTransformer:
         if "\n" in message:
             message = message.split("\n")[0]
 
-        if len(parts := message.split("~~~")) == 2:
-            function, result = parts
+        if len(parts := message.strip(" '\"`").split("~~~")) == 2:
+            function, result = (part.strip() for part in parts)
 
             if function == "NOT F8":
                 return [function, "~", "~"]
@@ -277,7 +427,7 @@ class DataTransformer:
                 if "|" not in result:
                     return [function, "~", result]
 
-                component, failure = result.split(" | ")
+                component, failure = (part.strip() for part in result.split("|", 1))
                 return [function, component, failure]
 
         return ["NOT CLASSIFIED", "~", "~"]
@@ -0,0 +1,223 @@
+"""
+This module runs several pipelines of the process concurrently, as a small
+DAG: each pipeline starts once the pipelines it depends on are over, the
+independent ones run side by side. GRID runs before NHTSA_VOQs, whose
+complaints are joined to the GRID issues of their model and binning.
+
+The pipelines share the process wide resources: the pooled http clients,
+the OAuth tokens, the reference data and the caches. They are created once,
+before any pipeline starts, instead of once per pipeline. The run ends with
+a timing report of every pipeline.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from importlib import import_module
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.utils.logger import setup_logger
+
+SUCCEEDED, FAILED = "succeeded", "failed"
+
+
+class Node(NamedTuple):
+    """
+    Pipeline of the DAG.
+
+    Attributes:
+        name (str): pipeline name
+        build (Callable[[], Any]): creates the pipeline, an object with a
+        run() method, once the pipelines it depends on are over
+        after (Tuple[str, ...]): pipelines it waits for, whatever their
+        outcome, when they are selected too
+    """
+
+    name: str
+    build: Callable[[], Any]
+    after: Tuple[str, ...] = ()
+
+
+class PipelineResult(NamedTuple):
+    """
+    Outcome of a pipeline.
+
+    Attributes:
+        name (str): pipeline name
+        status (str): "succeeded" or "failed"
+        start (float): seconds after the start of the run
+        seconds (float): duration of the pipeline
+        error (Optional[str]): error of a failed pipeline
+    """
+
+    name: str
+    status: str
+    start: float
+    seconds: float
+    error: Optional[str] = None
+
+
+class RunReport(NamedTuple):
+    """
+    Combined timing of a run.
+
+    Attributes:
+        elapsed (float): seconds of the run
+        results (List[PipelineResult]): pipelines in the order they ended
+    """
+
+    elapsed: float
+    results: List[PipelineResult]
+
+    @property
+    def succeeded(self) -> bool:
+        """
+        All pipelines succeeded.
+        """
+        return all(result.status == SUCCEEDED for result in self.results)
+
+    def summary(self) -> str:
+        """
+        One line per pipeline and the time saved over a sequential run.
+        """
+        lines = [
+            f"{result.name:<20} {result.status:<10} start {result.start:7.1f}s"
+            + f"  took {result.seconds:7.1f}s"
+            + (f"  ({result.error})" if result.error else "")
+            for result in self.results
+        ]
+        sequential = sum(result.seconds for result in self.results)
+        lines.append(
+            f"total {self.elapsed:.1f}s, {sequential:.1f}s if run one at a time"
+        )
+        return "\n".join(lines)
+
+
+def _pipeline(name: str) -> Any:
+    return import_module(f"src.pipelines.{name}.main.pipeline").Pipeline
+
+
+def _voqs() -> Any:
+    # GRID is over, its issues processed so far are joined to the complaints
+    from src.utils.funtions import load_grid_issues  # pylint: disable=C0415
+
+    return _pipeline("NHTSA_VOQs")(grid=load_grid_issues())
+
+
+PIPELINES: Dict[str, Node] = {
+    "GRID": Node("GRID", lambda: _pipeline("GRID")()),
+    "NHTSA_VOQs": Node("NHTSA_VOQs", _voqs, after=("GRID",)),
+    "CompetitiveAnalysis": Node(
+        "CompetitiveAnalysis", lambda: _pipeline("CompetitiveAnalysis")()
+    ),
+}
+
+
+def share_resources() -> None:
+    """
+    Creates the process wide resources before the pipelines start, so the
+    concurrent pipelines share them instead of racing to create their own.
+    """
+    # pylint: disable=C0415
+    from src.infra.auth import TokenManager
+    from src.infra.classification_store import ClassificationStore
+    from src.infra.http_cache import HttpCache
+    from src.infra.http_pool import ClientPool
+    from src.utils.dates import DateNormalizer
+    from src.utils.reference_data import reference_data
+
+    ClientPool.default()
+    HttpCache.default()
+    TokenManager.default()
+    ClassificationStore.default()
+    DateNormalizer.default()
+    reference_data()
+
+
+class PipelineRunner:
+    """
+    Runs the selected pipelines concurrently, in the order of their
+    dependencies.
+
+    Args:
+        names (Optional[Sequence[str]], optional): pipelines to run.
+        Defaults to None, all of them.
+        nodes (Optional[Dict[str, Node]], optional): DAG of the pipelines.
+        Defaults to PIPELINES.
+
+    methods:
+        run: runs the pipelines and reports their timing
+
+    Raises:
+        ValueError: unknown pipeline name or dependency cycle
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    def __init__(
+        self,
+        names: Optional[Sequence[str]] = None,
+        nodes: Optional[Dict[str, Node]] = None,
+    ) -> None:
+        self.nodes = PIPELINES if nodes is None else nodes
+        names = list(self.nodes) if names is None else list(names)
+        if unknown := [name for name in names if name not in self.nodes]:
+            raise ValueError(f"Unknown pipelines: {', '.join(unknown)}")
+        self.selected = {
+            name: tuple(dep for dep in self.nodes[name].after if dep in names)
+            for name in names
+        }
+        self.__check_cycles()
+
+    def run(self) -> RunReport:
+        """
+        Runs the pipelines, a pipeline failure does not stop the others.
+
+        Returns:
+            RunReport: outcome and timing of each pipeline
+        """
+        share_resources()
+        start = time.perf_counter()
+        pending = dict(self.selected)
+        results: List[PipelineResult] = []
+        done: set = set()
+        with ThreadPoolExecutor(max(1, len(pending))) as executor:
+            running: Dict[Future, str] = {}
+            while pending or running:
+                for name in [n for n, deps in pending.items() if done >= set(deps)]:
+                    del pending[name]
+                    self.logger.info("Pipeline %s started", name)
+                    running[executor.submit(self.__run_node, name, start)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done.add(running.pop(future))
+                    results.append(future.result())
+
+        report = RunReport(time.perf_counter() - start, results)
+        self.logger.info("Pipelines run:\n%s", report.summary())
+        return report
+
+    def __run_node(self, name: str, start: float) -> PipelineResult:
+        began = time.perf_counter()
+        try:
+            self.nodes[name].build().run()
+        except Exception as exc:  # pylint: disable=W0718
+            self.logger.error("Pipeline %s failed: %r", name, exc)
+            return PipelineResult(
+                name, FAILED, began - start, time.perf_counter() - began, repr(exc)
+            )
+        return PipelineResult(
+            name, SUCCEEDED, began - start, time.perf_counter() - began
+        )
+
+    def __check_cycles(self) -> None:
+        done: set = set()
+        pending = dict(self.selected)
+        while pending:
+            ready = [name for name, deps in pending.items() if done >= set(deps)]
+            if not ready:
+                raise ValueError(f"Dependency cycle among: {', '.join(pending)}")
+            for name in ready:
+                del pending[name]
+                done.add(name)
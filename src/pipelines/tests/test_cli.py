@@ -0,0 +1,71 @@
+"""
+This module defines some test cases for the command line entry
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+import src.__main__ as cli
+from src.pipelines import runner
+from src.pipelines.runner import PipelineResult, RunReport
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    """
+    test setup replacing the runner by one recording its pipelines
+
+    Returns:
+        Dict[str, Any]: pipelines asked and the status of the run
+    """
+    calls = {"status": "succeeded"}
+
+    class FakeRunner:
+        """
+        Runner recording the pipelines asked
+        """
+
+        def __init__(self, names=None):
+            calls["names"] = names
+
+        def run(self):
+            """
+            Report of a single pipeline with the status asked
+            """
+            return RunReport(0.0, [PipelineResult("GRID", calls["status"], 0.0, 0.0)])
+
+    monkeypatch.setattr(runner, "PipelineRunner", FakeRunner)
+    monkeypatch.setenv("PIPELINE_STREAMING", "false")
+    return calls
+
+
+def test_cli_run_sucess(setup):
+    """
+    Test case for the run subcommand and its exit status
+    """
+    assert cli.main(["run", "GRID", "--streaming"]) == 0
+    assert setup["names"] == ["GRID"]
+    assert cli.os.environ["PIPELINE_STREAMING"] == "true"
+
+    setup["status"] = "failed"
+    assert cli.main(["run"]) == 1
+    assert setup["names"] is None
+
+
+def test_cli_lazy_imports_sucess():
+    """
+    Test case for the startup of the entry, no stage module is imported
+    before a subcommand runs
+    """
+    code = (
+        "import sys, src.__main__ as cli; cli.parser().parse_args(['list']); "
+        + "print(sorted(m for m in sys.modules if m.split('.')[0] in "
+        + "('pandas', 'httpx', 'pandera', 'openpyxl', 'bs4', 'coloredlogs')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,136 @@
+"""
+This module defines some test cases for the concurrent pipelines runner
+"""
+
+import threading
+import time
+
+import pytest
+from dotenv import dotenv_values
+
+from src.pipelines import runner
+from src.pipelines.runner import FAILED, SUCCEEDED, Node, PipelineRunner
+from src.utils import funtions
+
+
+class FakePipeline:
+    """
+    Pipeline sleeping for a while and recording its start and end
+    """
+
+    def __init__(self, name, events, seconds=0.1, error=None):
+        self.name = name
+        self.events = events
+        self.seconds = seconds
+        self.error = error
+
+    def run(self):
+        """
+        Records the run, raising the error when set
+        """
+        self.events.append(("start", self.name))
+        time.sleep(self.seconds)
+        self.events.append(("end", self.name))
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    """
+    test setup of a DAG of fake pipelines, without the shared resources
+
+    Returns:
+        Tuple[Callable, List]: DAG factory and the events of the run
+    """
+    shared = []
+    monkeypatch.setattr(runner, "share_resources", lambda: shared.append(1))
+    events = []
+
+    def nodes(errors=None):
+        errors = errors or {}
+        return {
+            name: Node(
+                name,
+                lambda name=name: FakePipeline(name, events, error=errors.get(name)),
+                after,
+            )
+            for name, after in [("GRID", ()), ("VOQs", ("GRID",)), ("CA", ())]
+        }
+
+    return nodes, events, shared
+
+
+def test_runner_dag_sucess(setup):
+    """
+    Test case for independent pipelines running concurrently and dependent
+    ones after their dependencies
+    """
+    nodes, events, shared = setup
+
+    report = PipelineRunner(nodes=nodes()).run()
+
+    assert shared == [1]
+    assert report.succeeded
+    assert events.index(("end", "GRID")) < events.index(("start", "VOQs"))
+    assert events.index(("start", "CA")) < events.index(("end", "GRID"))
+    assert report.elapsed < 0.3  # GRID and VOQs in sequence, CA beside them
+    assert {result.name for result in report.results} == {"GRID", "VOQs", "CA"}
+    assert "if run one at a time" in report.summary()
+
+
+def test_runner_failure_sucess(setup):
+    """
+    Test case for a failed pipeline reported without stopping the others,
+    its dependents still run
+    """
+    nodes, events, _ = setup
+
+    report = PipelineRunner(nodes=nodes({"GRID": ValueError("no new issue")})).run()
+
+    status = {result.name: result.status for result in report.results}
+    assert status == {"GRID": FAILED, "VOQs": SUCCEEDED, "CA": SUCCEEDED}
+    assert not report.succeeded
+    assert ("end", "VOQs") in events
+
+
+def test_runner_selection_sucess(setup):
+    """
+    Test case for a selection of pipelines, dependencies not selected are
+    not waited for, unknown names and cycles are refused
+    """
+    nodes, events, _ = setup
+
+    report = PipelineRunner(["VOQs"], nodes()).run()
+
+    assert [result.name for result in report.results] == ["VOQs"]
+    assert events == [("start", "VOQs"), ("end", "VOQs")]
+    with pytest.raises(ValueError):
+        PipelineRunner(["F8"], nodes())
+    with pytest.raises(ValueError):
+        PipelineRunner(
+            nodes={"A": Node("A", object, ("B",)), "B": Node("B", object, ("A",))}
+        )
+
+
+def test_runner_env_vars_sucess(monkeypatch, tmp_path):
+    """
+    Test case for the .env file written by the loaders of concurrent
+    pipelines, no variable is lost
+    """
+    path = tmp_path / ".env"
+    path.write_text("")
+    monkeypatch.setattr(funtions.dotenv, "find_dotenv", lambda: str(path))
+    threads = [
+        threading.Thread(
+            target=funtions.save_env_vars, kwargs={f"VAR_{i}": str(i), "LAST": "x"}
+        )
+        for i in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    values = dotenv_values(path)
+    assert values == {**{f"VAR_{i}": str(i) for i in range(20)}, "LAST": "x"}
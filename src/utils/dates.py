@@ -0,0 +1,137 @@
+"""
+This module defines the date normalization stage of the transformers. Date
+columns repeat a few thousand distinct values over the whole dataset, so
+each distinct value is parsed once, the text of its date is kept in a cache
+shared by all columns and runs of the process, and the results are spread
+back to the rows by the factorized codes.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Dict, Hashable, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import setup_logger
+
+# NHTSA flat files use YYYYMMDD, GSAR WERS answers DD-MON-YYYY
+SOURCE_FORMATS = ("%Y%m%d", "%d-%b-%Y")
+
+
+class DateNormalizer:
+    """
+    Converts date columns of any source format to a single text format.
+
+    Args:
+        formats (Sequence[str], optional): source formats, tried in order.
+        Defaults to SOURCE_FORMATS.
+        output (str, optional): format of the normalized dates. Defaults to
+        "%m/%d/%Y".
+        missing (str, optional): text of null and unparseable dates.
+        Defaults to "".
+        max_cache (int, optional): cached values, the cache is cleared when
+        it grows over it. Defaults to 1_000_000.
+
+    methods:
+        normalize: normalized text of a date column
+        normalize_columns: normalizes some columns of a DataFrame in place
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    _default: Optional["DateNormalizer"] = None
+
+    def __init__(
+        self,
+        formats: Sequence[str] = SOURCE_FORMATS,
+        output: str = "%m/%d/%Y",
+        missing: str = "",
+        max_cache: int = 1_000_000,
+    ) -> None:
+        self.formats = tuple(formats)
+        self.output = output
+        self.missing = missing
+        self.max_cache = max_cache
+        self.cache: Dict[Hashable, Optional[str]] = {}
+        self.parsed = 0
+        self.reused = 0
+
+    @classmethod
+    def default(cls) -> "DateNormalizer":
+        """
+        Process wide normalizer, its cache is kept between runs.
+
+        Returns:
+            DateNormalizer: shared normalizer instance
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def normalize(self, values: pd.Series, strict: bool = False) -> pd.Series:
+        """
+        Normalized text of each date, parsing only the distinct values never
+        seen before. Dates may come as text, YYYYMMDD numbers or datetimes.
+
+        Args:
+            values (pd.Series): date column
+            strict (bool, optional): raises on unparseable dates instead of
+            returning the missing text. Defaults to False.
+
+        Raises:
+            ValueError: unparseable date on strict mode
+
+        Returns:
+            pd.Series: normalized dates, with the index of values
+        """
+        codes, uniques = pd.factorize(values)
+        if len(self.cache) + len(uniques) > self.max_cache:
+            self.cache.clear()
+
+        texts = []
+        for value in uniques:
+            if value in self.cache:
+                self.reused += 1
+            else:
+                self.cache[value] = self.__parse(value)
+                self.parsed += 1
+            if (text := self.cache[value]) is None and strict:
+                raise ValueError(f"Date '{value}' doesn't match {self.formats}")
+            texts.append(self.missing if text is None else text)
+
+        mapped = np.array(texts + [self.missing], dtype=object)  # null code -1
+        return pd.Series(mapped[codes], index=values.index, name=values.name)
+
+    def normalize_columns(
+        self, df: pd.DataFrame, columns: Iterable[str], strict: bool = False
+    ) -> None:
+        """
+        Normalizes some date columns of a DataFrame in place.
+
+        Args:
+            df (pd.DataFrame): dataset
+            columns (Iterable[str]): date columns
+            strict (bool, optional): see normalize. Defaults to False.
+        """
+        for column in columns:
+            df[column] = self.normalize(df[column], strict)
+        self.logger.info(
+            "Dates: %s values parsed, %s reused from cache",
+            self.parsed,
+            self.reused,
+        )
+
+    def __parse(self, value) -> Optional[str]:
+        if isinstance(value, (datetime, date)):  # pd.Timestamp too
+            return value.strftime(self.output)
+        if isinstance(value, (float, np.floating)) and float(value).is_integer():
+            value = int(value)  # YYYYMMDD of int columns with nulls
+        text = str(value).strip()
+        for source in self.formats:
+            try:
+                return datetime.strptime(text, source).strftime(self.output)
+            except ValueError:
+                continue
+        return None
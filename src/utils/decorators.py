@@ -8,9 +8,9 @@ Contains:
 import time
 from functools import wraps
 from logging import Logger
-from typing import Any, Callable, Dict, List, Optional, Type
+from typing import Any, Callable, Dict, List, Optional, Set, Type
 
-import coloredlogs
+_colored: Set[str] = set()  # loggers with the colored handler installed
 
 
 def time_logger(logger: Logger) -> Callable:
@@ -25,26 +25,21 @@ def time_logger(logger: Logger) -> Callable:
         Callable: The decorated function with time logging
         functionality added to its capability.
     """
-    # DOCS:  https://pypi.org/project/coloredlogs/
-    coloredlogs.install(
-        level="INFO",
-        logger=logger,
-        fmt="[%(levelname)s|%(module)s|%(programname)s] %(asctime)s: %(message)s",
-    )
 
     def deco_logger(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args: List[Any], **kwargs: Dict[str, Any]) -> Any:
+            _install_colors(logger)
             try:
                 logger.info("Running %s stage", func.__name__)
                 t1 = time.time()
                 result = func(*args, **kwargs)
-                logger.info("--- %s minutes ---", round(time.time() - t1 / 60, 2))
+                logger.info("--- %s minutes ---", round((time.time() - t1) / 60, 2))
                 return result
             except Exception as exc:
                 logger.exception(exc)
                 logger.info(
-                    "--- Failed in %s minutes ---", round(time.time() - t1 / 60, 2)
+                    "--- Failed in %s minutes ---", round((time.time() - t1) / 60, 2)
                 )
                 raise exc
 
@@ -53,6 +48,24 @@ def time_logger(logger: Logger) -> Callable:
     return deco_logger
 
 
+def _install_colors(logger: Logger) -> None:
+    """
+    Installs the colored handler of a logger on its first timed call, once,
+    coloredlogs is only imported when a stage runs.
+    """
+    if logger.name in _colored:
+        return
+    import coloredlogs  # pylint: disable=C0415
+
+    # DOCS:  https://pypi.org/project/coloredlogs/
+    coloredlogs.install(
+        level="INFO",
+        logger=logger,
+        fmt="[%(levelname)s|%(module)s|%(programname)s] %(asctime)s: %(message)s",
+    )
+    _colored.add(logger.name)
+
+
 def retry(
     exceptions: List[Type[Exception]],
     tries: int = 4,
@@ -0,0 +1,200 @@
+"""
+This module defines helpers to download and read large files without
+holding the whole content in memory.
+
+Contains:
+    download_to_spool: streams a response body into a spooled temp file
+    download_segmented: downloads byte ranges of a file concurrently
+    iter_line_blocks: reads a binary stream in newline aligned blocks
+"""
+
+import asyncio
+import logging
+from tempfile import SpooledTemporaryFile, TemporaryFile
+from typing import IO, Iterator, List, Tuple
+
+import httpx
+
+from src.utils.funtions import create_async_client, create_client
+
+SPOOL_MAX_SIZE = 64 * 1024 * 1024  # bigger downloads are rolled to disk
+READ_SIZE = 1024 * 1024
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class RangeNotSupported(Exception):
+    """
+    Raised when the server answers a Range request with the whole body.
+    """
+
+
+def download_to_spool(
+    client: httpx.Client, url: str, timeout: float = 160
+) -> SpooledTemporaryFile:
+    """
+    Downloads the content of an url into a spooled temporary file. The body
+    is written in small parts, so only SPOOL_MAX_SIZE bytes are kept in
+    memory, everything above is rolled over to disk.
+
+    Args:
+        client (httpx.Client): client used for the request
+        url (str): file url
+        timeout (float, optional): request timeout. Defaults to 160.
+
+    Raises:
+        httpx.HTTPStatusError: server answered with an error status
+
+    Returns:
+        SpooledTemporaryFile: file with the content, positioned at the start
+    """
+    spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)  # pylint: disable=R1732
+    try:
+        with client.stream("GET", url, timeout=timeout) as response:
+            response.raise_for_status()
+            for part in response.iter_bytes(READ_SIZE):
+                spool.write(part)
+    except Exception:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    return spool
+
+
+def download_segmented(
+    url: str, segments: int = 8, tries: int = 4, timeout: float = 160
+) -> IO[bytes]:
+    """
+    Downloads a file splitting it in byte ranges fetched concurrently, each
+    range is written at its own offset of a temporary file. A segment that
+    fails is resumed from the last byte received, up to tries times. When
+    the server does not advertise or ignores Range requests, the file is
+    downloaded as a single stream.
+
+    Args:
+        url (str): file url
+        segments (int, optional): number of concurrent ranges. Defaults to 8.
+        tries (int, optional): attempts for each segment. Defaults to 4.
+        timeout (float, optional): request timeout. Defaults to 160.
+
+    Raises:
+        httpx.HTTPError: segment still failing after all tries
+
+    Returns:
+        IO[bytes]: file with the content, positioned at the start
+    """
+    with create_client() as client:
+        head = client.head(url, timeout=timeout, follow_redirects=True)
+        url = str(head.url)  # the ranges go straight to the redirect target
+        size = int(head.headers.get("Content-Length", 0))
+        ranged = head.headers.get("Accept-Ranges", "").lower() == "bytes"
+
+        if not ranged or size < 2 * MIN_SEGMENT_SIZE or segments < 2:
+            logger.info("Range download not available, using a single stream")
+            return download_to_spool(client, url, timeout=timeout)
+
+    file = TemporaryFile()  # pylint: disable=R1732
+    try:
+        asyncio.run(
+            _fetch_segments(url, file, _split_ranges(size, segments), tries, timeout)
+        )
+    except RangeNotSupported:
+        file.close()
+        logger.warning("Server ignored the Range header, using a single stream")
+        with create_client() as client:
+            return download_to_spool(client, url, timeout=timeout)
+    except Exception:
+        file.close()
+        raise
+
+    file.seek(0)
+    return file
+
+
+def _split_ranges(size: int, segments: int) -> List[Tuple[int, int]]:
+    step = max(-(-size // segments), MIN_SEGMENT_SIZE)
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+async def _fetch_segments(
+    url: str, file: IO[bytes], ranges: List[Tuple[int, int]], tries: int, timeout: float
+) -> None:
+    async with create_async_client() as client:
+        await asyncio.gather(
+            *(
+                _fetch_segment(client, url, file, start, end, tries, timeout)
+                for start, end in ranges
+            )
+        )
+
+
+async def _fetch_segment(  # pylint: disable=R0913
+    client: httpx.AsyncClient,
+    url: str,
+    file: IO[bytes],
+    start: int,
+    end: int,
+    tries: int,
+    timeout: float,
+) -> None:
+    position = start
+    for attempt in range(1, tries + 1):
+        try:
+            headers = {"Range": f"bytes={position}-{end}"}
+            async with client.stream(
+                "GET", url, headers=headers, timeout=timeout, follow_redirects=True
+            ) as response:
+                if response.status_code == 200:
+                    raise RangeNotSupported(url)
+                response.raise_for_status()
+                async for part in response.aiter_bytes(READ_SIZE):
+                    file.seek(position)  # the event loop runs one write at a time
+                    file.write(part)
+                    position += len(part)
+
+            if position > end:
+                return
+            raise httpx.ReadError(f"Segment {start}-{end} ended at {position}")
+
+        except httpx.HTTPError as exc:
+            if attempt == tries:
+                raise
+            logger.warning(
+                "%s, resuming segment %s-%s from %s", exc, start, end, position
+            )
+            await asyncio.sleep(attempt)
+
+
+def iter_line_blocks(
+    stream: IO[bytes], block_size: int, offset: int = 0, head: bytes = b""
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Reads a binary stream in blocks of about block_size bytes, always cut
+    at the end of a line, so each block can be parsed on its own.
+
+    Args:
+        stream (IO[bytes]): binary stream, ex: a zip member opened for reading
+        block_size (int): number of bytes read at each step
+        offset (int, optional): current position of the stream, when it was
+        already moved forward. Defaults to 0.
+        head (bytes, optional): bytes at offset already read from the
+        stream, the first block starts with them. Defaults to none.
+
+    Yields:
+        Tuple[int, bytes]: offset of the block in the stream and its content
+    """
+    carry = head
+    while data := stream.read(block_size):
+        data = carry + data
+        cut = data.rfind(b"\n") + 1
+        if cut == 0:  # a single line bigger than the block
+            carry = data
+            continue
+        yield offset, data[:cut]
+        offset += cut
+        carry = data[cut:]
+
+    if carry:
+        yield offset, carry
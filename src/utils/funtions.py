@@ -3,12 +3,20 @@ This module defines
 """
 
 import os
+import glob
+import threading
 from datetime import datetime
 from typing import FrozenSet, Dict
 
+import dotenv
 import httpx
 import pandas as pd
 
+from src.infra.http_pool import ClientPool
+from src.utils.reference_data import MODEL_ALIASES, STATE_NAMES, reference_data
+
+ENV_LOCK = threading.Lock()
+
 
 def get_quarter(date_: str) -> str:
     """
@@ -34,45 +42,7 @@ def load_new_models() -> Dict[str, str]:
     Returns:
         Dict[str, str]: dict for replacement
     """
-    return {
-        "ESCAPE HYBRID": "ESCAPE",
-        "C-MAX HYBRID": "C-MAX",
-        "MILAN HYBRID": "MILAN",
-        "EXPLORER SPORT": "EXPLORER",
-        "EXPLORER SPORT TRAC": "EXPLORER",
-        "FUSION ENERGI": "FUSION",
-        "C-MAX ENERGI": "C-MAX",
-        "F-250": "SUPERDUTY",
-        "F-350": "SUPERDUTY",
-        "F-350 SD": "SUPERDUTY",
-        "F-450": "SUPERDUTY",
-        "F-450 SD": "SUPERDUTY",
-        "F-550": "SUPERDUTY",
-        "F-550 SD": "SUPERDUTY",
-        "SUPERDUTY SD": "SUPERDUTY",
-        "F53": "F-53",
-        "CORSAIR": "CORSAIR / MKC",
-        "MKC": "CORSAIR / MKC",
-        "ZEPHYR": "ZEPHYR / MKZ",
-        "MKZ": "ZEPHYR / MKZ",
-        "NAUTILUS": "NAUTILUS / MKX",
-        "MKX": "NAUTILUS / MKX",
-        "AVIATOR": "AVIATOR / MKT",
-        "MKT": "AVIATOR / MKT",
-        "CONTINENTAL": "CONTINENTAL / MKS",
-        "MKS": "CONTINENTAL / MKS",
-        "E-150": "E-SERIES",
-        "E-250": "E-SERIES",
-        "E-350": "E-SERIES",
-        "E-450": "E-SERIES",
-        # Include the replacements to correct potential duplicated replacements
-        "CORSAIR / CORSAIR / MKC": "CORSAIR / MKC",
-        "ZEPHYR / ZEPHYR / MKZ": "ZEPHYR / MKZ",
-        "NAUTILUS / NAUTILUS / MKX": "NAUTILUS / MKX",
-        "AVIATOR / AVIATOR / MKT": "AVIATOR / MKT",
-        "CONTINENTAL / CONTINENTAL / MKS": "CONTINENTAL / MKS",
-        "EXPLORER TRAC": "EXPLORER",
-    }
+    return dict(MODEL_ALIASES)
 
 
 def load_full_vins() -> Dict[str, str]:
@@ -88,6 +58,20 @@ def load_full_vins() -> Dict[str, str]:
     return voq_dict
 
 
+def load_grid_issues() -> pd.DataFrame:
+    """
+    Loads the GRID issues processed so far, the newest version of each one.
+
+    Returns:
+        pd.DataFrame: processed GRID issues, empty when there is none
+    """
+    paths = sorted(glob.glob("./data/processed/GRID_PROCESSED_*.csv"))
+    if not paths:
+        return pd.DataFrame(columns=["Issue #", "Affected Vehicles", "Binning"])
+    issues = pd.concat([pd.read_csv(path, dtype=str) for path in paths])
+    return issues.drop_duplicates("Issue #", keep="last").reset_index(drop=True)
+
+
 def get_mileage_class(miles: int) -> str:
     """
     Classify the case by miles of the car.
@@ -150,82 +134,15 @@ def convert_code_into_state(state_code: str) -> str:
     Returns:
         str: State complete name
     """
-    try:
-        if state_code.isnumeric():
-            return "~"
-        states = {
-            "Alabama": "AL",
-            "Alaska": "AK",
-            "Arizona": "AZ",
-            "Arkansas": "AR",
-            "California": "CA",
-            "Colorado": "CO",
-            "Connecticut": "CT",
-            "Delaware": "DE",
-            "District of Columbia": "DC",
-            "Florida": "FL",
-            "Georgia": "GA",
-            "Hawaii": "HI",
-            "Idaho": "ID",
-            "Illinois": "IL",
-            "Indiana": "IN",
-            "Iowa": "IA",
-            "Kansas": "KS",
-            "Kentucky": "KY",
-            "Louisiana": "LA",
-            "Maine": "ME",
-            "Maryland": "MD",
-            "Massachusetts": "MA",
-            "Michigan": "MI",
-            "Minnesota": "MN",
-            "Mississippi": "MS",
-            "Missouri": "MO",
-            "Montana": "MT",
-            "Nebraska": "NE",
-            "Nevada": "NV",
-            "New Hampshire": "NH",
-            "New Jersey": "NJ",
-            "New Mexico": "NM",
-            "New York": "NY",
-            "North Carolina": "NC",
-            "North Dakota": "ND",
-            "Ohio": "OH",
-            "Oklahoma": "OK",
-            "Oregon": "OR",
-            "Pennsylvania": "PA",
-            "Rhode Island": "RI",
-            "South Carolina": "SC",
-            "South Dakota": "SD",
-            "Tennessee": "TN",
-            "Texas": "TX",
-            "Utah": "UT",
-            "Vermont": "VT",
-            "Virginia": "VA",
-            "Washington": "WA",
-            "West Virginia": "WV",
-            "Wisconsin": "WI",
-            "Wyoming": "WY",
-            "American Samoa": "AS",
-            "Federated States of Micronesia": "FM",
-            "Guam": "GU",
-            "Marshall Islands": "MH",
-            "Commonwealth of the Northern Mariana Islands": "MP",
-            "Palau": "PW",
-            "Puerto Rico": "PR",
-            "U.S. Minor Outlying Islands": "M",
-            "U.S. Virgin Islands": "VI",
-        }
-        if state_code not in states.values():
-            return "~"
-        return [k for k, v in states.items() if v == state_code][0]
-
-    except KeyError:
+    if state_code.isnumeric():
         return "~"
+    return STATE_NAMES.get(state_code, "~")
 
 
 def load_categories(flag: str = "Binnings") -> FrozenSet[str]:
     """
-    Loads categories for classification based on a flag
+    Loads categories for classification based on a flag, from the reference
+    data snapshot (see src.utils.reference_data)
 
     Args:
         flag (str): describes which type of categories return. Default to Binnings
@@ -237,21 +154,7 @@ def load_categories(flag: str = "Binnings") -> FrozenSet[str]:
         raise ValueError(
             f"Invalid flag '{flag}' provided. Use only  'Binnings', 'Failures', 'Component'."
         )
-
-    categories = set()
-    with open("./data/external/binnings.txt", encoding="utf-8", mode="r") as file:
-        for line in file.readlines():
-            binning = line.split(",")[1]
-            if flag == "Binnings":
-                categories.add(binning.strip("\n"))
-            if flag == "Failures":
-                if "|" not in binning:
-                    continue
-                categories.add(binning.split(" | ")[1].strip("\n"))
-            if flag == "Components":
-                categories.add(binning.split(" | ")[0])
-
-    return frozenset(categories)
+    return frozenset(getattr(reference_data(), flag.lower()))
 
 
 def load_vfgs() -> Dict[str, str]:
@@ -264,17 +167,7 @@ def load_vfgs() -> Dict[str, str]:
     Returns:
         Dict[str, str]: dict with unique binning as key and general vfg as value
     """
-    vfgs = {}
-    try:
-        with open("./data/external/binnings.txt", encoding="utf-8", mode="r") as file:
-            for line in file.readlines():
-                VFG, binning = line.split(",")
-                vfgs.update({binning: VFG})
-
-    except FileNotFoundError as exc:
-        raise exc
-
-    return vfgs
+    return dict(reference_data().vfgs)
 
 
 def extract_url(text: str) -> str:
@@ -308,68 +201,49 @@ def convert_float(text: str) -> float:
         return 0.0
 
 
-def create_client() -> httpx.Client:
+def create_client(cache: bool = False) -> httpx.Client:
     """
-    Creates a common client for future http requests
+    Common client for http requests, shared by the whole process (see
+    src.infra.http_pool). Closing it with a "with" block keeps it open.
+
+    Args:
+        cache (bool, optional): wraps the transports in the persistent
+        conditional response cache (see src.infra.http_cache). Defaults to False.
 
     Returns:
-        httpx.Client: client with ford proxies
+        httpx.Client: pooled client with ford proxies
     """
-    ford_proxy = str(os.getenv("FORD_PROXY"))
-    timeout_config = httpx.Timeout(10.0, connect=5.0)
-    proxy_mounts = {
-        "http://": httpx.HTTPTransport(proxy=httpx.Proxy(ford_proxy)),
-        "https://": httpx.HTTPTransport(proxy=httpx.Proxy(ford_proxy)),
-    }
-    return httpx.Client(
-        timeout=timeout_config,
-        mounts=proxy_mounts,
-        verify=False,
-    )
-
-
-def create_async_client() -> httpx.AsyncClient:
+    return ClientPool.default().client(cache)
+
+
+def create_async_client(
+    cache: bool = False, max_connections: int = 8
+) -> httpx.AsyncClient:
     """
-    Creates a common client for future http requests
+    Common async client for http requests, shared by the requests of the
+    running event loop (see src.infra.http_pool).
+
+    Args:
+        cache (bool, optional): wraps the transports in the persistent
+        conditional response cache (see src.infra.http_cache). Defaults to False.
+        max_connections (int, optional): min connection pool size of each
+        host. Defaults to 8.
 
     Returns:
-        httpx.Client: client with ford proxies
+        httpx.AsyncClient: pooled client with ford proxies
     """
-    limits = httpx.Limits(max_connections=8)
-    ford_proxy = httpx.Proxy(str(os.getenv("FORD_PROXY")))
-    timeout_config = httpx.Timeout(10.0, connect=5.0, pool=4.0)
-    proxy_mounts = {
-        "http://": httpx.AsyncHTTPTransport(proxy=ford_proxy, limits=limits, retries=3),
-        "https://": httpx.AsyncHTTPTransport(
-            proxy=ford_proxy, limits=limits, retries=3
-        ),
-    }
-    return httpx.AsyncClient(
-        timeout=timeout_config,
-        mounts=proxy_mounts,
-        verify=False,
-    )
-
-
-def load_classifier_credentials() -> Dict[str, str]:
+    return ClientPool.default().async_client(cache, max_connections)
+
+
+def save_env_vars(**values: str) -> None:
     """
-    create a dict with classifier endpoint and auth.
+    Saves variables in the .env file, the loaders of the pipelines running
+    concurrently rewrite it one at a time.
 
-    Returns:
-        Dict[str, str]: _description_
+    Args:
+        values (str): value of each variable
     """
-    with create_client() as client:
-        response = client.post(
-            str(os.getenv("TOKEN_ENDPOINT")),
-            data={
-                "client_id": str(os.getenv("CLIENT_ID")),
-                "client_secret": str(os.getenv("CLIENT_SECRET")),
-                "scope": str(os.getenv("SCOPE")),
-                "grant_type": "client_credentials",
-            },
-            timeout=160,
-        )
-    return {
-        "url": str(os.getenv("API_ENDPOINT")),
-        "token": response.json()["access_token"],
-    }
+    with ENV_LOCK:
+        path = dotenv.find_dotenv()
+        for key, value in values.items():
+            dotenv.set_key(path, key, value)
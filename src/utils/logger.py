@@ -6,13 +6,24 @@ pipeline
 import json
 import logging.config
 
+_configured = False
 
-def setup_logger() -> None:
+
+def setup_logger(force: bool = False) -> None:
     """
-    Loads configs into logger
+    Loads configs into logger, once per process: every class calls it when
+    defined, only the first call reads config.json
     TODO: add color to logs - https://pypi.org/project/coloredlogs/
+
+    Args:
+        force (bool, optional): loads the configs again. Defaults to False.
     """
+    global _configured  # pylint: disable=W0603
+    if _configured and not force:
+        return
+
     with open("./src/utils/config.json", "r", encoding="utf-8") as file:
         config = json.load(file)
 
     logging.config.dictConfig(config)
+    _configured = True
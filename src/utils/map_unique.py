@@ -0,0 +1,135 @@
+"""
+This module defines the map-unique operator used by the enrichments of the
+transformers. Most enrichments apply a pure function to columns that
+repeat a few values over many rows (state codes, binnings, model names,
+VINs, mileage), so the operator factorizes the input columns, calls the
+function once per distinct key, optionally on a thread or process pool,
+and scatters the results back to the rows by the factorized codes.
+"""
+
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import setup_logger
+
+POOLS = ("thread", "process")
+EVALUATE = object()  # null keys are passed to the function
+
+
+class UniqueMapper:
+    """
+    Applies pure functions once per distinct key of the input columns and
+    counts the calls saved over a row by row apply.
+
+    Args:
+        pool (Optional[str], optional): "thread" or "process" pool to call the
+        function on, None calls it on the current thread. Process pools need
+        picklable functions. Defaults to None.
+        workers (Optional[int], optional): pool size. Defaults to the cpu
+        count.
+
+    Raises:
+        ValueError: unknown pool
+
+    methods:
+        map: results of a function for each row of the input columns
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    def __init__(self, pool: Optional[str] = None, workers: Optional[int] = None):
+        if pool is not None and pool not in POOLS:
+            raise ValueError(f"Invalid pool '{pool}' provided. Use one of {POOLS}.")
+        self.pool = pool
+        self.workers = workers or os.cpu_count() or 1
+        self.rows = 0
+        self.calls = 0
+
+    @property
+    def saved(self) -> int:
+        """
+        Function calls avoided over a row by row apply.
+        """
+        return self.rows - self.calls
+
+    def map(
+        self,
+        data: Union[pd.Series, pd.DataFrame],
+        function: Callable[..., Any],
+        outputs: Optional[Sequence[str]] = None,
+        na_value: Any = EVALUATE,
+    ) -> Union[pd.Series, pd.DataFrame]:
+        """
+        Results of a function for each row, computed once per distinct key.
+
+        Args:
+            data (Union[pd.Series, pd.DataFrame]): input column, or columns
+            passed as positional arguments in column order
+            function (Callable[..., Any]): pure function of the inputs
+            outputs (Optional[Sequence[str]], optional): names of the values
+            of a function returning a sequence, the result is a DataFrame
+            with one column for each. Defaults to None, a Series of results.
+            na_value (Any, optional): result of keys with null inputs, skipping
+            the function, a sequence on multiple outputs. Defaults to EVALUATE,
+            nulls are passed as NaN.
+
+        Returns:
+            Union[pd.Series, pd.DataFrame]: results, with the index of data
+        """
+        if isinstance(data, pd.DataFrame):
+            codes, uniques = pd.MultiIndex.from_frame(data).factorize()
+            keys: List[tuple] = list(uniques)
+            nulls = np.asarray(uniques.to_frame().isna().any(axis=1))
+        else:
+            codes, uniques = pd.factorize(data, use_na_sentinel=False)
+            keys = [(key,) for key in uniques]
+            nulls = np.asarray(pd.isna(uniques))
+
+        if na_value is not EVALUATE:
+            keys = [key for key, null in zip(keys, nulls) if not null]
+        results = iter(self.__call_all(function, keys))
+        values = [
+            na_value if null and na_value is not EVALUATE else next(results)
+            for null in nulls
+        ]
+        self.rows += len(data)
+        self.calls += len(keys)
+
+        if outputs is None:
+            scattered = np.empty(len(values), dtype=object)
+            scattered[:] = values  # keeps sequences as single results
+            return pd.Series(
+                scattered[codes], index=data.index, name=getattr(data, "name", None)
+            )
+        table = pd.DataFrame(values, columns=list(outputs), dtype=object)
+        return table.take(codes).set_axis(data.index)
+
+    def __call_all(self, function: Callable[..., Any], keys: List[tuple]) -> List:
+        if self.pool is None or len(keys) < 2:
+            return [function(*key) for key in keys]
+        executor: Executor
+        if self.pool == "thread":
+            executor = ThreadPoolExecutor(self.workers)
+        else:
+            executor = ProcessPoolExecutor(self.workers)
+        chunksize = max(1, len(keys) // (self.workers * 4))
+        with executor:
+            return list(executor.map(function, *zip(*keys), chunksize=chunksize))
+
+
+def map_unique(
+    data: Union[pd.Series, pd.DataFrame],
+    function: Callable[..., Any],
+    outputs: Optional[Sequence[str]] = None,
+    na_value: Any = EVALUATE,
+) -> Union[pd.Series, pd.DataFrame]:
+    """
+    Single call version of UniqueMapper.map, on the current thread.
+    """
+    return UniqueMapper().map(data, function, outputs, na_value)
@@ -0,0 +1,193 @@
+"""
+This module defines the streaming execution of the pipelines. The source
+(extract) yields chunks, each stage (transform) runs on its own thread and
+passes its results to the next one, and the sink (load) saves them as they
+arrive. Stages are connected by bounded queues: a fast stage blocks when
+the next one falls behind, so memory holds at most maxsize chunks between
+stages and the run lasts about as long as its slowest stage.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.utils.logger import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger()
+
+END = object()  # closes a queue
+POLL = 0.1  # seconds between checks of a failed run
+
+
+class StageReport(NamedTuple):
+    """
+    Work of a stage.
+
+    Attributes:
+        name (str): stage name
+        items (int): chunks processed
+        busy (float): seconds spent processing, without the queue waits
+    """
+
+    name: str
+    items: int
+    busy: float
+
+
+class StreamReport(NamedTuple):
+    """
+    Result of a streaming run.
+
+    Attributes:
+        items (int): chunks saved by the sink
+        elapsed (float): seconds of the run
+        stages (List[StageReport]): source, stages and sink, in order
+    """
+
+    items: int
+    elapsed: float
+    stages: List[StageReport]
+
+    @property
+    def bottleneck(self) -> str:
+        """
+        Name of the busiest stage.
+        """
+        return max(self.stages, key=lambda stage: stage.busy).name
+
+
+class _Stage(threading.Thread):
+    """
+    Thread of a stage: reads its input until END, writes each result to its
+    output. A failure of any stage stops all of them. The busy time of the
+    source includes its iteration, the extraction itself.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        items: Callable[[], Iterable[Any]],
+        function: Callable[[Any], Any],
+        output: Optional[queue.Queue],
+        stop: threading.Event,
+        timed_input: bool = False,
+    ) -> None:
+        super().__init__(name=name, daemon=True)
+        self.items = items
+        self.timed_input = timed_input
+        self.function = function
+        self.output = output
+        self.stop = stop
+        self.error: Optional[BaseException] = None
+        self.count = 0
+        self.busy = 0.0
+
+    def run(self) -> None:
+        try:
+            iterator = iter(self.items())
+            while not self.stop.is_set():
+                start = time.perf_counter()
+                item = next(iterator, END)
+                if item is END:
+                    break
+                if not self.timed_input:  # waits on the input queue
+                    start = time.perf_counter()
+                item = self.function(item)
+                self.busy += time.perf_counter() - start
+                self.count += 1
+                self.__put(item)
+            self.__put(END)
+        except BaseException as exc:  # pylint: disable=W0718
+            self.error = exc
+            self.stop.set()
+
+    def __put(self, item: Any) -> None:
+        while self.output is not None and not self.stop.is_set():
+            try:
+                self.output.put(item, timeout=POLL)
+                return
+            except queue.Full:
+                continue
+
+
+def _drain(source: queue.Queue, stop: threading.Event) -> Iterable[Any]:
+    """
+    Items of a queue until END, or until the run fails.
+    """
+    while not stop.is_set():
+        try:
+            item = source.get(timeout=POLL)
+        except queue.Empty:
+            continue
+        if item is END:
+            return
+        yield item
+
+
+def stream(
+    source: Iterable[Any],
+    stages: Sequence[Tuple[str, Callable[[Any], Any]]],
+    sink: Callable[[Any], None],
+    maxsize: int = 2,
+) -> StreamReport:
+    """
+    Runs source, stages and sink concurrently, each chunk flowing through
+    the stages in order.
+
+    Args:
+        source (Iterable[Any]): chunks, ex: a generator of ExtractContract
+        stages (Sequence[Tuple[str, Callable[[Any], Any]]]): name and
+        function of each intermediate stage, ex: ("transform", transform)
+        sink (Callable[[Any], None]): saves a chunk of the last stage
+        maxsize (int, optional): chunks waiting between two stages.
+        Defaults to 2.
+
+    Raises:
+        BaseException: first error of any stage, the others are stopped
+
+    Returns:
+        StreamReport: chunks and busy time of each stage
+    """
+    start = time.perf_counter()
+    stop = threading.Event()
+    queues: List[queue.Queue] = [queue.Queue(maxsize) for _ in range(len(stages) + 1)]
+
+    threads = [
+        _Stage("source", lambda: source, lambda item: item, queues[0], stop, True)
+    ]
+    for index, (name, function) in enumerate(stages):
+        threads.append(
+            _Stage(
+                name,
+                lambda index=index: _drain(queues[index], stop),
+                function,
+                queues[index + 1],
+                stop,
+            )
+        )
+    threads.append(_Stage("sink", lambda: _drain(queues[-1], stop), sink, None, stop))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for thread in threads:
+        if thread.error is not None:
+            raise thread.error
+
+    report = StreamReport(
+        threads[-1].count,
+        time.perf_counter() - start,
+        [StageReport(thread.name, thread.count, thread.busy) for thread in threads],
+    )
+    logger.info(
+        "Streamed %s chunks in %.1fs (%s), bottleneck: %s",
+        report.items,
+        report.elapsed,
+        ", ".join(f"{stage.name} {stage.busy:.1f}s" for stage in report.stages),
+        report.bottleneck,
+    )
+    return report
@@ -0,0 +1,270 @@
+"""
+This module defines the reference data registry used by the transformers:
+binnings, failures and components categories, VFG of each binning, model
+aliases and state names. The binnings source is compiled once into an
+immutable snapshot, saved as a pickle named after the hash of the source,
+and loaded from it by the next processes instead of parsing the source
+again. The snapshot is only rebuilt when the source file changes.
+
+Lookups are read-only mappings and the category lists used in prompts are
+precomputed, so hot loops never touch the filesystem.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+BINNINGS_PATH = "./data/external/binnings.txt"
+SNAPSHOT_VERSION = 3
+
+logger = logging.getLogger(__name__)
+
+MODEL_ALIASES: Mapping[str, str] = MappingProxyType(
+    {
+        "ESCAPE HYBRID": "ESCAPE",
+        "C-MAX HYBRID": "C-MAX",
+        "MILAN HYBRID": "MILAN",
+        "EXPLORER SPORT": "EXPLORER",
+        "EXPLORER SPORT TRAC": "EXPLORER",
+        "FUSION ENERGI": "FUSION",
+        "C-MAX ENERGI": "C-MAX",
+        "F-250": "SUPERDUTY",
+        "F-350": "SUPERDUTY",
+        "F-350 SD": "SUPERDUTY",
+        "F-450": "SUPERDUTY",
+        "F-450 SD": "SUPERDUTY",
+        "F-550": "SUPERDUTY",
+        "F-550 SD": "SUPERDUTY",
+        "SUPERDUTY SD": "SUPERDUTY",
+        "F53": "F-53",
+        "CORSAIR": "CORSAIR / MKC",
+        "MKC": "CORSAIR / MKC",
+        "ZEPHYR": "ZEPHYR / MKZ",
+        "MKZ": "ZEPHYR / MKZ",
+        "NAUTILUS": "NAUTILUS / MKX",
+        "MKX": "NAUTILUS / MKX",
+        "AVIATOR": "AVIATOR / MKT",
+        "MKT": "AVIATOR / MKT",
+        "CONTINENTAL": "CONTINENTAL / MKS",
+        "MKS": "CONTINENTAL / MKS",
+        "E-150": "E-SERIES",
+        "E-250": "E-SERIES",
+        "E-350": "E-SERIES",
+        "E-450": "E-SERIES",
+        # Include the replacements to correct potential duplicated replacements
+        "CORSAIR / CORSAIR / MKC": "CORSAIR / MKC",
+        "ZEPHYR / ZEPHYR / MKZ": "ZEPHYR / MKZ",
+        "NAUTILUS / NAUTILUS / MKX": "NAUTILUS / MKX",
+        "AVIATOR / AVIATOR / MKT": "AVIATOR / MKT",
+        "CONTINENTAL / CONTINENTAL / MKS": "CONTINENTAL / MKS",
+        "EXPLORER TRAC": "EXPLORER",
+    }
+)
+
+STATE_NAMES: Mapping[str, str] = MappingProxyType(
+    {
+        "AL": "Alabama",
+        "AK": "Alaska",
+        "AZ": "Arizona",
+        "AR": "Arkansas",
+        "CA": "California",
+        "CO": "Colorado",
+        "CT": "Connecticut",
+        "DE": "Delaware",
+        "DC": "District of Columbia",
+        "FL": "Florida",
+        "GA": "Georgia",
+        "HI": "Hawaii",
+        "ID": "Idaho",
+        "IL": "Illinois",
+        "IN": "Indiana",
+        "IA": "Iowa",
+        "KS": "Kansas",
+        "KY": "Kentucky",
+        "LA": "Louisiana",
+        "ME": "Maine",
+        "MD": "Maryland",
+        "MA": "Massachusetts",
+        "MI": "Michigan",
+        "MN": "Minnesota",
+        "MS": "Mississippi",
+        "MO": "Missouri",
+        "MT": "Montana",
+        "NE": "Nebraska",
+        "NV": "Nevada",
+        "NH": "New Hampshire",
+        "NJ": "New Jersey",
+        "NM": "New Mexico",
+        "NY": "New York",
+        "NC": "North Carolina",
+        "ND": "North Dakota",
+        "OH": "Ohio",
+        "OK": "Oklahoma",
+        "OR": "Oregon",
+        "PA": "Pennsylvania",
+        "RI": "Rhode Island",
+        "SC": "South Carolina",
+        "SD": "South Dakota",
+        "TN": "Tennessee",
+        "TX": "Texas",
+        "UT": "Utah",
+        "VT": "Vermont",
+        "VA": "Virginia",
+        "WA": "Washington",
+        "WV": "West Virginia",
+        "WI": "Wisconsin",
+        "WY": "Wyoming",
+        "AS": "American Samoa",
+        "FM": "Federated States of Micronesia",
+        "GU": "Guam",
+        "MH": "Marshall Islands",
+        "MP": "Commonwealth of the Northern Mariana Islands",
+        "PW": "Palau",
+        "PR": "Puerto Rico",
+        "M": "U.S. Minor Outlying Islands",
+        "VI": "U.S. Virgin Islands",
+    }
+)
+
+
+class ReferenceData(NamedTuple):
+    """
+    Immutable snapshot of the reference data.
+
+    Attributes:
+        source_hash (str): sha256 of the binnings source
+        binnings (Tuple[str, ...]): binnings, in source order
+        failures (Tuple[str, ...]): failure part of the binnings
+        components (Tuple[str, ...]): component part of the binnings
+        vfgs (Mapping[str, str]): VFG of each binning
+        prompts (Mapping[str, str]): category lists formatted for prompts,
+        by "binnings", "failures" and "components"
+        model_aliases (Mapping[str, str]): common name of vehicle models
+        states (Mapping[str, str]): state name of each state code
+    """
+
+    source_hash: str
+    binnings: Tuple[str, ...]
+    failures: Tuple[str, ...]
+    components: Tuple[str, ...]
+    vfgs: Mapping[str, str]
+    prompts: Mapping[str, str]
+    model_aliases: Mapping[str, str] = MODEL_ALIASES
+    states: Mapping[str, str] = STATE_NAMES
+
+    def vfg(self, binning: str) -> str:
+        """
+        VFG of a binning, " ~ " when unknown.
+        """
+        return self.vfgs.get(binning.strip(), " ~ ")
+
+    def state_name(self, code: str) -> str:
+        """
+        State name of a code, "~" when unknown.
+        """
+        return self.states.get(code, "~")
+
+
+_cache: Dict[str, Tuple[Tuple[int, int], ReferenceData]] = {}
+
+
+def reference_data(
+    path: str = BINNINGS_PATH, snapshot_dir: Optional[str] = None
+) -> ReferenceData:
+    """
+    Snapshot of the reference data compiled from a binnings file. Kept in
+    memory while the file mtime and size do not change, then loaded from
+    the snapshot of the file hash, compiled only when it does not exist.
+
+    Args:
+        path (str, optional): binnings file, "VFG,BINNING" lines with a
+        header. Defaults to BINNINGS_PATH.
+        snapshot_dir (Optional[str], optional): folder of the snapshots.
+        Defaults to REFERENCE_SNAPSHOT_DIR env var or ./data/cache/reference.
+
+    Returns:
+        ReferenceData: immutable snapshot
+    """
+    stat = os.stat(path)
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+    if (cached := _cache.get(path)) is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    with open(path, "rb") as file:
+        content = file.read()
+    source_hash = hashlib.sha256(content).hexdigest()
+    folder = snapshot_dir or os.getenv(
+        "REFERENCE_SNAPSHOT_DIR", "./data/cache/reference"
+    )
+    snapshot = os.path.join(
+        folder, f"reference-v{SNAPSHOT_VERSION}-{source_hash[:16]}.pickle"
+    )
+
+    if os.path.isfile(snapshot):
+        payload = _read_snapshot(snapshot)
+    else:
+        logger.info("Compiling reference data snapshot of %s", path)
+        payload = _compile(content.decode("utf-8"), source_hash)
+        os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{snapshot}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot)
+
+    data = ReferenceData(
+        source_hash=payload["source_hash"],
+        binnings=payload["binnings"],
+        failures=payload["failures"],
+        components=payload["components"],
+        vfgs=MappingProxyType(payload["vfgs"]),
+        prompts=MappingProxyType(payload["prompts"]),
+    )
+    _cache[path] = (fingerprint, data)
+    return data
+
+
+def _read_snapshot(path: str) -> Dict:
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def _compile(text: str, source_hash: str) -> Dict:
+    """
+    Parses the binnings source, categories keep the source order without
+    duplicates. The prompts list them sorted, so the prompts and the store
+    keys built from them (see ClassificationStore.key) are the same in
+    every process, whatever the order of the lines. A binning listed twice
+    gets the VFG of its last line.
+    """
+    vfgs: Dict[str, str] = {}
+    failures: Dict[str, None] = {}
+    components: Dict[str, None] = {}
+    for line in text.splitlines()[1:]:  # header
+        if "," not in line:
+            continue
+        vfg, binning = (part.strip() for part in line.split(",", 1))
+        if vfgs.get(binning, vfg) != vfg:
+            logger.warning(
+                "Binning %s listed as %s and %s", binning, vfgs[binning], vfg
+            )
+        vfgs[binning] = vfg
+        components.setdefault(binning.split(" | ")[0].strip(), None)
+        if "|" in binning:
+            failures.setdefault(binning.split(" | ")[1].strip(), None)
+
+    binnings = tuple(vfgs)
+    return {
+        "source_hash": source_hash,
+        "binnings": binnings,
+        "failures": tuple(failures),
+        "components": tuple(components),
+        "vfgs": vfgs,
+        "prompts": {
+            "binnings": str(sorted(binnings)),
+            "failures": str(sorted(failures)),
+            "components": str(sorted(components)),
+        },
+    }
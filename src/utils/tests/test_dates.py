@@ -0,0 +1,75 @@
+"""
+This module defines some test cases for the date normalization stage
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.dates import DateNormalizer
+
+
+@pytest.fixture
+def setup():
+    """
+    test setup of a normalizer with an empty cache
+
+    Returns:
+        DateNormalizer: normalizer
+    """
+    return DateNormalizer()
+
+
+def test_normalize_sources_sucess(setup):
+    """
+    Test case for both source formats, numbers, datetimes and missing dates
+    """
+    values = pd.Series(
+        ["20240115", "15-JAN-2024", "01-Dec-2023", "", None, "bad", 20231201, np.nan],
+        index=range(5, 13),
+    )
+
+    normalized = setup.normalize(values)
+
+    assert list(normalized) == [
+        "01/15/2024",
+        "01/15/2024",
+        "12/01/2023",
+        "",
+        "",
+        "",
+        "12/01/2023",
+        "",
+    ]
+    assert list(normalized.index) == list(values.index)
+    assert list(setup.normalize(pd.to_datetime(pd.Series(["2024-01-15", None])))) == [
+        "01/15/2024",
+        "",
+    ]
+
+
+def test_normalize_reuses_cache_sucess(setup):
+    """
+    Test case for each distinct value parsed once across columns and runs
+    """
+    df = pd.DataFrame(
+        {
+            "DATEA": [20240115, 20240116] * 50,
+            "LDATE": [20240116, 20240117] * 50,
+            "PROD_DATE": ["15-JAN-2024", ""] * 50,
+        }
+    )
+    expected = pd.to_datetime(df["LDATE"], format="%Y%m%d").dt.strftime("%m/%d/%Y")
+
+    setup.normalize_columns(df, ["DATEA", "LDATE"], strict=True)
+    setup.normalize_columns(df, ["PROD_DATE"])
+
+    assert list(df["LDATE"]) == list(expected)
+    assert list(df["PROD_DATE"].unique()) == ["01/15/2024", ""]
+    assert (setup.parsed, setup.reused) == (5, 1)
+
+    setup.normalize(pd.Series([20240115, 20240117]))
+
+    assert (setup.parsed, setup.reused) == (5, 3)
+    with pytest.raises(ValueError):
+        setup.normalize(pd.Series(["20240115", "2024-01-15"]), strict=True)
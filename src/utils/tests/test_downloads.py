@@ -0,0 +1,91 @@
+"""
+This module defines some test cases for the helpers that download and
+read large files in blocks
+"""
+
+from io import BytesIO
+
+import httpx
+import pytest
+
+from src.utils import downloads
+from src.utils.downloads import download_to_spool, iter_line_blocks
+
+
+def test_iter_line_blocks_sucess():
+    """
+    Test case for reading a stream in blocks aligned with the lines
+    """
+    content = b"".join(b"%d\tline number %d\n" % (i, i) for i in range(500))
+
+    blocks = list(iter_line_blocks(BytesIO(content), block_size=64))
+
+    assert b"".join(block for _, block in blocks) == content
+    for offset, block in blocks:
+        assert block.endswith(b"\n")
+        assert content[offset : offset + len(block)] == block
+
+
+def test_download_to_spool_sucess():
+    """
+    Test case for downloading a response body into a spooled file
+    """
+    body = b"x" * 10_000
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+
+    with httpx.Client(transport=transport) as client:
+        spool = download_to_spool(client, "https://example.com/file.zip")
+
+    with spool:
+        assert spool.read() == body
+
+
+def _ranged_transport(
+    body: bytes, honor_range: bool = True, redirect: bool = False
+) -> httpx.MockTransport:
+    failed = set()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if redirect and request.url.path != "/mirror/file.zip":
+            return httpx.Response(302, headers={"Location": "/mirror/file.zip"})
+        if request.method == "HEAD":
+            headers = {"Content-Length": str(len(body)), "Accept-Ranges": "bytes"}
+            return httpx.Response(200, headers=headers)
+        if "Range" not in request.headers or not honor_range:
+            return httpx.Response(200, content=body)
+
+        start, end = request.headers["Range"][6:].split("-")
+        if start not in failed:  # every segment fails once before answering
+            failed.add(start)
+            return httpx.Response(503)
+        return httpx.Response(206, content=body[int(start) : int(end) + 1])
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.parametrize(
+    "honor_range, redirect", [(True, False), (False, False), (True, True)]
+)
+def test_download_segmented_sucess(monkeypatch, honor_range, redirect):
+    """
+    Test case for downloading a file in concurrent byte ranges, retrying
+    failed segments, following a redirect and falling back when the server
+    ignores Range
+    """
+    body = bytes(range(256)) * 400
+    transport = _ranged_transport(body, honor_range, redirect)
+    monkeypatch.setattr(downloads, "MIN_SEGMENT_SIZE", 1024)
+    monkeypatch.setattr(downloads.asyncio, "sleep", _no_sleep)
+    monkeypatch.setattr(
+        downloads, "create_client", lambda: httpx.Client(transport=transport)
+    )
+    monkeypatch.setattr(
+        downloads, "create_async_client", lambda: httpx.AsyncClient(transport=transport)
+    )
+
+    with downloads.download_segmented("https://example.com/file.zip", 8) as file:
+        assert file.read() == body
+
+
+async def _no_sleep(_: float) -> None:
+    return None
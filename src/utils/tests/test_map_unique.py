@@ -0,0 +1,85 @@
+"""
+This module defines some test cases for the map-unique operator
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.map_unique import UniqueMapper, map_unique
+
+
+def split_binning(binning: str):
+    """
+    Function and failure of a binning, module level so processes can pickle it.
+    """
+    component, failure = binning.split(" | ")
+    return "F8", component, failure
+
+
+@pytest.fixture
+def setup():
+    """
+    test setup of repeated binnings and a function counting its calls
+
+    Returns:
+        Tuple[pd.Series, Callable, List[str]]: binnings, function, calls
+    """
+    binnings = pd.Series(
+        ["DOOR | LOOSE", "HOOD | OWD", "DOOR | LOOSE", None] * 25,
+        index=range(100, 200),
+    )
+    calls = []
+
+    def function(binning):
+        calls.append(binning)
+        return binning.split(" | ")[1] if isinstance(binning, str) else "~"
+
+    return binnings, function, calls
+
+
+def test_map_unique_series_sucess(setup):
+    """
+    Test case for results equal to apply, with one call per distinct value
+    """
+    binnings, function, calls = setup
+    expected = binnings.apply(function)
+    calls.clear()
+    mapper = UniqueMapper()
+
+    result = mapper.map(binnings, function)
+
+    assert result.equals(expected)
+    assert len(calls) == 3
+    assert (mapper.rows, mapper.calls, mapper.saved) == (100, 3, 97)
+    assert list(mapper.map(binnings, str.lower, na_value="~").unique()) == [
+        "door | loose",
+        "hood | owd",
+        "~",
+    ]
+
+
+def test_map_unique_outputs_sucess(setup):
+    """
+    Test case for multiple columns in and out, on thread and process pools
+    """
+    binnings = setup[0].dropna()
+    df = pd.DataFrame({"MILES": [100, 200, 100, np.nan], "YEAR": [2020, 2021] * 2})
+
+    for pool in (None, "thread", "process"):
+        result = UniqueMapper(pool, workers=2).map(
+            binnings, split_binning, outputs=["FUNCTION_", "COMPONET", "FAILURE"]
+        )
+
+        assert list(result.columns) == ["FUNCTION_", "COMPONET", "FAILURE"]
+        assert result.index.equals(binnings.index)
+        assert result.loc[101].tolist() == ["F8", "HOOD", "OWD"]
+
+    assert map_unique(df, lambda miles, year: f"{miles}-{year}").tolist() == [
+        "100.0-2020",
+        "200.0-2021",
+        "100.0-2020",
+        "nan-2021",
+    ]
+    with pytest.raises(ValueError):
+        UniqueMapper("gpu")
@@ -0,0 +1,71 @@
+"""
+This module defines some test cases for the schema typed parse of the
+complaints flat file
+"""
+
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from src.pipelines.NHTSA_VOQs.contracts.schemas.extract import schema
+from src.pipelines.NHTSA_VOQs.stages.extract import USED_COLUMNS
+from src.utils.parsing import raw_formats, read_typed_csv
+
+
+@pytest.fixture
+def setup():
+    """
+    test setup mocking two lines of the complaints flat file
+
+    Returns:
+        bytes: flat file content
+    """
+    lines = []
+    for odino, crash, miles in (("11574123", "Y", "1500"), ("11574139", "N", "")):
+        values = dict.fromkeys(schema.columns.keys(), "")
+        values.update(
+            {
+                "CMPLID": "1969873",
+                "ODINO": odino,
+                "MFR_NAME": "Ford Motor Company",
+                "CRASH": crash,
+                "DATEA": "20240226",
+                "MILES": miles,
+                "CDESCR": 'THE "DOOR" FELL OFF',
+            }
+        )
+        lines.append("\t".join(values.values()))
+    return ("\n".join(lines) + "\n").encode()
+
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_read_typed_csv_sucess(setup, engine):
+    """
+    Test case for parsing only the used columns with schema dtypes
+    """
+    df = read_typed_csv(BytesIO(setup), schema, USED_COLUMNS, engine=engine)
+
+    assert list(df.columns) == [c for c in schema.columns if c in USED_COLUMNS]
+    assert str(df["ODINO"].dtype) == "UInt32"
+    assert str(df["MFR_NAME"].dtype) == "category"
+    assert df["CRASH"].tolist() == [True, False]
+    assert df["MILES"].isna().tolist() == [False, True]
+    assert df["DATEA"].iloc[0] == pd.Timestamp(2024, 2, 26)
+    assert df["CDESCR"].iloc[0] == 'THE "DOOR" FELL OFF'
+
+
+def test_raw_formats_sucess(setup):
+    """
+    Test case for the typed columns mapped back to the untyped formats
+    """
+    typed = read_typed_csv(BytesIO(setup), schema, USED_COLUMNS)
+    df = raw_formats(typed)
+
+    assert df["CRASH"].tolist() == ["Y", "N"]
+    assert str(df["ODINO"].dtype) == "Int64"
+    assert str(df["MFR_NAME"].dtype) == "object"
+    assert str(df["YEARTXT"].dtype) == "Int64" and df["YEARTXT"].isna().all()
+    assert df["DATEA"].tolist() == ["20240226", "20240226"]
+    assert df["FAILDATE"].isna().all()
+    assert df["CDESCR"].equals(typed["CDESCR"])
@@ -0,0 +1,108 @@
+"""
+This module defines some test cases for the streaming execution of the stages
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.utils.pipelining import stream
+
+
+@pytest.fixture
+def setup():
+    """
+    test setup of a slow source of ten chunks
+
+    Returns:
+        Callable: generator of the chunks, sleeping before each one
+    """
+
+    def source(delay=0.0):
+        for chunk in range(10):
+            time.sleep(delay)
+            yield chunk
+
+    return source
+
+
+def test_stream_order_sucess(setup):
+    """
+    Test case for chunks flowing through all stages, in order
+    """
+    saved = []
+
+    report = stream(
+        setup(), [("double", lambda x: x * 2), ("inc", lambda x: x + 1)], saved.append
+    )
+
+    assert saved == [x * 2 + 1 for x in range(10)]
+    assert report.items == 10
+    assert [stage.name for stage in report.stages] == [
+        "source",
+        "double",
+        "inc",
+        "sink",
+    ]
+
+
+def test_stream_overlap_sucess(setup):
+    """
+    Test case for stages running concurrently, the run lasts about as long as
+    its slowest stage instead of the sum of all of them
+    """
+
+    def transform(chunk):
+        time.sleep(0.05)
+        return chunk
+
+    report = stream(setup(0.03), [("transform", transform)], lambda _: time.sleep(0.02))
+
+    assert report.elapsed < 10 * (0.03 + 0.05 + 0.02) * 0.8
+    assert report.bottleneck == "transform"
+
+
+def test_stream_backpressure_sucess(setup):
+    """
+    Test case for a slow sink holding back the source, at most maxsize chunks
+    wait between two stages
+    """
+    produced, consumed = [], []
+    ahead = []
+    lock = threading.Lock()
+
+    def source():
+        for chunk in setup():
+            with lock:
+                produced.append(chunk)
+                ahead.append(len(produced) - len(consumed))
+            yield chunk
+
+    def sink(chunk):
+        time.sleep(0.02)
+        with lock:
+            consumed.append(chunk)
+
+    stream(source(), [("transform", lambda x: x)], sink, maxsize=1)
+
+    # one chunk on each queue, one on each stage and the one being yielded
+    assert max(ahead) <= 5
+    assert consumed == list(range(10))
+
+
+def test_stream_error_sucess(setup):
+    """
+    Test case for a failing stage stopping the run and raising its error
+    """
+    saved = []
+
+    def transform(chunk):
+        if chunk == 3:
+            raise ValueError("bad chunk")
+        return chunk
+
+    with pytest.raises(ValueError, match="bad chunk"):
+        stream(setup(0.01), [("transform", transform)], saved.append)
+
+    assert saved == [0, 1, 2]
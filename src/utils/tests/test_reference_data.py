@@ -0,0 +1,86 @@
+"""
+This module defines some test cases for the reference data snapshot
+"""
+
+import os
+
+import pytest
+
+from src.utils import reference_data as module
+from src.utils.funtions import convert_code_into_state, load_categories
+from src.utils.reference_data import reference_data
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    """
+    test setup with a small binnings file and an empty snapshot folder
+
+    Returns:
+        Tuple[str, str]: binnings file and snapshot folder
+    """
+    path = tmp_path / "binnings.txt"
+    path.write_bytes(
+        b"VFG,BINNING\r\n"
+        + b"V75,CHARGER DOOR | OWD\r\n"
+        + b"V31,PICKUP BOX \r\n"
+        + b"V31,HOOD | LOOSE\r\n"
+        + b"V75,CHARGER DOOR | OWD\r\n"
+        + b"V12,HOOD | LOOSE\r\n"
+    )
+    monkeypatch.setattr(module, "_cache", {})
+    return str(path), str(tmp_path / "snapshots")
+
+
+def test_reference_data_compile_sucess(setup):
+    """
+    Test case for the categories, lookups and prompts of a snapshot
+    """
+    path, folder = setup
+
+    data = reference_data(path, folder)
+
+    assert data.binnings == ("CHARGER DOOR | OWD", "PICKUP BOX", "HOOD | LOOSE")
+    assert data.failures == ("OWD", "LOOSE")
+    assert data.components == ("CHARGER DOOR", "PICKUP BOX", "HOOD")
+    assert data.vfg("HOOD | LOOSE") == "V12"  # last line wins
+    assert data.vfg("PICKUP BOX") == "V31" and data.vfg("DOOR | NEW") == " ~ "
+    assert data.prompts["failures"] == "['LOOSE', 'OWD']"
+    assert data.state_name("CA") == "California"
+    with pytest.raises(TypeError):
+        data.vfgs["HOOD | LOOSE"] = "V00"  # type: ignore
+    assert len(os.listdir(folder)) == 1
+
+
+def test_reference_data_snapshot_reuse_sucess(setup, monkeypatch):
+    """
+    Test case for reusing the snapshot until the source changes
+    """
+    path, folder = setup
+    first = reference_data(path, folder)
+    assert reference_data(path, folder) is first
+
+    monkeypatch.setattr(module, "_cache", {})
+    monkeypatch.setattr(module, "_compile", pytest.fail)
+    assert reference_data(path, folder) == first  # read from the snapshot
+
+    monkeypatch.undo()
+    with open(path, "ab") as file:
+        file.write(b"V09,ROOF HARDTOP | DELAMINATION\r\n")
+    changed = reference_data(path, folder)
+
+    assert changed.binnings[-1] == "ROOF HARDTOP | DELAMINATION"
+    assert changed.source_hash != first.source_hash
+    assert len(os.listdir(folder)) == 2
+
+
+def test_reference_data_helpers_sucess():
+    """
+    Test case for the funtions helpers backed by the snapshot
+    """
+    assert convert_code_into_state("VI") == "U.S. Virgin Islands"
+    assert convert_code_into_state("01") == "~"
+    assert convert_code_into_state("XX") == "~"
+    assert "BINNING" not in load_categories()
+    with pytest.raises(ValueError):
+        load_categories("Vfgs")
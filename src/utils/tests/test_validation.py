@@ -0,0 +1,79 @@
+"""
+This module defines some test cases for the vectorized schema validation
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipelines.NHTSA_VOQs.contracts.schemas.extract import schema
+from src.utils.validation import SchemaValidator
+
+
+@pytest.fixture
+def setup():
+    """
+    test setup mocking typed complaints with three invalid rows
+
+    Returns:
+        pd.DataFrame: complaints with ODINO 11000000 to 11000009
+    """
+    df = pd.DataFrame(
+        {
+            "CMPLID": pd.array(range(1_000_000, 1_000_010), dtype="UInt32"),
+            "ODINO": pd.array(range(11_000_000, 11_000_010), dtype="UInt32"),
+            "YEARTXT": pd.array([2020] * 9 + [1800], dtype="UInt32"),
+            "CRASH": [True, False] * 5,
+            "DATEA": pd.to_datetime(["2024-01-02"] * 10),
+            "DRIVE_TRAIN": pd.Categorical(["AWD", None] * 4 + ["XX", "4WD"]),
+            "MILES": pd.array([None] * 10, dtype="UInt32"),
+        }
+    )
+    df.loc[1, "DATEA"] = pd.Timestamp("1900-01-01")
+    return df
+
+
+def test_validation_full_sucess(setup):
+    """
+    Test case for full validation reporting failures and timings
+    """
+    report = SchemaValidator(schema).validate(setup)
+
+    assert report.rows == 10
+    assert report.failures == {
+        "YEARTXT:in_range": 1,
+        "DATEA:in_range": 1,
+        "DRIVE_TRAIN:isin": 1,
+    }
+    assert "ODINO:unique" in report.timings and "MILES:dtype" in report.timings
+
+
+def test_validation_raw_values_sucess(setup):
+    """
+    Test case for coercion checks on values parsed without dtypes
+    """
+    df = setup.astype(object)
+    df["YEARTXT"] = [2020] * 8 + ["20X0", 2021]
+    df["ODINO"] = np.array([11_000_000] * 2 + list(range(11_000_002, 11_000_010)))
+    df["DATEA"] = ["20240102"] * 9 + ["2024"]
+
+    report = SchemaValidator(schema).validate(df)
+
+    assert report.failures["YEARTXT:dtype"] == 1
+    assert report.failures["ODINO:unique"] == 2
+    assert report.failures["DATEA:dtype"] == 1
+
+
+@pytest.mark.parametrize(
+    "level, options, rows",
+    [("sample", {"sample": 4}, 4), ("sample", {"sample": 0.5}, 5), ("delta", {}, 3)],
+)
+def test_validation_levels_sucess(setup, level, options, rows):
+    """
+    Test case for the rows selected by each validation level
+    """
+    validator = SchemaValidator(schema, level=level, seed=0, **options)
+
+    report = validator.validate(setup, watermark=11_000_006)
+
+    assert report.rows == rows
@@ -0,0 +1,122 @@
+"""
+This module defines some property test cases for the vectorized helpers,
+comparing them to the scalar helpers on random values
+"""
+
+import random
+import string
+
+import pandas as pd
+import pytest
+
+from src.utils.funtions import (
+    classify_binning,
+    convert_code_into_state,
+    extract_url,
+    get_mileage_class,
+    get_quarter,
+)
+from src.utils.reference_data import STATE_NAMES
+from src.utils.vectorized import (
+    FAILURE_MODES,
+    MILEAGE_BINS,
+    extract_urls,
+    failure_modes,
+    mileage_classes,
+    quarters,
+    state_names,
+)
+
+ROWS = 5_000
+
+
+@pytest.fixture
+def setup():
+    """
+    test setup of a seeded random generator
+
+    Returns:
+        random.Random: generator of the test values
+    """
+    return random.Random(42)
+
+
+def text(rng: random.Random, alphabet: str = string.ascii_uppercase + " |()") -> str:
+    """
+    Random text of up to 30 characters.
+    """
+    return "".join(rng.choices(alphabet, k=rng.randint(0, 30)))
+
+
+def test_state_names_sucess(setup):
+    """
+    Test case for state names equal to convert_code_into_state
+    """
+    pool = list(STATE_NAMES) + ["01", "99", "XX", "", "ca", "M"]
+    codes = pd.Series([setup.choice(pool) for _ in range(ROWS)])
+
+    assert list(state_names(codes)) == [convert_code_into_state(c) for c in codes]
+
+
+def test_quarters_sucess(setup):
+    """
+    Test case for quarters equal to get_quarter, from text and int dates
+    """
+    dates = [
+        f"{setup.randint(1990, 2030)}{setup.randint(1, 12):02}{setup.randint(1, 28):02}"
+        for _ in range(ROWS)
+    ]
+    texts = pd.Series(dates + ["", " "])
+    numbers = pd.Series([int(date) for date in dates])
+
+    assert list(quarters(texts)) == [get_quarter(date) for date in texts]
+    assert list(quarters(numbers)) == [get_quarter(date) for date in numbers]
+    with pytest.raises(ValueError):
+        quarters(pd.Series(["2023-01-01"]))
+
+
+def test_mileage_classes_sucess(setup):
+    """
+    Test case for mileage classes equal to get_mileage_class, bounds included
+    """
+    miles = [setup.randint(-1000, 40_000) for _ in range(ROWS)]
+    miles += [bound + delta for bound in MILEAGE_BINS for delta in (-1, 0, 1)]
+    series = pd.Series(miles)
+
+    assert list(mileage_classes(series)) == [get_mileage_class(m) for m in miles]
+    assert list(mileage_classes(series.astype(float))) == [
+        get_mileage_class(m) for m in miles
+    ]
+
+
+def test_failure_modes_sucess(setup):
+    """
+    Test case for failure modes equal to classify_binning, with several
+    patterns in the same binning
+    """
+    patterns = [pattern for pattern, _ in FAILURE_MODES]
+    binnings = [
+        text(setup)
+        + " | ".join(setup.sample(patterns, setup.randint(0, 3)))
+        + text(setup)
+        for _ in range(ROWS)
+    ] + ["DOOR | LOOSE\nOWD", ""]
+    series = pd.Series(binnings)
+
+    assert list(failure_modes(series)) == [classify_binning(b) for b in binnings]
+
+
+def test_extract_urls_sucess(setup):
+    """
+    Test case for urls equal to extract_url, with and without parenthesis
+    """
+    urls = [
+        text(setup)
+        + setup.choice(["", "https://", "https://nhtsa.gov/recalls?id=1"])
+        + text(setup)
+        + setup.choice(["", ")", ")https://x.com)"])
+        for _ in range(ROWS)
+    ] + ["https://", "https://a", "(https://a)", ")"]
+    series = pd.Series(urls)
+
+    assert list(extract_urls(series)) == [extract_url(url) for url in urls]
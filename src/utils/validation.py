@@ -0,0 +1,319 @@
+"""
+This module defines a fast validation of DataFrames against the pandera
+schemas of the contracts. The column properties and built-in checks of a
+schema are compiled once into vectorized numpy predicates, so validating a
+dataset is a few array operations per check instead of the pandera
+machinery, and the time spent on each check is reported.
+
+Levels:
+    full: every row is validated
+    sample: a random sample of N rows (int) or a fraction (float)
+    delta: only rows with the watermark column above a watermark
+
+Date bounds of the schemas are written as YYYYMMDD numbers, they are
+compared as dates. Checks without a vectorized version (custom checks)
+fall back to the pandera implementation.
+"""
+
+import logging
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandera import DataFrameSchema
+from pandera import dtypes as pa_dtypes
+
+from src.utils.logger import setup_logger
+
+LEVELS = ("full", "sample", "delta")
+
+
+class ValidationReport(NamedTuple):
+    """
+    Result of a validation.
+
+    Attributes:
+        level (str): validation level used
+        rows (int): number of rows validated
+        failures (Dict[str, int]): failed rows of each failed check
+        timings (Dict[str, float]): seconds spent on each check
+    """
+
+    level: str
+    rows: int
+    failures: Dict[str, int]
+    timings: Dict[str, float]
+
+    @property
+    def valid(self) -> bool:
+        """
+        True when no check failed.
+        """
+        return not self.failures
+
+    def summary(self) -> str:
+        """
+        Single line description of the failed checks.
+        """
+        if self.valid:
+            return f"{self.rows} rows valid ({self.level})"
+        failed = ", ".join(f"{name}: {n}" for name, n in self.failures.items())
+        return f"{self.rows} rows validated ({self.level}), failed checks: {failed}"
+
+
+class _ColumnPlan(NamedTuple):
+    name: str
+    kind: str
+    nullable: bool
+    unique: bool
+    checks: List[Tuple[str, Callable[[pd.Series, np.ndarray], np.ndarray]]]
+
+
+class SchemaValidator:
+    """
+    Validates DataFrames against a pandera schema with vectorized checks.
+    Only the schema columns present in the DataFrame are validated, so
+    frames parsed with a subset of columns can be checked too.
+
+    Args:
+        schema (DataFrameSchema): contract schema
+        level (str, optional): "full", "sample" or "delta". Defaults to "full".
+        sample (Union[int, float], optional): rows (int) or fraction (float)
+        validated on sample level. Defaults to 10_000.
+        watermark_column (str, optional): column compared to the watermark on
+        delta level. Defaults to "ODINO".
+        seed (Optional[int], optional): random state of the sample. Defaults
+        to None, a new sample each run.
+
+    Raises:
+        ValueError: unknown level
+    """
+
+    logger = logging.getLogger(__name__)
+    setup_logger()
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        schema: DataFrameSchema,
+        level: str = "full",
+        sample: Union[int, float] = 10_000,
+        watermark_column: str = "ODINO",
+        seed: Optional[int] = None,
+    ) -> None:
+        if level not in LEVELS:
+            raise ValueError(f"Invalid level '{level}' provided. Use one of {LEVELS}.")
+        self.schema = schema
+        self.level = level
+        self.sample = sample
+        self.watermark_column = watermark_column
+        self.seed = seed
+        self.plans = [self.__compile(name) for name in schema.columns]
+
+    def validate(
+        self, df: pd.DataFrame, watermark: Optional[int] = None
+    ) -> ValidationReport:
+        """
+        Runs the compiled checks on the rows selected by the level.
+
+        Args:
+            df (pd.DataFrame): dataset to validate
+            watermark (Optional[int], optional): last value already validated,
+            required on delta level. Defaults to None.
+
+        Raises:
+            ValueError: delta level without watermark
+
+        Returns:
+            ValidationReport: failed rows and time spent on each check
+        """
+        df = self.__select(df, watermark)
+        failures: Dict[str, int] = {}
+        timings: Dict[str, float] = {}
+
+        plans = [plan for plan in self.plans if plan.name in df.columns]
+        if not plans:
+            self.logger.warning("None of the schema columns are in the dataset")
+
+        for plan in plans:
+            series = df[plan.name]
+            for check, predicate in self.__predicates(plan):
+                start = time.perf_counter()
+                failed = int(np.count_nonzero(~predicate(series)))
+                timings[check] = time.perf_counter() - start
+                if failed:
+                    failures[check] = failed
+
+        report = ValidationReport(self.level, len(df), failures, timings)
+        slowest = sorted(timings.items(), key=lambda item: -item[1])[:3]
+        self.logger.info(
+            "Validation: %s in %.3fs, slowest: %s",
+            report.summary(),
+            sum(timings.values()),
+            ", ".join(f"{name} {spent:.3f}s" for name, spent in slowest),
+        )
+        return report
+
+    def __select(self, df: pd.DataFrame, watermark: Optional[int]) -> pd.DataFrame:
+        if self.level == "sample":
+            if isinstance(self.sample, float):
+                return df.sample(frac=self.sample, random_state=self.seed)
+            return df.sample(n=min(self.sample, len(df)), random_state=self.seed)
+        if self.level == "delta":
+            if watermark is None:
+                raise ValueError("Delta validation needs a watermark")
+            return df[df[self.watermark_column] > watermark]
+        return df
+
+    def __predicates(self, plan: _ColumnPlan):
+        # values are converted once per column and shared by its checks
+        cache: Dict[str, np.ndarray] = {}
+
+        def dtype(series: pd.Series) -> np.ndarray:
+            values, valid = _coerce(series, plan.kind)
+            cache["values"] = values
+            return valid
+
+        yield f"{plan.name}:dtype", dtype
+        if not plan.nullable:
+            yield f"{plan.name}:nullable", lambda s: s.notna().to_numpy()
+        if plan.unique:
+            yield f"{plan.name}:unique", lambda s: ~(
+                s.duplicated(keep=False).to_numpy() & s.notna().to_numpy()
+            )
+        for name, predicate in plan.checks:
+            yield f"{plan.name}:{name}", (
+                lambda s, predicate=predicate: predicate(s, cache["values"])
+            )
+
+    def __compile(self, name: str) -> _ColumnPlan:
+        column = self.schema.columns[name]
+        if isinstance(column.dtype, pa_dtypes.UInt):
+            kind = "uint"
+        elif isinstance(column.dtype, pa_dtypes.Bool):
+            kind = "bool"
+        elif isinstance(column.dtype, pa_dtypes.Timestamp):
+            kind = "datetime"
+        else:
+            kind = "string"
+
+        checks = []
+        for check in column.checks:
+            stats = {
+                key: _bound(value, kind) for key, value in check.statistics.items()
+            }
+            checks.append((check.name, _compile_check(check, stats)))
+        return _ColumnPlan(name, kind, column.nullable, column.unique, checks)
+
+
+def _bound(value, kind: str):
+    """
+    Converts a check bound to the domain of the compiled values.
+    """
+    numeric = isinstance(value, (pd.Timestamp, int, float))
+    if kind != "datetime" or isinstance(value, bool) or not numeric:
+        return value
+    # YYYYMMDD numbers are turned into epoch timestamps by pandera
+    number = value.value if isinstance(value, pd.Timestamp) else value
+    if 10_000_000 <= number <= 99_999_999:
+        return np.datetime64(pd.to_datetime(str(int(number)), format="%Y%m%d"))
+    return np.datetime64(pd.Timestamp(value).tz_localize(None), "ns")
+
+
+def _compile_check(check, stats: Dict) -> Callable[[pd.Series, np.ndarray], np.ndarray]:
+    """
+    Vectorized predicate of a pandera built-in check, null values pass.
+    """
+    operators: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+        "greater_than": lambda v: v > stats["min_value"],
+        "greater_than_or_equal_to": lambda v: v >= stats["min_value"],
+        "less_than": lambda v: v < stats["max_value"],
+        "less_than_or_equal_to": lambda v: v <= stats["max_value"],
+        "equal_to": lambda v: v == stats.get("value"),
+        "in_range": lambda v: (
+            (
+                v >= stats["min_value"]
+                if stats["include_min"]
+                else v > stats["min_value"]
+            )
+            & (
+                v <= stats["max_value"]
+                if stats["include_max"]
+                else v < stats["max_value"]
+            )
+        ),
+    }
+    if check.name in operators:
+        operator = operators[check.name]
+
+        def compare(_: pd.Series, values: np.ndarray) -> np.ndarray:
+            with np.errstate(invalid="ignore"):
+                return operator(values) | _isnull(values)
+
+        return compare
+
+    if check.name in ("isin", "notin"):
+        allowed = list(stats.get("allowed_values", stats.get("forbidden_values", [])))
+        keep = check.name == "isin"
+
+        def membership(series: pd.Series, _: np.ndarray) -> np.ndarray:
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # only the categories are compared, then mapped by code
+                found = np.isin(series.cat.categories.to_numpy(), allowed) == keep
+                # null code -1 picks the last item, always valid
+                return np.append(found, True)[series.cat.codes.to_numpy()]
+            return (series.isin(allowed).to_numpy() == keep) | series.isna().to_numpy()
+
+        return membership
+
+    def fallback(series: pd.Series, _: np.ndarray) -> np.ndarray:
+        return check(series).check_output.fillna(True).to_numpy(dtype=bool)
+
+    return fallback
+
+
+def _isnull(values: np.ndarray) -> np.ndarray:
+    if values.dtype.kind == "M":
+        return np.isnat(values)
+    return np.isnan(values)
+
+
+def _coerce(series: pd.Series, kind: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts a column to the array compared by the checks and tells which
+    values can be coerced to the schema dtype, null values pass.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: converted values and valid mask
+    """
+    isnull = series.isna().to_numpy()
+    if isnull.all():  # optional columns are often empty, nothing to convert
+        dtype = "datetime64[ns]" if kind == "datetime" else "float64"
+        return np.full(len(series), np.nan, dtype=dtype), isnull
+
+    if kind == "uint":
+        numbers = series
+        if not pd.api.types.is_numeric_dtype(series) or series.dtype == bool:
+            numbers = pd.to_numeric(series, errors="coerce")
+        values = numbers.to_numpy(dtype="float64", na_value=np.nan)
+        with np.errstate(invalid="ignore"):
+            valid = (values >= 0) & (values == np.floor(values))
+        return values, valid | isnull
+
+    if kind == "datetime":
+        if pd.api.types.is_datetime64_any_dtype(series):
+            dates = series
+        else:
+            dates = pd.to_datetime(
+                series.astype("string"), format="%Y%m%d", errors="coerce"
+            )
+        values = dates.to_numpy(dtype="datetime64[ns]")
+        return values, ~np.isnat(values) | isnull
+
+    if kind == "bool":
+        if pd.api.types.is_bool_dtype(series):
+            return np.empty(0), np.ones(len(series), dtype=bool)
+        valid = series.isin([True, False, "Y", "N"]).to_numpy()
+        return np.empty(0), valid | isnull
+
+    return np.empty(0), np.ones(len(series), dtype=bool)
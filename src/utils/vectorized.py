@@ -0,0 +1,107 @@
+"""
+This module defines vectorized versions of the row-wise helpers of
+src.utils.funtions, taking and returning whole Series: state names are a
+mapped lookup, quarters come from the datetime accessors, mileage classes
+from binned cuts and failure modes and urls from compiled patterns.
+
+String kernels match their pattern once per distinct value and spread the
+results by the factorized codes (see src.utils.map_unique): pandas string
+methods loop in Python over every row anyway, so the win comes from the
+repeated values (binnings, recall links of each affected component).
+
+They give the same outputs as the scalar helpers for every value these
+accept, null values get the helper default instead of raising.
+"""
+
+import re
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.map_unique import map_unique
+from src.utils.reference_data import STATE_NAMES
+
+# failure mode of the binnings containing each text, first match wins
+FAILURE_MODES: Tuple[Tuple[str, str], ...] = (
+    ("LOOSE", "LOOSEN"),
+    ("FELL OFF", "FELL OFF"),
+    ("DETACHED", "FELL OFF"),
+    ("MOONROOF GLASS | CRACKED", "Moonroof Glass Cracked/Exploded"),
+    ("MOONROOF GLASS | EXPLODED", "Moonroof Glass Cracked/Exploded"),
+    ("FRONT WIPER | TOTALLY INOPERATIVE", "Front Wiper Not Working"),
+    ("OWD", "Latch OWD"),
+)
+# alternatives are tried in order at the start of the binning, so the first
+# pattern found anywhere in it wins, like the chain of "in" tests
+FAILURE_MODE_PATTERN = re.compile(
+    "^(?:" + "|".join(f"(?=.*?({re.escape(text)}))" for text, _ in FAILURE_MODES) + ")",
+    re.DOTALL,
+)
+# from the first "https://" to the next ")", or to the last character
+URL_PATTERN = re.compile(r"(?=https://)(?:([^)]*)\)|(.*).\Z)", re.DOTALL)
+
+MILEAGE_BINS = (0, 6000, 12000, 18000, 24000, 30000)
+MILEAGE_LABELS = ("< 6k", "6K to 12K", "12K to 18K", "18K to 24K", "24K to 30K")
+
+
+def state_names(codes: pd.Series) -> pd.Series:
+    """
+    Vectorized convert_code_into_state, "~" for unknown codes.
+    """
+    return codes.map(STATE_NAMES).fillna("~")
+
+
+def quarters(dates: pd.Series) -> pd.Series:
+    """
+    Vectorized get_quarter of YYYYMMDD dates, "~" for empty ones.
+
+    Raises:
+        ValueError: date not in YYYYMMDD format
+    """
+    text = dates.astype("string")
+    empty = text.isna() | text.isin(["", " "])
+    parsed = pd.to_datetime(text.mask(empty), format="%Y%m%d")
+    return (
+        ("Q" + parsed.dt.quarter.astype("Int64").astype("string"))
+        .fillna("~")
+        .astype(object)
+    )
+
+
+def mileage_classes(miles: pd.Series) -> pd.Series:
+    """
+    Vectorized get_mileage_class. Miles on the bounds of the classes and
+    above 30K fall in "> 36K", as in the scalar version.
+    """
+    values = miles.to_numpy(dtype="float64", na_value=np.nan)
+    classes = pd.cut(values, MILEAGE_BINS, right=False, labels=MILEAGE_LABELS)
+    result = np.asarray(classes.astype(object), dtype=object)
+    result[pd.isna(classes) | np.isin(values, MILEAGE_BINS)] = "> 36K"
+    result[values == 0] = "~"
+    return pd.Series(result, index=miles.index, name=miles.name)
+
+
+def failure_modes(binnings: pd.Series) -> pd.Series:
+    """
+    Vectorized classify_binning, "" when no failure mode matches.
+    """
+
+    def failure_mode(binning) -> str:
+        match = FAILURE_MODE_PATTERN.match(str(binning))
+        return FAILURE_MODES[match.lastindex - 1][1] if match else ""
+
+    return map_unique(binnings, failure_mode, na_value="")
+
+
+def extract_urls(texts: pd.Series) -> pd.Series:
+    """
+    Vectorized extract_url, "" for texts without url.
+    """
+
+    def url(text) -> str:
+        if (match := URL_PATTERN.search(str(text))) is None:
+            return ""
+        return match.group(1) if match.group(1) is not None else match.group(2)
+
+    return map_unique(texts, url, na_value="")